@@ -0,0 +1,74 @@
+"""Burst test for admission control against a fake model that throttles under load.
+
+Fires `--requests` concurrent model calls at a FakeLlm that returns 429 once
+more than `--backend-capacity` calls are in flight, first unprotected and
+then through AdmissionControlledLlm. A quarter of the calls are marked
+BACKGROUND to show interactive calls being admitted first.
+
+    python benchmarks/bench_admission.py --requests 200 --backend-capacity 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from memory_agent.admission import BACKGROUND, INTERACTIVE, AdmissionControlledLlm, AdmissionController, request_priority
+from memory_agent.fake_model import FakeLlm
+
+
+def _request() -> LlmRequest:
+    return LlmRequest(model="gemini-2.5-flash",
+                      contents=[types.Content(role="user", parts=[types.Part(text="Plan a morning activity in Kyoto.")])])
+
+
+async def _call(model, priority: int):
+    with request_priority(priority):
+        try:
+            async for _ in model.generate_content_async(_request()):
+                pass
+            return True
+        except Exception:
+            return False
+
+
+async def burst(model, n: int):
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_call(model, BACKGROUND if i % 4 == 0 else INTERACTIVE) for i in range(n)))
+    return sum(results), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--backend-capacity", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--rps", type=float, default=150)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    fake = FakeLlm(latency_s=args.latency_ms / 1000, throttle_above_in_flight=args.backend_capacity)
+    ok, elapsed = asyncio.run(burst(fake, args.requests))
+    print(f"unprotected: {ok}/{args.requests} succeeded in {elapsed:.2f}s, {fake.throttled} throttled")
+
+    fake = FakeLlm(latency_s=args.latency_ms / 1000, throttle_above_in_flight=args.backend_capacity)
+    controller = AdmissionController(rate_per_s=args.rps, burst=args.concurrency, max_concurrency=args.concurrency)
+    guarded = AdmissionControlledLlm(model=fake.model, inner=fake, controller=controller, backoff_base_s=0.05)
+    ok, elapsed = asyncio.run(burst(guarded, args.requests))
+    print(f"admission:   {ok}/{args.requests} succeeded in {elapsed:.2f}s, {fake.throttled} throttled")
+    report = controller.report()
+    print(f"  retries={report['retries']} failures={report['failures']}")
+    for model, by_priority in report["queue_time"].items():
+        for priority, s in by_priority.items():
+            print(f"  queue time [{model}/{priority}]: p50={s['p50_ms']}ms p95={s['p95_ms']}ms max={s['max_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Bytes per event and load time for a 10k-event session, per storage form.
+
+    python benchmarks/bench_compact_events.py [--events 10000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from memory_agent.compact_events import CompactEventLog
+
+
+def _events(n: int):
+    events = []
+    for i in range(n):
+        if i % 4 == 2:
+            part = types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": "restaurant_expert"}))
+        else:
+            part = types.Part(text=f"Turn {i}: I'm in Kyoto. Plan an afternoon activity near Gion that fits a vegetarian diet.")
+        events.append(Event(
+            author="user" if i % 2 == 0 else "master_trip_planner",
+            invocation_id=f"e-{i // 2}",
+            content=types.Content(role="user" if i % 2 == 0 else "model", parts=[part]),
+            actions=EventActions(state_delta={"last_activity_type": "FOOD"} if i % 4 == 3 else {}),
+        ))
+    return events
+
+
+def _measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10_000)
+    args = parser.parse_args()
+    n = args.events
+    source = _events(n)
+    stored_json = [e.model_dump_json(exclude_none=True) for e in source]
+    # append_dict consumes its input, so hand it a private copy.
+    stored_dicts = [json.loads(j) for j in stored_json]
+
+    rows = []
+    events, t, mem = _measure(lambda: [Event.model_validate_json(j) for j in stored_json])
+    rows.append(("pydantic Event objects", mem / n, t))
+    rows.append(("JSON bytes (event.model_dump_json)", sum(len(j) for j in stored_json) / n, None))
+    log, t, mem = _measure(lambda: CompactEventLog.from_events(events))
+    rows.append(("CompactEventLog (from Event)", mem / n, t))
+    log2, t, _ = _measure(lambda: _append_all(stored_dicts))
+    rows.append(("CompactEventLog (from stored, accounted)", log2.nbytes() / n, t))
+
+    _, t_transcript, _ = _measure(lambda: list(log.transcript()))
+    _, t_tail, _ = _measure(lambda: log.events(max(0, n - 20)))
+    _, t_all, _ = _measure(lambda: log.events())
+
+    print(f"{'storage':<42}{'bytes/event':>12}{'load ms':>10}")
+    for name, per_event, seconds in rows:
+        load = f"{seconds * 1000:>10.1f}" if seconds is not None else f"{'-':>10}"
+        print(f"{name:<42}{per_event:>12,.0f}{load}")
+    print(f"\ntranscript scan (no materialization): {t_transcript * 1000:.1f} ms")
+    print(f"materialize last 20 events:           {t_tail * 1000:.2f} ms")
+    print(f"materialize all {n} events:          {t_all * 1000:.1f} ms")
+
+
+def _append_all(dicts):
+    log = CompactEventLog()
+    for d in dicts:
+        log.append_dict(d)
+    return log
+
+
+if __name__ == "__main__":
+    main()
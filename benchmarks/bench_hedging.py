@@ -0,0 +1,80 @@
+"""Tail latency of model calls with and without hedging, against a fake model with a slow tail.
+
+Runs `--requests` calls (`--concurrency` at a time) through a FakeLlm whose
+latency is lognormal around `--latency-ms` with `--tail-probability` of calls
+taking `--tail-ms`, then repeats the run through HedgedLlm.
+
+    python benchmarks/bench_hedging.py --requests 500 --tail-probability 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from memory_agent.fake_model import FakeLlm
+from memory_agent.hedging import HedgedLlm
+from memory_agent.metrics import Histogram
+
+
+def _request() -> LlmRequest:
+    return LlmRequest(model="gemini-2.5-flash",
+                      contents=[types.Content(role="user", parts=[types.Part(text="Find the best sushi in Palo Alto.")])])
+
+
+async def run(model, n: int, concurrency: int) -> Histogram:
+    latency = Histogram()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            async for _ in model.generate_content_async(_request()):
+                pass
+            latency.observe(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--sigma", type=float, default=0.3)
+    parser.add_argument("--tail-probability", type=float, default=0.05)
+    parser.add_argument("--tail-ms", type=float, default=1000)
+    parser.add_argument("--hedge-after-ms", type=float, default=None, help="fixed hedge delay (default: observed p95)")
+    parser.add_argument("--max-hedge-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    def fake():
+        return FakeLlm(latency_s=args.latency_ms / 1000, latency_sigma=args.sigma,
+                       tail_probability=args.tail_probability, tail_latency_s=args.tail_ms / 1000)
+
+    plain = fake()
+    unhedged = asyncio.run(run(plain, args.requests, args.concurrency))
+
+    inner = fake()
+    hedged_model = HedgedLlm(model=inner.model, inner=inner, max_hedge_ratio=args.max_hedge_ratio, initial_hedge_after_s=0.1,
+                             hedge_after_s=args.hedge_after_ms / 1000 if args.hedge_after_ms is not None else None)
+    hedged = asyncio.run(run(hedged_model, args.requests, args.concurrency))
+
+    print(f"{'':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'backend calls':>15}")
+    for name, histogram, calls in (("unhedged", unhedged, plain.calls), ("hedged", hedged, inner.calls)):
+        s = histogram.summary()
+        print(f"{name:<10}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}{calls:>15}")
+    stats = hedged_model.stats.summary()
+    print(f"\nhedges={stats['hedges']} hedge_wins={stats['hedge_wins']} final hedge delay={hedged_model.hedge_delay() * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
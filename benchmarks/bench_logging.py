@@ -0,0 +1,77 @@
+"""Microbenchmark: per-turn logging overhead on the calling thread.
+
+Simulates the two messages `save_activity_type_callback` emits per tool call
+and reports the cost seen by the event loop for each logging strategy.
+
+    python benchmarks/bench_logging.py [--turns 50000]
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from memory_agent.log import configure_logging, get_logger, get_turn_logger
+
+
+class _SlowSink(io.StringIO):
+    """Stands in for a terminal/pipe: every write costs a little."""
+
+    def write(self, s):
+        time.sleep(0.00002)
+        return super().write(s)
+
+
+def _per_turn_ns(fn, turns: int) -> float:
+    start = time.perf_counter_ns()
+    for i in range(turns):
+        fn(i)
+    return (time.perf_counter_ns() - start) / turns
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50_000)
+    args = parser.parse_args()
+    agent_name, activity = "restaurant_expert", "FOOD"
+    results = {}
+
+    sink = _SlowSink()
+    results["print (baseline)"] = _per_turn_ns(lambda i: (
+        print(f"\n🔔 [CALLBACK] The planner transferred to '{agent_name}'.", file=sink),
+        print(f"💾 [STATE UPDATE] 'last_activity_type' is now set to: {activity}\n", file=sink)), args.turns)
+
+    sync_logger = logging.getLogger("bench.sync")
+    sync_logger.propagate = False
+    sync_logger.addHandler(logging.StreamHandler(_SlowSink()))
+    sync_logger.setLevel(logging.INFO)
+    results["stdlib sync handler"] = _per_turn_ns(lambda i: (
+        sync_logger.info("🔔 [CALLBACK] The planner transferred to '%s'.", agent_name),
+        sync_logger.info("💾 [STATE UPDATE] 'last_activity_type' is now set to: %s", activity)), args.turns)
+
+    def queued(logger):
+        return lambda i: (
+            logger.info("🔔 [CALLBACK] The planner transferred to '%s'.", agent_name, extra={"agent": agent_name}),
+            logger.info("💾 [STATE UPDATE] 'last_activity_type' is now set to: %s", activity, extra={"activity_type": activity}))
+
+    configure_logging(level="INFO", stream=_SlowSink())
+    results["queue sink, INFO"] = _per_turn_ns(queued(get_logger("bench")), args.turns)
+
+    os.environ["MEMORY_AGENT_LOG_SAMPLE_EVERY"] = "10"
+    results["queue sink, sampled 1/10"] = _per_turn_ns(queued(get_turn_logger("bench")), args.turns)
+
+    configure_logging(level="WARNING", stream=_SlowSink())
+    results["level disabled"] = _per_turn_ns(queued(get_logger("bench")), args.turns)
+
+    print(f"{'strategy':<28}{'ns/turn':>12}")
+    for name, ns in results.items():
+        print(f"{name:<28}{ns:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
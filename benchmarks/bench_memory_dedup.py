@@ -0,0 +1,70 @@
+"""Memory set size and search latency before/after the dedup job, on synthetic users.
+
+Each user repeats the same handful of facts across many sessions with small
+wording changes (as Memory Bank consolidation produces), plus one genuinely
+new fact per session.
+
+    python benchmarks/bench_memory_dedup.py --users 50 --sessions 30 --threshold 0.6
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from memory_agent.local_memory import LocalMemoryService
+from memory_agent.memory_dedup import run_dedup
+
+FACTS = (
+    "I loved Gaeta and its beaches",
+    "I enjoy cities close to the Mediterranean sea",
+    "I am vegetarian and avoid fish",
+    "My passport expires in March 2027",
+    "I prefer trains over flying in Europe",
+    "I like small boutique hotels near the old town",
+)
+FILLERS = ("really", "so much", "a lot", "always", "honestly", "definitely")
+PLACES = ("Lisbon", "Kyoto", "Oaxaca", "Tbilisi", "Hanoi", "Porto", "Seville", "Cusco", "Valletta", "Bergen")
+THINGS = ("street food tour", "cooking class", "sunset cruise", "jazz bar", "flea market", "botanical garden")
+
+
+def populate(service: LocalMemoryService, users: int, sessions: int, seed: int = 0):
+    rng = random.Random(seed)
+    for u in range(users):
+        texts = []
+        for _ in range(sessions):
+            for fact in FACTS:
+                words = fact.split()
+                if rng.random() < 0.5:
+                    words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+                texts.append(" ".join(words))
+            texts.append(f"In {rng.choice(PLACES)} we booked a {rng.choice(THINGS)} on day {rng.randint(1, 14)}")
+        service.add_memories("trip_planner", f"user_{u}", texts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    args = parser.parse_args()
+
+    service = LocalMemoryService()
+    populate(service, args.users, args.sessions)
+    started = time.perf_counter()
+    report = run_dedup(service, args.threshold)
+    elapsed = time.perf_counter() - started
+
+    print(f"dedup job: {elapsed * 1000:.0f} ms for {report['users']} users")
+    print(f"memories:  {report['memories_before']} -> {report['memories_after']} (-{report['shrink_pct']}%)")
+    print(f"bytes:     {report['bytes_before']} -> {report['bytes_after']}")
+    for label in ("mean_ms", "p50_ms", "p95_ms"):
+        print(f"search {label[:-3]:<5} {report['search_before'][label]:.3f} -> {report['search_after'][label]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""First-turn latency of a returning user's new session, with and without prefetch.
+
+Each user has a previous session, memories and preferences behind stores
+with simulated round-trip latency. A new session is created, the user
+"types" for --think-ms, then sends the first message. The first turn's
+latency runs from the message to the (simulated) model reply:
+
+    cold    digest, memories and preferences fetched after the message, one after the other
+    warm    Prefetcher started them at session creation; the turn awaits them together
+
+    python benchmarks/bench_prefetch.py --users 50 --store-ms 40 --think-ms 0 150 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from google.adk.events import Event
+from google.genai import types
+from memory_agent.local_memory import LocalMemoryService
+from memory_agent.metrics import Histogram
+from memory_agent.prefetch import Prefetcher, memory_loader, session_digest_loader
+from memory_agent.sessions import ShardedInMemorySessionService
+
+APP = "trip_planner"
+PROFILE_QUERY = "like love prefer favorite food vegetarian budget hotel train trip"
+TURNS = (
+    ("user", "Hi! I'm planning a trip to Tokyo. I love ramen and I'm a vegetarian."),
+    ("trip_planner", "Great choice! Tokyo has excellent vegetarian ramen in Shinjuku and Ebisu."),
+    ("user", "Where should I go for dinner? I prefer small places and I'm on a mid-range budget."),
+    ("trip_planner", "Try Afuri in Ebisu for yuzu ramen, then a walk through Nonbei Yokocho."),
+)
+MEMORIES = (
+    "I love ramen and I'm a vegetarian",
+    "I prefer small restaurants over big chains",
+    "I travel on a mid-range budget",
+    "I prefer trains over flying in Japan",
+)
+
+
+class SlowSessions(ShardedInMemorySessionService):
+    """Adds a fixed round trip to every read."""
+
+    def __init__(self, delay_s: float):
+        super().__init__()
+        self.delay_s = delay_s
+
+    async def get_session(self, **kwargs):
+        await asyncio.sleep(self.delay_s)
+        return await super().get_session(**kwargs)
+
+    async def list_sessions(self, **kwargs):
+        await asyncio.sleep(self.delay_s)
+        return await super().list_sessions(**kwargs)
+
+
+class SlowMemory(LocalMemoryService):
+    def __init__(self, delay_s: float):
+        super().__init__()
+        self.delay_s = delay_s
+
+    async def search_memory(self, *, app_name, user_id, query):
+        await asyncio.sleep(self.delay_s)
+        return await super().search_memory(app_name=app_name, user_id=user_id, query=query)
+
+
+def preferences_loader(delay_s: float):
+    async def load(app_name: str, user_id: str, session_id: str):
+        await asyncio.sleep(delay_s)
+        return {"dietary_restrictions": ["vegetarian"], "budget": "mid-range"}
+    return load
+
+
+async def populate(sessions, memory: SlowMemory, users: int):
+    for u in range(users):
+        user_id = f"user_{u}"
+        session = await sessions.create_session(app_name=APP, user_id=user_id, session_id=f"{user_id}_old")
+        for author, text in TURNS:
+            await sessions.append_event(session, Event(
+                author=author, content=types.Content(role="user" if author == "user" else "model",
+                                                     parts=[types.Part(text=text)])))
+        memory.add_memories(APP, user_id, MEMORIES)
+
+
+async def first_turn(prefetcher: Prefetcher, sessions, user_id: str, think_s: float, model_s: float,
+                     warm: bool) -> float:
+    session = await sessions.create_session(app_name=APP, user_id=user_id)
+    if warm:
+        prefetcher.start(APP, user_id, session.id)
+    await asyncio.sleep(think_s)  # The user is typing.
+
+    started = time.perf_counter()  # The message arrives.
+    if warm:
+        await asyncio.gather(*(prefetcher.take(APP, user_id, session.id, name) for name in prefetcher.loaders))
+    else:
+        for loader in prefetcher.loaders.values():
+            await loader(APP, user_id, session.id)
+    await asyncio.sleep(model_s)
+    elapsed = time.perf_counter() - started
+    await sessions.delete_session(app_name=APP, user_id=user_id, session_id=session.id)
+    return elapsed
+
+
+async def run(args):
+    delay_s = args.store_ms / 1000
+    sessions = SlowSessions(delay_s)
+    memory = SlowMemory(delay_s)
+    await populate(sessions, memory, args.users)
+
+    prefetcher = Prefetcher()
+    prefetcher.register("session_digest", session_digest_loader(sessions))
+    prefetcher.register("memories", memory_loader(memory, PROFILE_QUERY))
+    prefetcher.register("preferences", preferences_loader(delay_s))
+
+    print(f"{args.users} users, {args.store_ms:.0f} ms per store round trip, model {args.model_ms:.0f} ms "
+          f"(first turn, ms)")
+    print(f"{'think ms':>9}{'cold p50':>10}{'cold p95':>10}{'warm p50':>10}{'warm p95':>10}{'saved p50':>11}")
+    for think_ms in args.think_ms:
+        results = {}
+        for warm in (False, True):
+            histogram = Histogram()
+            turns = [first_turn(prefetcher, sessions, f"user_{u}", think_ms / 1000, args.model_ms / 1000, warm)
+                     for u in range(args.users)]
+            for elapsed in await asyncio.gather(*turns):
+                histogram.observe(elapsed)
+            results[warm] = histogram.summary()
+        cold, warm = results[False], results[True]
+        print(f"{think_ms:>9.0f}{cold['p50_ms']:>10.1f}{cold['p95_ms']:>10.1f}{warm['p50_ms']:>10.1f}"
+              f"{warm['p95_ms']:>10.1f}{cold['p50_ms'] - warm['p50_ms']:>11.1f}")
+    print(f"prefetch: {prefetcher.stats()['hits']} hits, {prefetcher.stats()['misses']} misses")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--store-ms", type=float, default=40, help="Simulated latency of each store read.")
+    parser.add_argument("--model-ms", type=float, default=300, help="Simulated model call.")
+    parser.add_argument("--think-ms", type=float, nargs="+", default=[0, 150, 1000],
+                        help="Time between session creation and the first message.")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
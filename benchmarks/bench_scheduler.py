@@ -0,0 +1,92 @@
+"""Mean turn latency of step_04's planner with and without the specialist scheduler.
+
+Simulates --turns turns over --sessions sessions. Each specialist's run
+latency is drawn from a lognormal around its --latency-ms mean; halfway
+through, the means are rotated (the fastest becomes the slowest) to show
+the scheduler adapting. --generic of the requests fit any allowed
+specialist; the rest ask for one activity type, and when that type is
+banned by the variety rule the planner picks another allowed specialist.
+
+    static      the allowed specialist listed first in ACTIVITY_TYPES (the previous behaviour)
+    random      a random allowed specialist
+    scheduler   the first of SpecialistScheduler.preferred (as step_04's instruction lists them),
+                or the static choice while no allowed specialist is measured yet
+
+Every policy is checked against the variety rule (never the same type twice in a row).
+
+    python benchmarks/bench_scheduler.py --turns 20000 --generic 0.6 --latency-ms 900 400 600
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from memory_agent.scheduler import SpecialistScheduler
+
+ACTIVITY_TYPES = {"museum_expert": "CULTURAL", "restaurant_expert": "FOOD", "outdoor_expert": "OUTDOOR"}
+
+
+def simulate(policy: str, args) -> dict:
+    rng = random.Random(0)
+    scheduler = SpecialistScheduler()
+    agents = list(ACTIVITY_TYPES)
+    means = dict(zip(agents, args.latency_ms))
+    last = ["None"] * args.sessions
+    latencies = []
+    for turn in range(args.turns):
+        if turn == args.turns // 2:
+            means = dict(zip(agents, args.latency_ms[1:] + args.latency_ms[:1]))
+        session = turn % args.sessions
+        allowed = [a for a in agents if ACTIVITY_TYPES[a] != last[session]]
+        wanted = None if rng.random() < args.generic else rng.choice(agents)
+        if wanted in allowed:
+            chosen = wanted
+        elif policy == "static":
+            chosen = allowed[0]
+        elif policy == "random":
+            chosen = rng.choice(allowed)
+        else:
+            chosen = (scheduler.preferred(allowed) or allowed)[0]
+        assert ACTIVITY_TYPES[chosen] != last[session], "variety rule broken"
+        seconds = rng.lognormvariate(math.log(means[chosen] / 1000), args.sigma)
+        scheduler.record(chosen, seconds)
+        latencies.append((args.planner_ms / 1000 + seconds) * 1000)
+        last[session] = ACTIVITY_TYPES[chosen]
+    latencies.sort()
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+        "runs": {a: s["runs"] for a, s in scheduler.stats().items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--generic", type=float, default=0.6, help="share of requests any allowed specialist can answer")
+    parser.add_argument("--latency-ms", type=float, nargs=3, default=[900.0, 400.0, 600.0],
+                        help="mean run latency of museum, restaurant and outdoor expert")
+    parser.add_argument("--sigma", type=float, default=0.4, help="lognormal spread of run latencies")
+    parser.add_argument("--planner-ms", type=float, default=500.0, help="planner's own model call per turn")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns, {args.generic:.0%} generic, specialist means {args.latency_ms} ms (rotated halfway)")
+    print(f"{'policy':<12}{'mean ms':>10}{'p95 ms':>10}   runs per specialist")
+    baseline = None
+    for policy in ("static", "random", "scheduler"):
+        result = simulate(policy, args)
+        baseline = baseline or result["mean_ms"]
+        runs = ", ".join(f"{a.split('_')[0]}={n}" for a, n in result["runs"].items())
+        print(f"{policy:<12}{result['mean_ms']:>10.1f}{result['p95_ms']:>10.1f}   {runs}"
+              f"   ({result['mean_ms'] / baseline - 1:+.1%} vs static)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Requests per second per core for the HTTP front end (memory_agent.serve).
+
+Starts the server for one step with every model replaced by FakeLlm, once
+per `--workers` value, and drives it with `--sessions` concurrent sessions
+of `--turns` SSE turns each. Turns/s divided by the worker count is the
+per-core figure; the front end itself takes one more core.
+
+    python benchmarks/bench_serve.py --step step_04_stateful_agent --workers 1 2 4 --sessions 64 --turns 5
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+import httpx
+
+from memory_agent.metrics import Histogram
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout_s: float = 180.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup.")
+        try:
+            if (await client.get("/healthz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("Server did not come up.")
+
+
+async def _session(client: httpx.AsyncClient, step: str, user: int, turns: int, latency: Histogram) -> int:
+    response = await client.post(f"/apps/{step}/users/bench_{user}/sessions", json={})
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+    done = 0
+    for turn in range(turns):
+        started = time.perf_counter()
+        async with client.stream("POST", f"/apps/{step}/users/bench_{user}/sessions/{session_id}/turns",
+                                 json={"message": f"Plan activity {turn} for me in Kyoto."}) as stream:
+            async for line in stream.aiter_lines():
+                if line.startswith("event: "):
+                    done += line == "event: done"
+                    break
+        latency.observe(time.perf_counter() - started)
+    return done
+
+
+async def run(step: str, workers: int, sessions: int, turns: int, latency_ms: float):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "memory_agent.serve", "--steps", step, "--workers", str(workers),
+         "--port", str(port), "--fake-model-latency-ms", str(latency_ms)],
+        cwd=repo_root, stdout=subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await _wait_ready(client, process)
+            latency = Histogram()
+            started = time.perf_counter()
+            completed = await asyncio.gather(*(_session(client, step, u, turns, latency) for u in range(sessions)))
+            return sum(completed), time.perf_counter() - started, latency
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--step", default="step_04_stateful_agent")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20, help="FakeLlm latency per model call.")
+    args = parser.parse_args()
+
+    print(f"{args.step}: {args.sessions} sessions x {args.turns} turns, fake model {args.latency_ms:.0f} ms\n")
+    print(f"{'workers':>8}{'turns ok':>10}{'turns/s':>10}{'turns/s/core':>14}{'p50 ms':>9}{'p95 ms':>9}")
+    for workers in args.workers:
+        ok, elapsed, latency = asyncio.run(run(args.step, workers, args.sessions, args.turns, args.latency_ms))
+        s = latency.summary()
+        print(f"{workers:>8}{ok:>10}{ok / elapsed:>10.1f}{ok / elapsed / workers:>14.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Append throughput and resume time: JournalSessionService against SqliteSessionService.
+
+Writes `--sessions` sessions of `--events` events each, `--concurrency`
+sessions at a time (concurrent turns are what group commit batches), then
+closes the store, reopens it and resumes a sample of sessions:
+
+    open       time to open the store (journal: latest snapshot plus the records after it)
+    resume     get_session of one whole session, after opening
+
+The journal runs durable (each append waits for its fsync) and not durable,
+and is also reopened after a simulated crash (closed without its final
+snapshot, so the tail since the last periodic snapshot is replayed).
+SQLite runs in WAL mode with synchronous=NORMAL, one transaction per turn.
+
+    python benchmarks/bench_session_journal.py --sessions 2000 --events 20 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from memory_agent.journal_sessions import JournalSessionService
+from memory_agent.sqlite_sessions import SqliteSessionService
+
+APP_NAME = "master_trip_planner"
+
+
+def _event(i: int) -> Event:
+    user_turn = i % 2 == 0
+    return Event(
+        author="user" if user_turn else APP_NAME,
+        invocation_id=f"inv-{i // 2}",
+        content=types.Content(role="user" if user_turn else "model",
+                              parts=[types.Part(text=f"Turn {i}: plan a morning activity in Kyoto, please. " * 4)]),
+        actions=EventActions(state_delta={} if user_turn else {
+            "last_activity_type": random.choice(["CULTURAL", "FOOD", "OUTDOOR"])}),
+    )
+
+
+async def write(service, sessions: int, events: int, concurrency: int):
+    keys = []
+
+    async def one(i: int):
+        user_id = f"user_{i % 100}"
+        session = await service.create_session(app_name=APP_NAME, user_id=user_id, state={"last_activity_type": "None"})
+        for e in range(events):
+            await service.append_event(session, _event(e))
+        keys.append((user_id, session.id))
+
+    started = time.perf_counter()
+    for first in range(0, sessions, concurrency):
+        await asyncio.gather(*(one(i) for i in range(first, min(first + concurrency, sessions))))
+    return keys, time.perf_counter() - started
+
+
+async def resume(service, sample):
+    latencies = []
+    for user_id, session_id in sample:
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert session is not None and session.events
+    return statistics.mean(latencies), sorted(latencies)[int(len(latencies) * 0.95)]
+
+
+def run(name: str, make, close, args, directory: str):
+    random.seed(0)
+    service = make()
+    keys, write_s = asyncio.run(write(service, args.sessions, args.events, args.concurrency))
+    extra = service.stats() if isinstance(service, JournalSessionService) else {}
+    close(service)
+
+    started = time.perf_counter()
+    service = make()
+    open_ms = (time.perf_counter() - started) * 1000
+    mean_ms, p95_ms = asyncio.run(resume(service, random.Random(1).sample(keys, min(args.reads, len(keys)))))
+    close(service)
+
+    appends = args.sessions * (1 + args.events)
+    size_mb = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(directory) for f in files) / 1e6
+    print(f"{name:<28}{appends / write_s:>12,.0f}{open_ms:>10.1f}{mean_ms:>12.3f}{p95_ms:>11.3f}{size_mb:>9.1f}")
+    if extra:
+        print(f"{'':<28}fsyncs={extra['fsyncs']} records/fsync={extra['records_per_fsync']} "
+              f"snapshots={extra['snapshots']} compactions={extra['compactions']} "
+              f"recovery={service.recovery}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--segment-mb", type=float, default=4)
+    parser.add_argument("--snapshot-mb", type=float, default=8)
+    args = parser.parse_args()
+    root = tempfile.mkdtemp(prefix="bench_journal_")
+
+    def journal(directory, durable):
+        return lambda: JournalSessionService(directory, segment_bytes=int(args.segment_mb * 1024 * 1024),
+                                             snapshot_bytes=int(args.snapshot_mb * 1024 * 1024), durable=durable)
+
+    print(f"{args.sessions} sessions x {args.events} events, {args.concurrency} concurrent")
+    print(f"{'store':<28}{'appends/s':>12}{'open ms':>10}{'resume ms':>12}{'p95 ms':>11}{'MB':>9}")
+    try:
+        db = os.path.join(root, "sqlite", "sessions.db")
+        run("sqlite", lambda: SqliteSessionService(db), lambda s: s.close(), args, os.path.dirname(db))
+        for name, durable, snapshot_on_close in (("journal (durable)", True, True),
+                                                 ("journal (not durable)", False, True),
+                                                 ("journal (crash, durable)", True, False)):
+            directory = os.path.join(root, name.replace(" ", "_").strip("()"))
+            run(name, journal(directory, durable), lambda s: s.close(snapshot=snapshot_on_close), args, directory)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
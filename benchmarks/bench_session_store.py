@@ -0,0 +1,96 @@
+"""Soak benchmark for ShardedInMemorySessionService.
+
+Creates `--sessions` sessions (default 100k) spread over many users, appends a
+few events to each, and reads a sample back while the store is bounded to
+`--max-resident` sessions. Reports throughput, evictions/reloads, accounted
+bytes and peak RSS. `--compare` runs the same load on ADK's
+InMemorySessionService.
+
+    python benchmarks/bench_session_store.py --sessions 100000 --max-resident 20000 --spill-dir /tmp/adk_spill
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import sys
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from memory_agent.sessions import ShardedInMemorySessionService
+
+APP_NAME = "soak_app"
+
+
+def _event(i: int) -> Event:
+    return Event(
+        author="user" if i % 2 == 0 else "master_trip_planner",
+        invocation_id=f"inv-{i // 2}",
+        content=types.Content(role="user" if i % 2 == 0 else "model",
+                              parts=[types.Part(text=f"Turn {i}: plan a morning activity in Kyoto, please.")]),
+        actions=EventActions(state_delta={"last_activity_type": random.choice(["CULTURAL", "FOOD", "OUTDOOR"])}),
+    )
+
+
+async def soak(service, sessions: int, users: int, events_per_session: int, reads: int):
+    started = time.perf_counter()
+    created = []
+    for i in range(sessions):
+        user_id = f"user_{i % users}"
+        session = await service.create_session(app_name=APP_NAME, user_id=user_id, state={"last_activity_type": "None"})
+        for e in range(events_per_session):
+            await service.append_event(session, _event(e))
+        created.append((user_id, session.id))
+    write_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    missing = 0
+    for user_id, session_id in random.sample(created, min(reads, len(created))):
+        if await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id) is None:
+            missing += 1
+    read_s = time.perf_counter() - started
+    return write_s, read_s, missing
+
+
+def _report(name, sessions, events_per_session, reads, write_s, read_s, missing, extra=""):
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n=== {name} ===")
+    print(f"  create+append: {sessions * (1 + events_per_session) / write_s:,.0f} ops/s ({write_s:.1f}s)")
+    print(f"  get_session:   {reads / read_s:,.0f} ops/s, {missing} missing")
+    print(f"  peak RSS:      {rss_mb:,.0f} MB {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=4)
+    parser.add_argument("--reads", type=int, default=10_000)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--max-resident", type=int, default=20_000)
+    parser.add_argument("--spill-dir", default=None)
+    parser.add_argument("--compare", action="store_true", help="Also run ADK's InMemorySessionService (run it separately for a clean RSS).")
+    args = parser.parse_args()
+    random.seed(0)
+
+    if args.spill_dir:
+        shutil.rmtree(args.spill_dir, ignore_errors=True)
+    service = ShardedInMemorySessionService(num_shards=args.shards, max_sessions=args.max_resident, spill_dir=args.spill_dir)
+    results = asyncio.run(soak(service, args.sessions, args.users, args.events, args.reads))
+    _report("ShardedInMemorySessionService", args.sessions, args.events, args.reads, *results, extra=str(service.stats()))
+
+    if args.compare:
+        results = asyncio.run(soak(InMemorySessionService(), args.sessions, args.users, args.events, args.reads))
+        _report("InMemorySessionService", args.sessions, args.events, args.reads, *results)
+
+
+if __name__ == "__main__":
+    main()
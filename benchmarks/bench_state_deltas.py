@@ -0,0 +1,114 @@
+"""Write amplification and turn latency for state persistence with a large state dict.
+
+Each turn appends step_04's event shape: the user message, a transfer call,
+a tool response whose `state_delta` changes one or two keys, and the
+specialist's final answer. The session starts with `--keys` state keys of
+`--value-bytes` each. Compared:
+
+    adk-database   ADK DatabaseSessionService on SQLite (rewrites the whole state)
+    delta          SqliteSessionService, a transaction per event
+    delta+coalesce SqliteSessionService, one transaction per turn
+
+Bytes written come from /proc/self/io (all write syscalls, WAL included).
+
+    python benchmarks/bench_state_deltas.py --keys 500 --value-bytes 200 --turns 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from memory_agent.metrics import Histogram
+from memory_agent.sqlite_sessions import SqliteSessionService
+
+ACTIVITIES = ("MUSEUM", "FOOD", "OUTDOOR")
+
+
+def _bytes_written() -> int:
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _turn_events(turn: int):
+    invocation_id = f"e-{turn}"
+    activity = ACTIVITIES[turn % len(ACTIVITIES)]
+    delta = {"last_activity_type": activity, f"note_{turn % 7}": f"turn {turn} picked {activity.lower()}"}
+    return delta, [
+        Event(author="user", invocation_id=invocation_id,
+              content=types.Content(role="user", parts=[types.Part(text=f"Plan activity {turn} for me.")])),
+        Event(author="master_trip_planner", invocation_id=invocation_id,
+              content=types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                  name="transfer_to_agent", args={"agent_name": "restaurant_expert"}))])),
+        Event(author="master_trip_planner", invocation_id=invocation_id,
+              content=types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                  name="transfer_to_agent", response={"result": None}))]),
+              actions=EventActions(state_delta=delta, transfer_to_agent="restaurant_expert")),
+        Event(author="restaurant_expert", invocation_id=invocation_id,
+              content=types.Content(role="model", parts=[types.Part(text=f"Try the soba shop for activity {turn}.")])),
+    ]
+
+
+async def run(service, keys: int, value_bytes: int, turns: int):
+    state = {f"profile_{i}": "x" * value_bytes for i in range(keys)}
+    session = await service.create_session(app_name="bench", user_id="u1", state=state)
+    latency = Histogram()
+    logical = 0
+    written_before = _bytes_written()
+    for turn in range(turns):
+        delta, events = _turn_events(turn)
+        logical += len(json.dumps(delta))
+        started = time.perf_counter()
+        for event in events:
+            await service.append_event(session, event)
+        latency.observe(time.perf_counter() - started)
+    written = _bytes_written() - written_before
+    reloaded = await service.get_session(app_name="bench", user_id="u1", session_id=session.id)
+    assert reloaded.state["last_activity_type"] == ACTIVITIES[(turns - 1) % len(ACTIVITIES)]
+    return latency, written, logical
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=500)
+    parser.add_argument("--value-bytes", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        services = {
+            "delta": lambda: SqliteSessionService(os.path.join(tmp, "delta.db"), coalesce_turns=False),
+            "delta+coalesce": lambda: SqliteSessionService(os.path.join(tmp, "coalesce.db")),
+        }
+        try:
+            from google.adk.sessions import DatabaseSessionService
+            services = {"adk-database": lambda: DatabaseSessionService(db_url=f"sqlite:///{tmp}/adk.db"), **services}
+        except ImportError:
+            print("(DatabaseSessionService unavailable; install sqlalchemy to include the baseline)")
+
+        print(f"state: {args.keys} keys x {args.value_bytes} B, {args.turns} turns\n")
+        print(f"{'service':<16}{'p50 ms/turn':>12}{'p95 ms/turn':>12}{'written KB/turn':>17}{'write amp':>11}")
+        for name, make in services.items():
+            latency, written, logical = asyncio.run(run(make(), args.keys, args.value_bytes, args.turns))
+            s = latency.summary()
+            print(f"{name:<16}{s['p50_ms']:>12.2f}{s['p95_ms']:>12.2f}{written / args.turns / 1024:>17.1f}"
+                  f"{written / logical:>10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
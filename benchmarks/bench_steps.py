@@ -0,0 +1,380 @@
+"""Regression suite: every step's scenario on a scripted local fake model, checked against baselines.
+
+Each step runs in its own process (the steps all import their agent as the
+top-level module `agent`). Its models are replaced by FakeLlm with zero
+latency and a scripted tool plan, so the numbers are framework-side cost
+only: runner, callbacks, tools, session and memory services. Scenarios
+mirror the step mains:
+
+    step_01/same_session    two turns in one session
+    step_01/new_session     the same two turns in two sessions
+    step_02/sequential      foodie -> transportation chain
+    step_03/resume          SQLite session, second turn after re-fetching it
+    step_03/cross_session   prefetched digest of the previous session injected into a new one
+    step_04/variety         two routed turns (transfer + state callback)
+    step_05/save_recall     recall/save preference tools against SQLite
+    step_06/preload_budget  topic-scoped memory preload plus the budget tool
+
+Response caches the agent modules keep (SingleFlightCache) are cleared
+before every run, so each run makes the model calls a new user would.
+
+Per scenario: median wall time over `--repeat` runs, tracemalloc peak and
+allocation count of one run, bytes read/written through syscalls
+(/proc/self/io) and model calls. The run fails when a metric exceeds its
+baseline by more than the threshold in baselines.json (ratio plus an
+absolute slack; model calls must match exactly).
+
+    python benchmarks/bench_steps.py                 # compare, exit 1 on regression
+    python benchmarks/bench_steps.py --update        # record new baselines
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+RESULT_MARKER = "BENCH_RESULT "
+METRICS = ("latency_ms", "alloc_peak_kb", "alloc_blocks", "io_read_kb", "io_write_kb", "model_calls")
+STEPS = (
+    "step_01_session_agent", "step_02_multi_agent", "step_03_persistent_agent",
+    "step_04_stateful_agent", "step_05_profile_agent", "step_06_multimodal_agent",
+)
+
+
+def _io() -> tuple:
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                counters[key] = int(value)
+    except OSError:
+        pass
+    return counters.get("rchar", 0), counters.get("wchar", 0)
+
+
+def _last_user_text(llm_request) -> str:
+    for content in reversed(llm_request.contents):
+        if content.role == "user":
+            text = " ".join(p.text for p in content.parts or () if p.text)
+            if text:
+                return text
+    return ""
+
+
+# --- Child: one step's scenarios ---
+
+class Harness:
+    """Runs turns the way the step mains do: a new Runner per turn over shared services."""
+
+    def __init__(self, agent, session_service, memory_service=None, app_name=None):
+        self.agent = agent
+        self.session_service = session_service
+        self.memory_service = memory_service
+        self.app_name = app_name or agent.name
+
+    async def session(self, user_id: str, session_id=None, state=None):
+        return await self.session_service.create_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id, state=state)
+
+    async def turn(self, user_id: str, session_id: str, query: str) -> str:
+        from google.adk.runners import Runner
+        from google.genai import types
+        from memory_agent.accounting import AccountingPlugin
+        from memory_agent.callbacks import ModelErrorPlugin
+        from memory_agent.tracing import TracedSessionService, TracingPlugin
+
+        runner = Runner(agent=self.agent, app_name=self.app_name,
+                        session_service=TracedSessionService(self.session_service),
+                        memory_service=self.memory_service, plugins=[TracingPlugin(), AccountingPlugin(), ModelErrorPlugin()])
+        final_response = ""
+        async for event in runner.run_async(user_id=user_id, session_id=session_id,
+                                            new_message=types.Content(role="user", parts=[types.Part(text=query)])):
+            if event.is_final_response() and event.content and event.content.parts:
+                final_response = event.content.parts[0].text or ""
+        return final_response
+
+
+TRIP_QUERY = "Hi! I want to plan a 2-day trip to Tokyo. I'm interested in historic sites and sushi."
+FEEDBACK_QUERY = "That sounds pretty good, do you remember what I liked about the food?"
+
+
+def _itinerary_plan(llm_request):
+    return [
+        {"name": "search_agent", "args": {"request": "Historic sites and sushi in Tokyo"}},
+        {"name": "save_trip_profile", "args": {"destination": "Tokyo", "duration_days": 2,
+                                               "interests": "historic sites, sushi"}},
+        {"name": "save_itinerary_day", "args": {"day": 1, "title": "Historic Asakusa", "activities": [
+            "Morning: Senso-ji - arrive early", "Lunch: Sushi Dai - counter seats", "Afternoon: Ueno Park"]}},
+        {"name": "save_itinerary_day", "args": {"day": 2, "title": "Imperial Tokyo", "activities": [
+            "Morning: Imperial Palace East Gardens", "Lunch: Tsukiji Outer Market", "Evening: Ginza"]}},
+    ]
+
+
+def _itinerary_step(index):
+    def call(llm_request):
+        if "trip to" in _last_user_text(llm_request):
+            plan = _itinerary_plan(llm_request)
+            return plan[index] if index < len(plan) else None
+        return {"name": "get_itinerary_day", "args": {"day": 1}} if index == 0 else None
+    return call
+
+
+def _plans(step: str, agent_module):
+    """Scripted tool use per agent name, and the reply text for agents that should answer with markup."""
+    if step in ("step_01_session_agent", "step_03_persistent_agent"):
+        return {agent_module.root_agent.name: [_itinerary_step(i) for i in range(4)]}, {
+            agent_module.root_agent.name: "Here is your plan:\n[[ITINERARY]]"}
+    if step == "step_04_stateful_agent":
+        def route(llm_request):
+            instruction = str(llm_request.config.system_instruction or "")
+            match = re.search(r"The last activity type you planned was: (\w+)", instruction)
+            last = match.group(1) if match else "None"
+            agent_name = next(a for a, kind in agent_module.ACTIVITY_TYPES.items() if kind != last)
+            return {"name": "transfer_to_agent", "args": {"agent_name": agent_name}}
+        return {"master_trip_planner": [route]}, {}
+    if step == "step_05_profile_agent":
+        def save(llm_request):
+            if "remember" in _last_user_text(llm_request).lower():
+                return {"name": "save_user_preferences", "args": {"new_preferences": {"allergy": "peanuts"}}}
+            return None
+        return {"profile_planner": [{"name": "recall_user_preferences"}, save]}, {}
+    if step == "step_06_multimodal_agent":
+        def budget(llm_request):
+            if re.search(r"cost|budget", _last_user_text(llm_request), re.IGNORECASE):
+                return {"name": "calculate_trip_budget", "args": {"destination": "Gaeta", "days": 3,
+                                                                  "style": "mid-range"}}
+            return None
+        return {"TripPlanner": [budget]}, {}
+    return {}, {}
+
+
+def _load_agent_module(step: str):
+    step_dir = os.path.join(repo_root, step)
+    sys.path.insert(0, step_dir)
+    spec = importlib.util.spec_from_file_location("agent", os.path.join(step_dir, "agent.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["agent"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _scenarios(step: str, agent_module, workdir: str):
+    from memory_agent.sessions import ShardedInMemorySessionService
+
+    agent = agent_module.root_agent
+
+    async def step_01_same_session():
+        harness = Harness(agent, ShardedInMemorySessionService())
+        session = await harness.session("bench_user")
+        await harness.turn("bench_user", session.id, TRIP_QUERY)
+        await harness.turn("bench_user", session.id, FEEDBACK_QUERY)
+
+    async def step_01_new_session():
+        harness = Harness(agent, ShardedInMemorySessionService())
+        first = await harness.session("bench_user")
+        await harness.turn("bench_user", first.id, TRIP_QUERY)
+        second = await harness.session("bench_user")
+        await harness.turn("bench_user", second.id, FEEDBACK_QUERY)
+
+    async def step_02_sequential():
+        harness = Harness(agent, ShardedInMemorySessionService())
+        session = await harness.session("bench_user")
+        await harness.turn("bench_user", session.id, "Find me the best sushi in Palo Alto and then tell me how to get there.")
+
+    def sqlite_harness():
+        from memory_agent.sqlite_sessions import SqliteSessionService
+        return Harness(agent, SqliteSessionService(os.path.join(workdir, "sessions.db")))
+
+    async def step_03_resume():
+        harness = sqlite_harness()
+        session_id = f"trip_{uuid.uuid4().hex}"
+        await harness.session("user_01", session_id)
+        await harness.turn("user_01", session_id, "Hi! I'm planning a trip to Tokyo. I love ramen and I'm a vegetarian.")
+        await harness.session_service.get_session(app_name=harness.app_name, user_id="user_01", session_id=session_id)
+        await harness.turn("user_01", session_id, "Where should I go for dinner?")
+
+    async def step_03_cross_session():
+        from memory_agent.prefetch import Prefetcher, session_digest_loader
+        harness = sqlite_harness()
+        old_id = f"trip_{uuid.uuid4().hex}"
+        await harness.session("user_01", old_id)
+        await harness.turn("user_01", old_id, "Hi! I'm planning a trip to Tokyo. I love ramen and I'm a vegetarian.")
+        prefetcher = Prefetcher()
+        prefetcher.register("session_digest", session_digest_loader(harness.session_service))
+        new = await harness.session("user_01", f"trip_{uuid.uuid4().hex}")
+        prefetcher.start(harness.app_name, "user_01", new.id)  # As PrefetchingSessionService does in main.py.
+        context = await prefetcher.take(harness.app_name, "user_01", new.id, "session_digest")
+        await harness.turn("user_01", new.id, f"{context}\nI'm planning a new trip to Osaka this time. "
+                                              "Based on my previous preferences (above), what should I eat?")
+
+    async def step_04_variety():
+        harness = Harness(agent, ShardedInMemorySessionService())
+        session = await harness.session("bench_user", state={"last_activity_type": "None"})
+        await harness.turn("bench_user", session.id, "I'm in Kyoto. Plan a morning activity for me.")
+        await harness.turn("bench_user", session.id, "Great! Now plan an afternoon activity for me.")
+
+    async def step_05_save_recall():
+        harness = Harness(agent, ShardedInMemorySessionService())
+        session = await harness.session("bench_user")
+        await harness.turn("bench_user", session.id, "I am allergic to peanuts. Please remember that.")
+        await harness.turn("bench_user", session.id, "Suggest a snack for me.")
+
+    async def step_06_preload_budget():
+        from memory_agent.local_memory import LocalMemoryService
+
+        memory_service = LocalMemoryService()
+        facts = ["I loved Gaeta and its beaches.", "I prefer mid-range hotels near the sea.",
+                 "My passport expires next year.", "I enjoy seafood dinners by the harbour.",
+                 "I like travelling by train in Italy."]
+        memory_service.add_memories(agent.name, "traveler_123", [f"{fact} (trip {i})" for i in range(40) for fact in facts])
+        harness = Harness(agent, ShardedInMemorySessionService(), memory_service)
+        session = await harness.session("traveler_123")
+        await harness.turn("traveler_123", session.id, "Hello!")
+        await harness.turn("traveler_123", session.id, "I'd like a 3-day trip to Gaeta. What would it cost mid-range?")
+
+    return {
+        "step_01_session_agent": {"same_session": step_01_same_session, "new_session": step_01_new_session},
+        "step_02_multi_agent": {"sequential": step_02_sequential},
+        "step_03_persistent_agent": {"resume": step_03_resume, "cross_session": step_03_cross_session},
+        "step_04_stateful_agent": {"variety": step_04_variety},
+        "step_05_profile_agent": {"save_recall": step_05_save_recall},
+        "step_06_multimodal_agent": {"preload_budget": step_06_preload_budget},
+    }[step]
+
+
+def run_step(step: str, repeat: int) -> dict:
+    from memory_agent.agents import replace_models
+    from memory_agent.coalescing import SingleFlightCache
+    from memory_agent.fake_model import FakeLlm
+
+    workdir = tempfile.mkdtemp(prefix="bench_steps_")
+    os.chdir(workdir)  # step_05's preference DB and step_03's sessions land here.
+    agent_module = _load_agent_module(step)
+    plans, replies = _plans(step, agent_module)
+    fakes = []
+
+    def fake_for(agent, model):
+        fake = FakeLlm(model=getattr(model, "model", "gemini-2.5-flash"), latency_s=0.0, plan=plans.get(agent.name, []),
+                       **({"reply": replies[agent.name]} if agent.name in replies else {}))
+        fakes.append(fake)
+        return fake
+
+    replace_models(agent_module.root_agent, fake_for)
+    caches = [value for value in vars(agent_module).values() if isinstance(value, SingleFlightCache)]
+
+    def run(scenario):
+        for cache in caches:
+            cache.clear()
+        asyncio.run(scenario())
+
+    results = {}
+    for name, scenario in _scenarios(step, agent_module, workdir).items():
+        run(scenario)  # Warm-up: imports, schema creation.
+        latencies, reads, writes = [], [], []
+        calls_before = sum(f.calls for f in fakes)
+        for _ in range(repeat):
+            read_before, written_before = _io()
+            started = time.perf_counter()
+            run(scenario)
+            latencies.append((time.perf_counter() - started) * 1000)
+            read_after, written_after = _io()
+            reads.append(read_after - read_before)
+            writes.append(written_after - written_before)
+        model_calls = (sum(f.calls for f in fakes) - calls_before) / repeat
+
+        tracemalloc.start()
+        run(scenario)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"{step[:7]}/{name}"] = {
+            "latency_ms": round(statistics.median(latencies), 2),
+            "alloc_peak_kb": round(peak / 1024, 1),
+            "alloc_blocks": sum(stat.count for stat in snapshot.statistics("filename")),
+            "io_read_kb": round(statistics.median(reads) / 1024, 1),
+            "io_write_kb": round(statistics.median(writes) / 1024, 1),
+            "model_calls": model_calls,
+        }
+    return results
+
+
+# --- Parent: run every step and compare ---
+
+def _run_child(step: str, repeat: int) -> dict:
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", step, "--repeat", str(repeat)],
+                               capture_output=True, text=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{step} failed:\n{completed.stderr[-4000:]}")
+
+
+def regressions(current: dict, baseline: dict, thresholds: dict) -> list:
+    found = []
+    for metric in METRICS:
+        if metric not in baseline:
+            continue
+        limit = thresholds.get(metric, {"ratio": 0.2, "slack": 0})
+        allowed = baseline[metric] * (1 + limit["ratio"]) + limit["slack"]
+        if current[metric] > allowed:
+            found.append(f"{metric} {current[metric]} > {allowed:.1f} (baseline {baseline[metric]})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", nargs="+", default=list(STEPS), choices=STEPS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baselines.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_MARKER + json.dumps(run_step(args.child, args.repeat)))
+        return 0
+
+    with open(BASELINES, encoding="utf-8") as f:
+        baselines = json.load(f)
+    failed = False
+    print(f"{'scenario':<26}{'ms':>9}{'peak KB':>10}{'blocks':>9}{'read KB':>9}{'write KB':>10}{'calls':>7}  status")
+    for step in args.steps:
+        try:
+            results = _run_child(step, args.repeat)
+        except RuntimeError as e:
+            print(f"{step:<26} ERROR\n{e}")
+            failed = True
+            continue
+        for scenario, r in results.items():
+            baseline = baselines["scenarios"].get(scenario)
+            problems = regressions(r, baseline, baselines["thresholds"]) if baseline else []
+            status = "no baseline" if baseline is None else "REGRESSED: " + "; ".join(problems) if problems else "ok"
+            failed = failed or bool(problems)
+            print(f"{scenario:<26}{r['latency_ms']:>9.2f}{r['alloc_peak_kb']:>10.1f}{r['alloc_blocks']:>9}"
+                  f"{r['io_read_kb']:>9.1f}{r['io_write_kb']:>10.1f}{r['model_calls']:>7.0f}  {status}")
+            if args.update:
+                baselines["scenarios"][scenario] = r
+    if args.update:
+        with open(BASELINES, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaselines written to {BASELINES}")
+        return 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
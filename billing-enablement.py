@@ -1,6 +1,12 @@
+import argparse
+import asyncio
+import collections
 import os
+import random
 import subprocess
+import sys
 import time
+from types import SimpleNamespace
 from google.cloud import billing_v1
 from google.api_core import exceptions
 
@@ -107,9 +113,238 @@ def link_project_to_billing(client, target_project_id, billing_account_info):
     print(f"\nWarning: Could not verify billing link was active after {max_retries} attempts.")
 
 
+
+# --- Async provisioning ---
+# The section above waits out propagation with fixed sleeps (10-20s), so a link
+# that is active after 2s still costs a full interval, and only one project is
+# handled per run. Here every wait polls with exponential backoff and jitter,
+# starting under a second, projects run concurrently, and one deadline bounds
+# the whole run. The client is only used through list_billing_accounts,
+# get_project_billing_info and update_project_billing_info, so
+# FakeCloudBillingClient can stand in for it.
+
+POLL_INITIAL_S = 0.25
+POLL_MAX_INTERVAL_S = 10.0
+
+
+class ProvisioningError(Exception):
+    pass
+
+
+def _looks_like_disabled_api(error):
+    message = error.message.lower()
+    return "api has not been used" in message or "service is disabled" in message
+
+
+async def poll(check, initial_s=POLL_INITIAL_S, max_interval_s=POLL_MAX_INTERVAL_S, rng=random):
+    """Calls the blocking `check()` in a thread until it returns something truthy, and returns that.
+
+    Sleeps between attempts double from `initial_s` up to `max_interval_s`, each
+    jittered to 50-100% so concurrent projects don't poll in lockstep. There is
+    no retry limit: callers bound it with asyncio.timeout_at.
+    """
+    interval = initial_s
+    while True:
+        result = await asyncio.to_thread(check)
+        if result:
+            return result
+        await asyncio.sleep(interval * rng.uniform(0.5, 1.0))
+        interval = min(max_interval_s, interval * 2)
+
+
+async def enable_billing_api_async(project_id):
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "gcloud", "services", "enable", "cloudbilling.googleapis.com", "--project", project_id,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        raise ProvisioningError("'gcloud' command not found.")
+    _, stderr = await process.communicate()
+    if process.returncode:
+        raise ProvisioningError(f"Error enabling Cloud Billing API: {stderr.decode().strip()}")
+
+
+async def provision_project(client, project_id, waiting, enable_api=enable_billing_api_async):
+    """Links `project_id` to the first open billing account and waits until the link is active.
+
+    `waiting["for"]` always names the condition being waited on, so a caller
+    that hits its deadline can say what was still missing.
+    """
+    api_enable_requested = False
+
+    def open_accounts():
+        try:
+            accounts = list(client.list_billing_accounts())
+        except exceptions.PermissionDenied as e:
+            if not _looks_like_disabled_api(e):
+                raise ProvisioningError(f"Permission Denied while listing billing accounts: {e.message}")
+            waiting["for"] = "the Billing API / permissions to propagate"
+            return None
+        waiting["for"] = "an open billing account (has the credit been claimed?)"
+        return [account for account in accounts if account.open]
+
+    accounts = await asyncio.to_thread(open_accounts)
+    if accounts is None:
+        await enable_api(project_id)
+        api_enable_requested = True
+    if not accounts:
+        accounts = await poll(open_accounts)
+    target = accounts[0]
+
+    project_name = f"projects/{project_id}"
+
+    def current_account():
+        try:
+            return client.get_project_billing_info(name=project_name).billing_account_name
+        except exceptions.NotFound:
+            return None
+
+    result = {"account": target.display_name, "api_enable_requested": api_enable_requested}
+    if await asyncio.to_thread(current_account) == target.name:
+        return {**result, "status": "already_linked"}
+
+    waiting["for"] = "the link request to be accepted"
+    try:
+        await asyncio.to_thread(
+            client.update_project_billing_info,
+            name=project_name,
+            project_billing_info=billing_v1.ProjectBillingInfo(billing_account_name=target.name),
+        )
+    except exceptions.PermissionDenied as e:
+        raise ProvisioningError(
+            f"Permission Denied. You may not have 'roles/billing.projectManager' on the project. Message: {e.message}"
+        )
+
+    waiting["for"] = "the billing link to become active"
+
+    def link_active():
+        # Like the synchronous verification, any error (NotFound while the link
+        # propagates, a transient API error) is retried until the deadline.
+        try:
+            info = client.get_project_billing_info(name=project_name)
+        except Exception as e:
+            waiting["for"] = f"the billing link to become active (last error: {e})"
+            return False
+        waiting["for"] = "the billing link to become active"
+        return info.billing_account_name == target.name and info.billing_enabled
+
+    await poll(link_active)
+    return {**result, "status": "linked"}
+
+
+async def provision_projects(client, project_ids, deadline_s=300.0, max_concurrency=8,
+                             enable_api=enable_billing_api_async):
+    """Provisions every project concurrently; returns {project_id: result} once all finish or the deadline passes."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_s
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def one(project_id):
+        waiting = {"for": "a free provisioning slot"}
+        started = loop.time()
+        try:
+            async with asyncio.timeout_at(deadline):
+                async with semaphore:
+                    result = await provision_project(client, project_id, waiting, enable_api)
+        except TimeoutError:
+            result = {"status": "timeout", "error": f"Deadline reached while waiting for {waiting['for']}."}
+        except ProvisioningError as e:
+            result = {"status": "failed", "error": str(e)}
+        except Exception as e:
+            result = {"status": "failed", "error": f"Unexpected error: {e}"}
+        result["elapsed_s"] = round(loop.time() - started, 2)
+        icon = "✅" if result["status"] in ("linked", "already_linked") else "❌"
+        print(f"{icon} {project_id}: {result['status']} in {result['elapsed_s']}s {result.get('error', '')}".rstrip())
+        return project_id, result
+
+    return dict(await asyncio.gather(*(one(p) for p in project_ids)))
+
+
+class FakeCloudBillingClient:
+    """An in-memory CloudBillingClient with the propagation delays seen on fresh projects (seconds from creation).
+
+    Until `api_ready_after_s` listing accounts fails like a disabled API; until
+    `accounts_visible_after_s` the list is empty (credit not applied yet); a
+    link reports billing_enabled only `link_active_after_s` after it was made.
+    """
+
+    def __init__(self, api_ready_after_s=1.0, accounts_visible_after_s=2.0, link_active_after_s=1.5,
+                 open_account=True):
+        self.api_ready_after_s = api_ready_after_s
+        self.accounts_visible_after_s = accounts_visible_after_s
+        self.link_active_after_s = link_active_after_s
+        self.account = SimpleNamespace(name="billingAccounts/000000-FAKE00-000000",
+                                       display_name="Fake trial credit", open=open_account)
+        self.calls = collections.Counter()
+        self._created = time.monotonic()
+        self._links = {}
+
+    def list_billing_accounts(self):
+        self.calls["list_billing_accounts"] += 1
+        elapsed = time.monotonic() - self._created
+        if elapsed < self.api_ready_after_s:
+            raise exceptions.PermissionDenied(
+                "Cloud Billing API has not been used in this project before or it is disabled.")
+        return [self.account] if elapsed >= self.accounts_visible_after_s else []
+
+    def get_project_billing_info(self, name):
+        self.calls["get_project_billing_info"] += 1
+        if name not in self._links:
+            raise exceptions.NotFound(f"{name} has no billing info.")
+        account_name, linked_at = self._links[name]
+        return SimpleNamespace(name=name, billing_account_name=account_name,
+                               billing_enabled=time.monotonic() - linked_at >= self.link_active_after_s)
+
+    def update_project_billing_info(self, name, project_billing_info):
+        self.calls["update_project_billing_info"] += 1
+        self._links[name] = (project_billing_info.billing_account_name, time.monotonic())
+        return project_billing_info
+
+
+async def _fake_enable_api(project_id):
+    await asyncio.sleep(0.1)
+
+
+def print_action_required():
+    print("\n----------------- ACTION REQUIRED -----------------")
+    print("No active billing account was found for your user before the deadline.")
+    print("This usually happens if the free trial credit for this event has not been")
+    print("activated or is still being processed.")
+    print("\n**Next Steps:**")
+    print("  1. Please double-check the instructions from the event organizer and ensure")
+    print("     you have CLAIMED YOUR CREDIT.")
+    print("  2. If you have just claimed it, please wait another minute for it to apply.")
+    print("  3. Once confirmed, please run the `./init.sh` script again.")
+    print("---------------------------------------------------")
+
+
+def run_async(args):
+    project_ids = args.projects
+    if not project_ids:
+        project_id = get_project_id_from_file()
+        if not project_id:
+            print("\nScript finished with a critical error: Could not determine Project ID.")
+            return 0
+        project_ids = [project_id]
+
+    if args.fake:
+        client, enable_api = FakeCloudBillingClient(), _fake_enable_api
+    else:
+        client, enable_api = billing_v1.CloudBillingClient(), enable_billing_api_async
+    started = time.monotonic()
+    results = asyncio.run(provision_projects(client, project_ids, args.deadline, args.concurrency, enable_api))
+    done = sum(r["status"] in ("linked", "already_linked") for r in results.values())
+    print(f"\n--- {done}/{len(results)} projects linked in {time.monotonic() - started:.1f}s ---")
+    if any("credit" in r.get("error", "") for r in results.values()):
+        print_action_required()
+    # Like the sync flow, a single-project init.sh run never fails the setup; explicit --projects runs do.
+    return 0 if done == len(results) or not args.projects else 1
+
+
 # --- MAIN BLOCK ---
 
-if __name__ == "__main__":
+def run_sync():
     print("--- Starting GCP Billing Management Script ---")
     project_id = get_project_id_from_file()
 
@@ -172,4 +407,19 @@ if __name__ == "__main__":
             print("\nScript finished with an unrecoverable error: The Billing API did not become active or you have a permissions issue.")
             print("Please manually verify the IAM role 'Billing Account User' is granted on the Organization.")
         else:
-            print("\nScript finished with an unrecoverable error. Please review the logs above.")
\ No newline at end of file
+            print("\nScript finished with an unrecoverable error. Please review the logs above.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Link GCP projects to an open billing account.")
+    parser.add_argument("--projects", nargs="+", help="Project IDs to provision (default: the one in ~/project_id.txt).")
+    parser.add_argument("--deadline", type=float, default=300.0, help="Overall deadline in seconds.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Projects provisioned at once.")
+    parser.add_argument("--fake", action="store_true", help="Use FakeCloudBillingClient instead of calling GCP.")
+    parser.add_argument("--sync", action="store_true", help="Use the original one-project, fixed-interval flow.")
+    args = parser.parse_args()
+
+    if args.sync:
+        run_sync()
+    else:
+        sys.exit(run_async(args))
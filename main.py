@@ -1,5 +1,5 @@
-def main():
-    print("Hello from memory-agent!")
+"""Service entry point: serves the step agents over HTTP (see memory_agent/serve.py for options)."""
+from memory_agent.serve import main
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""Shared runtime helpers used by the step agents (tool execution, metrics, ...)."""
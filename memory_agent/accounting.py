@@ -0,0 +1,283 @@
+"""Per-turn token, call and latency accounting, kept in an append-only ledger.
+
+`AccountingPlugin` counts, for every agent that runs in an invocation (one
+user turn), the model calls, input/output tokens, tool calls and time spent
+in each. When the turn ends it appends one fixed-size record per agent to
+the ledger. Set MEMORY_AGENT_LEDGER to a file path to keep them; otherwise
+they stay in memory. A turn that never ends (cancelled, or the run raised)
+is appended with what it used so far once it is `max_turn_s` old, so the
+plugin's in-flight state stays bounded.
+
+The ledger is a flat file of 68-byte records. Strings (app, user, session,
+agent) are stored as 64-bit hashes, with each hash's text appended once to
+`<ledger>.strings`. Appends are single unbuffered writes, so several
+processes (batch --processes, serve workers) can share one ledger.
+
+Compare the steps' designs per turn with:
+
+    python -m memory_agent.accounting ledger.bin --by app
+    python -m memory_agent.accounting ledger.bin --by session --app master_trip_planner
+"""
+import argparse
+import collections
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+# timestamp, invocation, app, user, session, agent, input/output tokens, model/tool calls, model/tool ms
+_RECORD = struct.Struct("<dQQQQQIIHHff")
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+class LedgerEntry(NamedTuple):
+    timestamp: float
+    invocation: int
+    app: str
+    user_id: str
+    session_id: str
+    agent: str
+    input_tokens: int
+    output_tokens: int
+    model_calls: int
+    tool_calls: int
+    model_ms: float
+    tool_ms: float
+
+
+class Ledger:
+    """Append-only store of LedgerEntry records; in memory when `path` is None."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._strings: Dict[int, str] = {}
+        self._records: List[bytes] = []
+        self._file = self._strings_file = None
+        if path:
+            self._load_strings()
+            self._file = open(path, "ab", buffering=0)
+            self._strings_file = open(f"{path}.strings", "ab", buffering=0)
+
+    @classmethod
+    def from_env(cls) -> "Ledger":
+        return cls(os.getenv("MEMORY_AGENT_LEDGER") or None)
+
+    def _load_strings(self):
+        if not os.path.exists(f"{self.path}.strings"):
+            return
+        with open(f"{self.path}.strings", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    key, text = json.loads(line)
+                    self._strings[key] = text
+
+    def _intern(self, text: str) -> int:
+        key = _hash(text)
+        if key not in self._strings:
+            self._strings[key] = text
+            if self._strings_file:
+                self._strings_file.write((json.dumps([key, text], ensure_ascii=False) + "\n").encode())
+        return key
+
+    def append(self, entry: LedgerEntry):
+        with self._lock:
+            record = _RECORD.pack(
+                entry.timestamp, entry.invocation, self._intern(entry.app), self._intern(entry.user_id),
+                self._intern(entry.session_id), self._intern(entry.agent), entry.input_tokens, entry.output_tokens,
+                min(entry.model_calls, 0xFFFF), min(entry.tool_calls, 0xFFFF), entry.model_ms, entry.tool_ms)
+            if self._file:
+                self._file.write(record)
+            else:
+                self._records.append(record)
+
+    def entries(self) -> Iterator[LedgerEntry]:
+        """Every complete record; a torn record at the end (from a crash) is skipped."""
+        if self.path:
+            self._load_strings()  # Other processes may have added strings.
+            with open(self.path, "rb") as f:
+                data = f.read()
+        else:
+            with self._lock:
+                data = b"".join(self._records)
+        usable = len(data) - len(data) % _RECORD.size
+        for fields in _RECORD.iter_unpack(data[:usable]):
+            ts, invocation, app, user, session, agent, *counters = fields
+            names = [self._strings.get(key, f"#{key:x}") for key in (app, user, session, agent)]
+            yield LedgerEntry(ts, invocation, *names, *counters)
+
+    def close(self):
+        for f in (self._file, self._strings_file):
+            if f:
+                f.close()
+
+
+ledger = Ledger.from_env()
+
+
+# --- ADK integration ---
+
+class _Usage:
+    __slots__ = ("input_tokens", "output_tokens", "model_calls", "tool_calls", "model_ms", "tool_ms")
+
+    def __init__(self):
+        self.input_tokens = self.output_tokens = self.model_calls = self.tool_calls = 0
+        self.model_ms = self.tool_ms = 0.0
+
+
+class AccountingPlugin(BasePlugin):
+    """Counts model and tool usage per (invocation, agent) and appends it to the ledger when the turn ends."""
+
+    def __init__(self, ledger: Ledger = ledger, name: str = "accounting", max_turn_s: float = 3600.0):
+        super().__init__(name=name)
+        self.ledger = ledger
+        self.max_turn_s = max_turn_s
+        self._turns: Dict[str, tuple] = {}  # invocation_id -> (started, app, user, session)
+        self._usage: Dict[str, Dict[str, _Usage]] = {}
+        self._model_started: Dict[tuple, float] = {}  # (invocation_id, agent) -> perf_counter
+        self._tool_started: Dict[tuple, float] = {}  # (invocation_id, function_call_id) -> perf_counter
+        self._next_sweep = time.monotonic() + max_turn_s / 4
+
+    def _usage_for(self, invocation_id: str, agent_name: str) -> _Usage:
+        by_agent = self._usage.setdefault(invocation_id, {})
+        usage = by_agent.get(agent_name)
+        if usage is None:
+            usage = by_agent[agent_name] = _Usage()
+        return usage
+
+    async def before_run_callback(self, *, invocation_context):
+        session = invocation_context.session
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._expire(now)
+        self._turns[invocation_context.invocation_id] = (now, invocation_context.app_name, session.user_id, session.id)
+
+    async def after_run_callback(self, *, invocation_context):
+        self._end_turn(invocation_context.invocation_id)
+
+    def _end_turn(self, invocation_id: str):
+        turn = self._turns.pop(invocation_id, None)
+        by_agent = self._usage.pop(invocation_id, {})
+        if turn is None:
+            return
+        now, invocation = time.time(), _hash(invocation_id)
+        for agent_name, u in by_agent.items():
+            self.ledger.append(LedgerEntry(now, invocation, *turn[1:], agent_name, u.input_tokens, u.output_tokens,
+                                           u.model_calls, u.tool_calls, u.model_ms, u.tool_ms))
+
+    def _expire(self, now: float):
+        """Ends turns older than `max_turn_s` and drops timers and usage no open turn owns."""
+        self._next_sweep = now + self.max_turn_s / 4
+        for invocation_id, turn in list(self._turns.items()):
+            if now - turn[0] > self.max_turn_s:
+                self._end_turn(invocation_id)
+        for started in (self._model_started, self._tool_started):
+            for key in [key for key in started if key[0] not in self._turns]:
+                del started[key]
+        for invocation_id in [i for i in self._usage if i not in self._turns]:
+            del self._usage[invocation_id]
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        self._model_started[(callback_context.invocation_id, callback_context.agent_name)] = time.perf_counter()
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        started = self._model_started.pop(key, None)
+        usage = self._usage_for(*key)
+        usage.model_calls += 1
+        if started is not None:
+            usage.model_ms += (time.perf_counter() - started) * 1000
+        metadata = llm_response.usage_metadata
+        if metadata:
+            usage.input_tokens += metadata.prompt_token_count or 0
+            usage.output_tokens += metadata.candidates_token_count or 0
+        return None
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        started = self._model_started.pop(key, None)
+        usage = self._usage_for(*key)
+        usage.model_calls += 1
+        if started is not None:
+            usage.model_ms += (time.perf_counter() - started) * 1000
+        return None
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self._tool_started[(tool_context.invocation_id, tool_context.function_call_id)] = time.perf_counter()
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        self._end_tool(tool_context)
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        self._end_tool(tool_context)
+
+    def _end_tool(self, tool_context):
+        started = self._tool_started.pop((tool_context.invocation_id, tool_context.function_call_id), None)
+        usage = self._usage_for(tool_context.invocation_id, tool_context.agent_name)
+        usage.tool_calls += 1
+        if started is not None:
+            usage.tool_ms += (time.perf_counter() - started) * 1000
+        return None
+
+
+# --- Aggregation ---
+
+GROUP_FIELDS = ("app", "agent", "user_id", "session_id")
+
+
+def aggregate(entries: Iterator[LedgerEntry], by: str = "app", app: Optional[str] = None,
+              since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """Totals and per-turn averages grouped by one of GROUP_FIELDS."""
+    totals: Dict[str, Dict[str, Any]] = collections.defaultdict(lambda: collections.defaultdict(float))
+    turns: Dict[str, set] = collections.defaultdict(set)
+    sessions: Dict[str, set] = collections.defaultdict(set)
+    for entry in entries:
+        if (app and entry.app != app) or (since and entry.timestamp < since):
+            continue
+        key = getattr(entry, by)
+        turns[key].add(entry.invocation)
+        sessions[key].add(entry.session_id)
+        for field in ("input_tokens", "output_tokens", "model_calls", "tool_calls", "model_ms", "tool_ms"):
+            totals[key][field] += getattr(entry, field)
+    report = {}
+    for key, total in sorted(totals.items()):
+        n = len(turns[key])
+        report[key] = {
+            "turns": n,
+            "sessions": len(sessions[key]),
+            **{field: round(value) for field, value in total.items()},
+            **{f"{field}_per_turn": round(value / n, 2) for field, value in total.items()},
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate an accounting ledger and compare agents per turn.")
+    parser.add_argument("ledger", help="Ledger file (MEMORY_AGENT_LEDGER)")
+    parser.add_argument("--by", choices=GROUP_FIELDS, default="app")
+    parser.add_argument("--app", help="Only this app.")
+    parser.add_argument("--since-hours", type=float, help="Only records from the last N hours.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    report = aggregate(Ledger(args.ledger).entries(), args.by, args.app, since)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.by:<28}{'turns':>7}{'sessions':>9}{'model/turn':>11}{'tools/turn':>11}"
+              f"{'in tok/turn':>12}{'out tok/turn':>13}{'model ms/turn':>14}{'tool ms/turn':>13}")
+        for key, r in report.items():
+            print(f"{key[:27]:<28}{r['turns']:>7}{r['sessions']:>9}{r['model_calls_per_turn']:>11.2f}"
+                  f"{r['tool_calls_per_turn']:>11.2f}{r['input_tokens_per_turn']:>12.0f}"
+                  f"{r['output_tokens_per_turn']:>13.0f}{r['model_ms_per_turn']:>14.0f}{r['tool_ms_per_turn']:>13.0f}")
@@ -0,0 +1,219 @@
+"""Admission control for model calls: rate limits, priorities, bounded concurrency, retries.
+
+Every agent targets the same model, and without a limit a burst of sessions
+fans out until the backend throttles. `AdmissionController` gives each model:
+
+- a token bucket (requests/second with a burst allowance),
+- a concurrency limit whose free slots go to the highest-priority waiter
+  (interactive turns ahead of background work such as memory consolidation),
+- queue-time histograms per model and priority.
+
+`AdmissionControlledLlm` wraps an agent's model with the controller and
+retries retriable errors (429/5xx) with full-jitter exponential backoff, as
+long as no response of the failed attempt has been passed on (responses are
+streamed as they arrive).
+`install_admission_control(root_agent)` wraps a whole agent tree.
+
+Mark background work with `with request_priority(BACKGROUND): ...`.
+Limits come from MEMORY_AGENT_MODEL_RPS, MEMORY_AGENT_MODEL_BURST,
+MEMORY_AGENT_MODEL_CONCURRENCY and MEMORY_AGENT_MODEL_RETRIES.
+"""
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import time
+import weakref
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors
+from pydantic import Field
+
+from .agents import replace_models
+from .log import get_logger
+from .metrics import Histogram
+
+logger = get_logger("admission")
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("memory_agent_priority", default=INTERACTIVE)
+
+RETRIABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@contextlib.contextmanager
+def request_priority(priority: int):
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def is_retriable(error: BaseException) -> bool:
+    if isinstance(error, errors.APIError):
+        return error.code in RETRIABLE_STATUS_CODES
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return (isinstance(code, int) and code in RETRIABLE_STATUS_CODES) or isinstance(error, (TimeoutError, ConnectionError))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_s)
+
+
+class _ModelGate:
+    """Concurrency slots handed out in priority order, plus the model's token bucket."""
+
+    def __init__(self, max_concurrency: int, rate_per_s: float, burst: int, queue_time: Dict[int, Histogram]):
+        self.free = max_concurrency
+        self.bucket = TokenBucket(rate_per_s, burst)
+        self.waiters: List[tuple] = []
+        self.sequence = itertools.count()
+        self.queue_time = queue_time
+
+    async def acquire(self, priority: int):
+        queued_at = time.perf_counter()
+        if self.free > 0 and not self.waiters:
+            self.free -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            entry = (priority, next(self.sequence), future)
+            heapq.heappush(self.waiters, entry)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release()  # We were handed a slot just as we got cancelled.
+                else:
+                    self.waiters.remove(entry)
+                    heapq.heapify(self.waiters)
+                raise
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.release()
+            raise
+        self.queue_time.setdefault(priority, Histogram()).observe(time.perf_counter() - queued_at)
+
+    def release(self):
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)  # Hand our slot straight to the next waiter.
+                return
+        self.free += 1
+
+
+class AdmissionController:
+    def __init__(self, rate_per_s: float = 10.0, burst: int = 20, max_concurrency: int = 8):
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        # Gates hold loop-bound futures and locks, so they are kept per event loop
+        # and dropped with it (a closed loop's id can be reused by the next one).
+        self._gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _ModelGate]]" = weakref.WeakKeyDictionary()
+        # model -> priority -> queue time, shared by that model's gates on every loop.
+        self.queue_time: Dict[str, Dict[int, Histogram]] = {}
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            rate_per_s=float(os.getenv("MEMORY_AGENT_MODEL_RPS", "10")),
+            burst=int(os.getenv("MEMORY_AGENT_MODEL_BURST", "20")),
+            max_concurrency=int(os.getenv("MEMORY_AGENT_MODEL_CONCURRENCY", "8")),
+        )
+
+    def _gate(self, model: str) -> _ModelGate:
+        loop = asyncio.get_running_loop()
+        gates = self._gates.get(loop)
+        if gates is None:
+            gates = self._gates[loop] = {}
+        gate = gates.get(model)
+        if gate is None:
+            gate = gates[model] = _ModelGate(self.max_concurrency, self.rate_per_s, self.burst,
+                                             self.queue_time.setdefault(model, {}))
+        return gate
+
+    @contextlib.asynccontextmanager
+    async def admit(self, model: str, priority: Optional[int] = None):
+        gate = self._gate(model)
+        await gate.acquire(_priority.get() if priority is None else priority)
+        try:
+            yield
+        finally:
+            gate.release()
+
+    def report(self) -> Dict[str, Any]:
+        queue_time: Dict[str, Dict[str, Any]] = {}
+        for model, histograms in self.queue_time.items():
+            for priority, histogram in histograms.items():
+                label = "interactive" if priority == INTERACTIVE else "background" if priority == BACKGROUND else str(priority)
+                queue_time.setdefault(model, {})[label] = histogram.summary()
+        return {"queue_time": queue_time, "retries": self.retries, "failures": self.failures}
+
+
+admission_controller = AdmissionController.from_env()
+
+
+class AdmissionControlledLlm(BaseLlm):
+    """Runs the inner model's calls through an AdmissionController, retrying throttling errors."""
+
+    inner: BaseLlm
+    # default_factory: pydantic would deep-copy a plain default and un-share the controller.
+    controller: Any = Field(default_factory=lambda: admission_controller, exclude=True)
+    max_attempts: int = int(os.getenv("MEMORY_AGENT_MODEL_RETRIES", "4")) + 1
+    backoff_base_s: float = 0.5
+    backoff_cap_s: float = 20.0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        for attempt in range(self.max_attempts):
+            yielded = False
+            try:
+                async with self.controller.admit(self.model):
+                    # Streamed as they arrive; once a response has reached the caller the call can't be retried.
+                    async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                        yielded = True
+                        yield response
+            except Exception as e:
+                if yielded or not is_retriable(e) or attempt == self.max_attempts - 1:
+                    self.controller.failures += 1
+                    raise
+                self.controller.retries += 1
+                delay = random.uniform(0, min(self.backoff_cap_s, self.backoff_base_s * 2 ** attempt))
+                logger.warning("Model %s call failed (%s); retry %d in %.2fs", self.model, e, attempt + 1, delay)
+                await asyncio.sleep(delay)
+                continue
+            return
+
+
+def install_admission_control(agent: BaseAgent, controller: AdmissionController = admission_controller):
+    """Wraps every model in the agent tree; already-wrapped models are left alone."""
+    replace_models(agent, lambda _, model: model if isinstance(model, AdmissionControlledLlm)
+                   else AdmissionControlledLlm(model=model.model, inner=model, controller=controller))
@@ -0,0 +1,47 @@
+"""Helpers for rewiring an existing agent tree (models, callbacks) without editing agent.py."""
+from typing import Callable, Iterator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.tools.agent_tool import AgentTool
+
+
+def iter_llm_agents(agent: BaseAgent) -> Iterator[LlmAgent]:
+    """Yields every LlmAgent in the tree once, parents before children, including agents wrapped in AgentTools."""
+    seen = set()
+    stack = [agent]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, LlmAgent):
+            yield current
+            stack.extend(tool.agent for tool in reversed(current.tools) if isinstance(tool, AgentTool))
+        stack.extend(reversed(current.sub_agents))
+
+
+def replace_models(agent: BaseAgent, factory: Callable[[LlmAgent, BaseLlm], BaseLlm]):
+    """Sets `model = factory(llm_agent, current_model)` on every LlmAgent in the tree.
+
+    Current models are resolved for the whole tree first, so an agent that
+    inherits its parent's model is not wrapped twice.
+    """
+    current = [(a, a.canonical_model) for a in iter_llm_agents(agent)]
+    for llm_agent, model in current:
+        llm_agent.model = factory(llm_agent, model)
+
+
+def add_callback(agent: LlmAgent, name: str, callback: Callable, first: bool = False):
+    """Adds a callback (e.g. 'before_tool_callback') alongside any the agent already has.
+
+    ADK stops at the first callback that returns a value, so observers that
+    must always run should be added with `first=True` and return None.
+    """
+    existing = getattr(agent, name)
+    callbacks = [] if existing is None else list(existing) if isinstance(existing, list) else [existing]
+    if first:
+        callbacks.insert(0, callback)
+    else:
+        callbacks.append(callback)
+    setattr(agent, name, callbacks)
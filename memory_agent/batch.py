@@ -0,0 +1,331 @@
+"""Runs a JSONL file of scripted conversations through a step's agent.
+
+Each input line is one conversation:
+
+    {"id": "kyoto-17", "user_id": "u17", "state": {"last_activity_type": "None"},
+     "turns": ["I'm in Kyoto. Plan a morning activity for me.", "Now the afternoon."]}
+
+Only "turns" is required; "id" defaults to the line number and "user_id" to
+"batch_<id>". A line that isn't a JSON object gets an error result under its
+line number instead of stopping the batch. Conversations run `--concurrency` at a time per process (each
+in its own session), optionally across `--processes` worker processes, and
+one result line per conversation is appended to the output as it finishes:
+
+    {"id": "kyoto-17", "status": "ok", "session_id": "...", "responses": ["...", "..."], "seconds": 4.2}
+
+The output doubles as the checkpoint: rerunning the same command skips ids
+already written (a half-written last line from a crash is discarded), so an
+interrupted batch resumes where it stopped. Model calls run at BACKGROUND
+priority so a batch sharing a process with live sessions yields to them.
+
+    python -m memory_agent.batch step_04_stateful_agent conversations.jsonl results.jsonl --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterator, Set
+
+from .admission import BACKGROUND, INTERACTIVE, request_priority
+from .log import get_logger
+from .metrics import Histogram
+
+logger = get_logger("batch")
+
+
+def read_conversations(path: str, skip_ids: Set[str] = frozenset(), rank: int = 0, world: int = 1) -> Iterator[Dict[str, Any]]:
+    """Streams this worker's share (line number % world == rank) of the input, minus finished ids."""
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f):
+            if lineno % world != rank or not line.strip():
+                continue
+            try:
+                conversation = json.loads(line)
+                if not isinstance(conversation, dict):
+                    raise ValueError(f"expected a JSON object, got {type(conversation).__name__}")
+            except ValueError as e:
+                if str(lineno) not in skip_ids:
+                    # Already a result: run_conversations writes it without running anything.
+                    yield {"id": str(lineno), "status": "error", "session_id": None, "responses": [], "seconds": 0.0,
+                           "error": f"Invalid input on line {lineno + 1}: {e}"}
+                continue
+            conversation["id"] = str(conversation.get("id", lineno))
+            if conversation["id"] not in skip_ids:
+                yield conversation
+
+
+def completed_ids(output_path: str, retry_errors: bool = False) -> Set[str]:
+    """Ids already in the output; truncates a trailing partial line left by a crash.
+
+    With `retry_errors`, error results are removed from the output (rewritten
+    through a temp file) so a retried conversation ends up with one result.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    tmp_path = f"{output_path}.tmp"
+    kept = open(tmp_path, "wb") if retry_errors else None
+    errors = 0
+    try:
+        with open(output_path, "rb+") as f:
+            good = 0
+            for line in f:
+                try:
+                    result = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    result = None
+                if result is None or "id" not in result:
+                    break
+                good += len(line)
+                if retry_errors and result.get("status") == "error":
+                    errors += 1
+                    continue
+                done.add(str(result["id"]))
+                if kept:
+                    kept.write(line)
+            f.truncate(good)
+        if kept:
+            kept.flush()
+            os.fsync(kept.fileno())
+    finally:
+        if kept:
+            kept.close()
+    if retry_errors:
+        if errors:
+            os.replace(tmp_path, output_path)
+            logger.info("Retrying %d failed conversations from %s", errors, output_path)
+        else:
+            os.remove(tmp_path)
+    return done
+
+
+# --- Running conversations ---
+
+class _StepRunner:
+    """One Runner and set of services for the loaded step, shared by every conversation."""
+
+    def __init__(self, step: str, add_to_memory: bool):
+        from google.adk.runners import Runner
+        from .accounting import AccountingPlugin
+        from .callbacks import ModelErrorPlugin
+        from .sessions import ShardedInMemorySessionService
+        from .steps import load_step_main, step_root_agent
+        from .tracing import TracedMemoryService, TracedSessionService, TracingPlugin
+
+        main_module = load_step_main(step)
+        self.agent = step_root_agent()
+        self.app_name = getattr(main_module, "APP_NAME", self.agent.name)
+        # Use the services the step's own scenario uses: step_06 builds them at
+        # import time and step_03 persists to SQLite; the rest are in-memory.
+        self.session_service = getattr(main_module, "session_service", None)
+        if self.session_service is None and hasattr(main_module, "SESSION_DB_FILE"):
+            from .sqlite_sessions import SqliteSessionService
+            self.session_service = SqliteSessionService(main_module.SESSION_DB_FILE)
+        if self.session_service is None:
+            self.session_service = ShardedInMemorySessionService()
+        self.memory_service = getattr(main_module, "memory_service", None)
+        self.add_to_memory = add_to_memory and self.memory_service is not None
+        self.runner = Runner(
+            agent=self.agent,
+            app_name=self.app_name,
+            session_service=TracedSessionService(self.session_service),
+            memory_service=TracedMemoryService(self.memory_service) if self.memory_service is not None else None,
+            plugins=[TracingPlugin(), AccountingPlugin(), ModelErrorPlugin()],
+        )
+        self._locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def session_lock(self, user_id: str, session_id: str) -> asyncio.Lock:
+        """The lock to hold for a whole turn; concurrent turns on one session would interleave events."""
+        if hasattr(self.session_service, "session_lock"):
+            return self.session_service.session_lock(self.app_name, user_id, session_id)
+        key = (user_id, session_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def stream_turn(self, user_id: str, session_id: str, query: str, partial: bool = False):
+        """The turn's events; with `partial`, models stream (SSE mode) and partial text events are included."""
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+        from google.genai import types
+
+        return self.runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=types.Content(parts=[types.Part(text=query)], role="user"),
+            run_config=RunConfig(streaming_mode=StreamingMode.SSE if partial else StreamingMode.NONE),
+        )
+
+    async def run(self, conversation: Dict[str, Any]) -> Dict[str, Any]:
+        user_id = conversation.get("user_id") or f"batch_{conversation['id']}"
+        result: Dict[str, Any] = {"id": conversation["id"], "status": "ok", "session_id": None, "responses": []}
+        started = time.perf_counter()
+        try:
+            session = await self.session_service.create_session(
+                app_name=self.app_name, user_id=user_id, state=conversation.get("state"))
+            result["session_id"] = session.id
+            for query in conversation["turns"]:
+                final_response = ""
+                async for event in self.stream_turn(user_id, session.id, query):
+                    if event.is_final_response() and event.content and event.content.parts:
+                        final_response = event.content.parts[0].text or ""
+                result["responses"].append(final_response)
+            if self.add_to_memory:
+                finished = await self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session.id)
+                await self.memory_service.add_session_to_memory(finished)
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+
+async def run_conversations(step_runner: _StepRunner, conversations: Iterator[Dict[str, Any]], concurrency: int,
+                            emit: Callable[[Dict[str, Any]], None]):
+    """Keeps `concurrency` conversations in flight, pulling from the iterator as slots free up."""
+
+    async def one(conversation):
+        emit(await step_runner.run(conversation))
+
+    pending: Set[asyncio.Task] = set()
+    for conversation in conversations:
+        if conversation.get("status") == "error":  # An input line that couldn't be read.
+            emit(conversation)
+            continue
+        if len(pending) >= concurrency:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        pending.add(asyncio.create_task(one(conversation)))
+    if pending:
+        await asyncio.wait(pending)
+
+
+def _run_worker(step: str, input_path: str, skip_ids: Set[str], rank: int, world: int, concurrency: int,
+                priority: int, add_to_memory: bool, emit: Callable[[Dict[str, Any]], None]):
+    step_runner = _StepRunner(step, add_to_memory)
+    conversations = read_conversations(input_path, skip_ids, rank, world)
+    with request_priority(priority):
+        asyncio.run(run_conversations(step_runner, conversations, concurrency, emit))
+
+
+def _process_main(results: "multiprocessing.Queue", *args):
+    try:
+        _run_worker(*args, emit=results.put)
+    finally:
+        results.put(None)
+
+
+# --- Output and reporting ---
+
+class _ResultWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+        self.started = time.perf_counter()
+        self.conversations = 0
+        self.turns = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+    def write(self, result: Dict[str, Any]):
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._file.flush()  # Each flushed line is a checkpoint.
+        self.conversations += 1
+        self.turns += len(result["responses"])
+        self.errors += result["status"] == "error"
+        self.latency.observe(result["seconds"])
+        if self.conversations % 100 == 0:
+            logger.info("%d conversations done (%.1f/s)", self.conversations, self.conversations / self.elapsed())
+
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.started, 1e-9)
+
+    def close(self):
+        self._file.close()
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = self.elapsed()
+        return {
+            "conversations": self.conversations,
+            "errors": self.errors,
+            "turns": self.turns,
+            "seconds": round(elapsed, 2),
+            "conversations_per_s": round(self.conversations / elapsed, 2),
+            "turns_per_s": round(self.turns / elapsed, 2),
+            "conversation_latency": self.latency.summary(),
+        }
+
+
+def run_batch(step: str, input_path: str, output_path: str, concurrency: int = 16, processes: int = 1,
+              priority: int = BACKGROUND, add_to_memory: bool = False, restart: bool = False,
+              retry_errors: bool = False) -> Dict[str, Any]:
+    if restart and os.path.exists(output_path):
+        os.remove(output_path)
+    skip_ids = completed_ids(output_path, retry_errors)
+    if skip_ids:
+        logger.info("Resuming: %d conversations already in %s", len(skip_ids), output_path)
+    writer = _ResultWriter(output_path)
+    try:
+        if processes <= 1:
+            _run_worker(step, input_path, skip_ids, 0, 1, concurrency, priority, add_to_memory, writer.write)
+        else:
+            _run_processes(step, input_path, skip_ids, processes, concurrency, priority, add_to_memory, writer)
+    finally:
+        writer.close()
+    return writer.report()
+
+
+def _run_processes(step: str, input_path: str, skip_ids: Set[str], processes: int, concurrency: int, priority: int,
+                   add_to_memory: bool, writer: _ResultWriter):
+    # Spawned, not forked: each worker imports the step (and its `agent` module) from scratch.
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue(maxsize=1024)
+    workers = [
+        context.Process(target=_process_main,
+                        args=(results, step, input_path, skip_ids, rank, processes, concurrency, priority, add_to_memory))
+        for rank in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    running = len(workers)
+    while running:
+        try:
+            result = results.get(timeout=1.0)
+        except queue.Empty:
+            if not any(w.is_alive() for w in workers):
+                logger.warning("Batch workers exited without finishing; rerun to resume.")
+                break
+            continue
+        if result is None:
+            running -= 1
+        else:
+            writer.write(result)
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a JSONL file of conversations through a step's agent.")
+    parser.add_argument("step")
+    parser.add_argument("input", help="JSONL conversations")
+    parser.add_argument("output", help="JSONL results; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Conversations in flight per process.")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--priority", choices=["background", "interactive"], default="background")
+    parser.add_argument("--add-to-memory", action="store_true", help="Add each finished session to the step's memory service.")
+    parser.add_argument("--retry-errors", action="store_true", help="On resume, rerun conversations that failed.")
+    parser.add_argument("--restart", action="store_true", help="Discard existing output instead of resuming.")
+    args = parser.parse_args()
+    report = run_batch(
+        args.step, args.input, args.output, concurrency=args.concurrency, processes=args.processes,
+        priority=BACKGROUND if args.priority == "background" else INTERACTIVE,
+        add_to_memory=args.add_to_memory, restart=args.restart, retry_errors=args.retry_errors,
+    )
+    print(f"\n📦 Batch '{args.step}': {report['conversations']} conversations ({report['errors']} errors), "
+          f"{report['turns']} turns in {report['seconds']}s — "
+          f"{report['conversations_per_s']} conversations/s, {report['turns_per_s']} turns/s, "
+          f"p95 conversation {report['conversation_latency']['p95_ms'] / 1000:.1f}s")
+    sys.exit(1 if report["errors"] else 0)
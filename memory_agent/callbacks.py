@@ -0,0 +1,142 @@
+"""A registry of after_tool callbacks dispatched by tool name or target agent.
+
+An agent accepts one after_tool_callback (or a list that all run on every
+tool call). `CallbackRegistry` is a single callback that looks up the
+handlers registered for the call in a dict, so handlers for other tools
+cost nothing:
+
+    callbacks = CallbackRegistry()
+
+    @callbacks.on(agents=["museum_expert", "restaurant_expert"])
+    def remember_specialist(tool, args, tool_context, tool_response): ...
+
+    root_agent = LlmAgent(..., after_tool_callback=callbacks.after_tool_callback)
+
+`tools=` matches the tool's name; `agents=` matches the agent the call hands
+off to (the `agent_name` of a transfer_to_agent call, or an AgentTool's
+agent). The handler list for each (tool, target) pair is built on first
+sight and reused. Handlers run in registration order; as in ADK, the first
+to return a value replaces the tool response and the rest are skipped.
+Handlers may be async. Every handler run is timed; see `report()`.
+
+Model calls that raise skip the agents' after_model callbacks and only
+reach plugins. Components that track calls in flight (caches, schedulers)
+register an `on_model_error` hook (a bound method is held weakly, so it
+does not keep its object alive); `ModelErrorPlugin`, added to every Runner,
+dispatches errors to them.
+"""
+import collections
+import inspect
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from .metrics import Histogram
+
+TRANSFER_TOOL = "transfer_to_agent"
+
+Handler = Callable[..., Any]
+
+
+class CallbackRegistry:
+    def __init__(self):
+        self._by_tool: Dict[str, List[Handler]] = collections.defaultdict(list)
+        self._by_agent: Dict[str, List[Handler]] = collections.defaultdict(list)
+        self._order: Dict[Handler, int] = {}
+        self._dispatch: Dict[Tuple[str, Optional[str]], Tuple[Handler, ...]] = {}
+        self.timings: Dict[str, Histogram] = {}
+
+    def register(self, handler: Handler, tools: Iterable[str] = (), agents: Iterable[str] = ()) -> Handler:
+        tools, agents = list(tools), list(agents)
+        if not tools and not agents:
+            raise ValueError(f"{handler.__name__} must be registered for at least one tool or agent name.")
+        self._order.setdefault(handler, len(self._order))
+        for name in tools:
+            self._by_tool[name].append(handler)
+        for name in agents:
+            self._by_agent[name].append(handler)
+        self.timings.setdefault(handler.__name__, Histogram())
+        self._dispatch.clear()
+        return handler
+
+    def on(self, tools: Iterable[str] = (), agents: Iterable[str] = ()) -> Callable[[Handler], Handler]:
+        """Decorator form of `register`."""
+        return lambda handler: self.register(handler, tools, agents)
+
+    def handlers_for(self, tool_name: str, target: Optional[str]) -> Tuple[Handler, ...]:
+        key = (tool_name, target)
+        handlers = self._dispatch.get(key)
+        if handlers is None:
+            matched = dict.fromkeys(self._by_tool.get(tool_name, ()))
+            matched.update(dict.fromkeys(self._by_agent.get(target, ()) if target else ()))
+            handlers = self._dispatch[key] = tuple(sorted(matched, key=self._order.__getitem__))
+        return handlers
+
+    def after_tool_callback(self, tool, args: Dict[str, Any], tool_context, tool_response) -> Any:
+        target = args.get("agent_name") if tool.name == TRANSFER_TOOL else tool.name
+        handlers = self.handlers_for(tool.name, target)
+        for position, handler in enumerate(handlers):
+            started = time.perf_counter()
+            result = handler(tool, args, tool_context, tool_response)
+            if inspect.isawaitable(result):
+                return self._finish_async(handlers[position:], result, started, tool, args, tool_context, tool_response)
+            self.timings[handler.__name__].observe(time.perf_counter() - started)
+            if result is not None:
+                return result
+        return None
+
+    async def _finish_async(self, handlers: Tuple[Handler, ...], pending, started: float, *call) -> Any:
+        result = await pending
+        self.timings[handlers[0].__name__].observe(time.perf_counter() - started)
+        if result is not None:
+            return result
+        for handler in handlers[1:]:
+            started = time.perf_counter()
+            result = handler(*call)
+            if inspect.isawaitable(result):
+                result = await result
+            self.timings[handler.__name__].observe(time.perf_counter() - started)
+            if result is not None:
+                return result
+        return None
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-handler call count and latency, for handlers that ran at least once."""
+        return {name: histogram.summary() for name, histogram in self.timings.items() if histogram.count}
+
+
+# --- Model errors ---
+
+# hook(callback_context, error), called for every model call that raises.
+ModelErrorHook = Callable[[Any, BaseException], None]
+
+# Bound methods are held weakly, so a cache or scheduler that registers its own
+# method is not kept alive by the registry; plain functions are held strongly.
+_model_error_hooks: List[Callable[[], Optional[ModelErrorHook]]] = []
+
+
+def on_model_error(hook: ModelErrorHook) -> ModelErrorHook:
+    """Registers a hook for model calls that raise; usable as a decorator."""
+    _model_error_hooks.append(weakref.WeakMethod(hook) if inspect.ismethod(hook) else lambda: hook)
+    return hook
+
+
+def _live_model_error_hooks() -> List[ModelErrorHook]:
+    hooks = [ref() for ref in _model_error_hooks]
+    if None in hooks:
+        _model_error_hooks[:] = [ref for ref, hook in zip(_model_error_hooks, hooks) if hook is not None]
+    return [hook for hook in hooks if hook is not None]
+
+
+class ModelErrorPlugin(BasePlugin):
+    """Passes model errors to the `on_model_error` hooks; never replaces the error."""
+
+    def __init__(self, name: str = "model_errors"):
+        super().__init__(name=name)
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        for hook in _live_model_error_hooks():
+            hook(callback_context, error)
+        return None
@@ -0,0 +1,137 @@
+"""Single-flight coalescing and a TTL cache for stateless specialist agents.
+
+Many users open with the same request ("find the best sushi in Palo Alto"),
+and specialists like step_04's experts or step_02's foodie_agent answer from
+the request alone. Attach a `SingleFlightCache` as the agent's model
+callbacks: the first request for a key calls the model, concurrent identical
+requests wait for that call, and later ones are served from the cache
+until the TTL expires.
+
+    cache = SingleFlightCache(ttl_s=600)
+    LlmAgent(..., before_model_callback=cache.before_model_callback,
+             after_model_callback=cache.after_model_callback)
+
+The key is the agent name plus a hash of the full model request (system
+instruction and conversation, with generated call ids removed) and the
+values of any `state_keys`. Only use it for agents whose answer depends on
+nothing else.
+
+A leader whose model call raises never reaches after_model_callback, so
+its followers are released through the `on_model_error` hook (Runners need
+`ModelErrorPlugin`), and a leader whose turn is cancelled is released when
+its task ends.
+"""
+import asyncio
+import collections
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .callbacks import on_model_error
+from .replay import request_key
+
+
+class SingleFlightCache:
+    def __init__(self, ttl_s: float = 300.0, max_entries: int = 1024, follower_timeout_s: float = 60.0,
+                 state_keys: Sequence[str] = ()):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.follower_timeout_s = follower_timeout_s
+        self.state_keys = tuple(state_keys)
+        self._cache: "collections.OrderedDict[str, Tuple[float, LlmResponse]]" = collections.OrderedDict()
+        self._in_flight: Dict[str, Tuple[float, asyncio.Future]] = {}
+        self._leaders: Dict[Tuple[str, str], str] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        on_model_error(self.on_model_error)
+
+    def _key(self, callback_context: CallbackContext, llm_request: LlmRequest) -> str:
+        state = tuple(repr(callback_context.state.get(k)) for k in self.state_keys)
+        return f"{callback_context.agent_name}:{request_key(llm_request)}:{hash(state)}"
+
+    def _cached(self, key: str) -> Optional[LlmResponse]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, response = entry
+        if time.monotonic() - stored_at > self.ttl_s:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return response.model_copy(deep=True)
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        key = self._key(callback_context, llm_request)
+        cached = self._cached(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None and time.monotonic() - in_flight[0] < self.follower_timeout_s:
+            try:
+                response = await asyncio.wait_for(asyncio.shield(in_flight[1]), self.follower_timeout_s)
+            except TimeoutError:
+                response = None
+            if response is not None:
+                self.coalesced += 1
+                return response.model_copy(deep=True)
+            # The leader failed or produced something uncacheable: make our own call.
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        leader = (callback_context.invocation_id, callback_context.agent_name)
+        self._in_flight[key] = (time.monotonic(), future)
+        self._leaders[leader] = key
+        task = asyncio.current_task()
+        if task is not None:
+            task.add_done_callback(lambda _: self._release(leader, future))
+        return None
+
+    def _release(self, leader: Tuple[str, str], future: Optional[asyncio.Future] = None):
+        """Drops a leader's call (all of them for `future=None`) and lets its followers make their own."""
+        key = self._leaders.get(leader)
+        if key is None:
+            return
+        in_flight = self._in_flight.get(key)
+        if future is not None and (in_flight is None or in_flight[1] is not future):
+            return  # That call completed; the leader has moved on.
+        del self._leaders[leader]
+        if in_flight is not None:
+            del self._in_flight[key]
+            if not in_flight[1].done():
+                in_flight[1].set_result(None)
+
+    def on_model_error(self, callback_context: CallbackContext, error: BaseException):
+        self._release((callback_context.invocation_id, callback_context.agent_name))
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        key = self._leaders.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if key is None:
+            return None
+        in_flight = self._in_flight.pop(key, None)
+        cacheable = (
+            llm_response.error_code is None
+            and llm_response.content is not None
+            and not any(part.function_call for part in llm_response.content.parts or ())
+        )
+        if cacheable:
+            self._cache[key] = (time.monotonic(), llm_response.model_copy(deep=True))
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        if in_flight is not None and not in_flight[1].done():
+            in_flight[1].set_result(llm_response if cacheable else None)
+        return None
+
+    def clear(self):
+        """Drops every cached response (calls in flight still complete for their followers)."""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "coalesced": self.coalesced, "misses": self.misses, "entries": len(self._cache)}
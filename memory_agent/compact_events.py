@@ -0,0 +1,152 @@
+"""Columnar storage for session history.
+
+A pydantic `Event` costs several KB of Python objects. `CompactEventLog`
+keeps one session's history as parallel columns instead:
+
+    timestamps   array('d')
+    authors      array('H') -> interned author names
+    roles        array('b') -> None / "user" / "model"
+    text         one UTF-8 buffer; each event has an offset into it
+    tool calls   sparse {event index: (function names, ...)}
+    payloads     the rest of the event as zlib-compressed JSON, text removed
+
+Reading transcripts (author, role, text) never builds an `Event`; full
+events are only materialized, one at a time, when something asks for them.
+"""
+import bisect
+import json
+import zlib
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from google.adk.events import Event
+
+_ROLES = (None, "user", "model")
+_ROLE_CODES = {role: code for code, role in enumerate(_ROLES)}
+
+# Priming dictionary for the tiny per-event payloads; mostly repeated keys.
+_ZDICT = (
+    b'{"content":{"parts":[{"text":0}],"role":"model"},"invocation_id":"e-","author":"user",'
+    b'"actions":{"state_delta":{},"artifact_delta":{},"requested_auth_configs":{},"requested_tool_confirmations":{}},'
+    b'"id":"","timestamp":0.0,"usage_metadata":{"candidates_token_count":0,"prompt_token_count":0,"total_token_count":0},'
+    b'"function_call":{"args":{},"name":"transfer_to_agent"},"function_response":{"response":{"result":null}},'
+    b'"finish_reason":"STOP","transfer_to_agent","last_activity_type","long_running_tool_ids":[]'
+)
+
+
+def _compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(level=6, zdict=_ZDICT)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _decompress(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj(zdict=_ZDICT)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+class CompactEventLog:
+    __slots__ = ("timestamps", "authors", "roles", "text_offsets", "text", "tool_calls", "payloads", "_author_names", "_author_ids")
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.authors = array("H")
+        self.roles = array("b")
+        self.text_offsets = array("Q")
+        self.text = bytearray()
+        self.tool_calls: Dict[int, Tuple[str, ...]] = {}
+        self.payloads: List[bytes] = []
+        self._author_names: List[str] = []
+        self._author_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def from_events(cls, events) -> "CompactEventLog":
+        log = cls()
+        for event in events:
+            log.append(event)
+        return log
+
+    def append(self, event: Event) -> int:
+        return self.append_dict(event.model_dump(mode="json", exclude_none=True))
+
+    def append_dict(self, data: dict) -> int:
+        """Appends an event given as its JSON-mode dict; returns the bytes it added."""
+        index = len(self.timestamps)
+        text_before = len(self.text)
+        author = data.get("author", "")
+        author_id = self._author_ids.get(author)
+        if author_id is None:
+            author_id = self._author_ids[author] = len(self._author_names)
+            self._author_names.append(author)
+
+        self.text_offsets.append(len(self.text))
+        content = data.get("content") or {}
+        calls = []
+        for part in content.get("parts") or ():
+            text = part.get("text")
+            if isinstance(text, str):
+                encoded = text.encode()
+                self.text += encoded
+                part["text"] = len(encoded)  # Placeholder: length of this part's slice.
+            call = part.get("function_call")
+            if call:
+                calls.append(call.get("name", ""))
+        if calls:
+            self.tool_calls[index] = tuple(calls)
+
+        self.timestamps.append(data.get("timestamp", 0.0))
+        self.authors.append(author_id)
+        self.roles.append(_ROLE_CODES.get(content.get("role"), 0))
+        payload = _compress(json.dumps(data, separators=(",", ":")).encode())
+        self.payloads.append(payload)
+        return len(payload) + len(self.text) - text_before + 19  # 19 = one row of the fixed-width columns
+
+    # --- Cheap column reads ---
+
+    def author(self, index: int) -> str:
+        return self._author_names[self.authors[index]]
+
+    def role(self, index: int) -> Optional[str]:
+        return _ROLES[self.roles[index]]
+
+    def text_of(self, index: int) -> str:
+        end = self.text_offsets[index + 1] if index + 1 < len(self.text_offsets) else len(self.text)
+        return self.text[self.text_offsets[index]:end].decode()
+
+    def transcript(self) -> Iterator[Tuple[str, Optional[str], str]]:
+        """(author, role, text) for every event that has text, without materializing events."""
+        for index in range(len(self)):
+            text = self.text_of(index)
+            if text:
+                yield self.author(index), self.role(index), text
+
+    def index_after(self, timestamp: float) -> int:
+        """First event index with timestamp >= `timestamp` (timestamps are append-ordered)."""
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    # --- Materialization ---
+
+    def event_dict(self, index: int) -> dict:
+        data = json.loads(_decompress(self.payloads[index]))
+        offset = self.text_offsets[index]
+        for part in (data.get("content") or {}).get("parts") or ():
+            length = part.get("text")
+            if isinstance(length, int):
+                part["text"] = self.text[offset:offset + length].decode()
+                offset += length
+        return data
+
+    def event(self, index: int) -> Event:
+        return Event.model_validate(self.event_dict(index))
+
+    def events(self, start: int = 0) -> List[Event]:
+        return [self.event(i) for i in range(start, len(self))]
+
+    def nbytes(self) -> int:
+        """Approximate heap footprint of the stored columns."""
+        columns = (self.timestamps, self.authors, self.roles, self.text_offsets)
+        return (sum(c.itemsize * len(c) for c in columns) + len(self.text)
+                + sum(len(p) for p in self.payloads) + sum(len(n) for n in self._author_names)
+                + 64 * len(self.tool_calls))
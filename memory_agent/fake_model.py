@@ -0,0 +1,124 @@
+"""A local stand-in for Gemini used by benchmarks and load tests.
+
+`FakeLlm` answers with canned text after a configurable latency and can
+inject the errors a real backend produces under load: 429 RESOURCE_EXHAUSTED
+when too many calls are in flight, or at random with a given probability.
+
+Latency is `latency_s` by default. `latency_sigma` turns it into a lognormal
+with that median, and `tail_probability` sends a fraction of calls to a slow
+`tail_latency_s` mode, which is what hedging is meant to hide. With
+`prompt_tokens_per_s` / `tokens_per_s` set, each call also takes the time to
+read its prompt and write its reply at that throughput (tokens are counted
+as words).
+
+`plan` scripts tool use: the n-th model call after the user's message
+returns the plan's n-th function call (a {"name": ..., "args": ...} dict, or
+a callable that builds one from the request and may return None to answer
+instead), and the canned reply once the plan is exhausted.
+"""
+import asyncio
+import json
+import random
+from typing import Any, AsyncGenerator, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors, types
+from pydantic import Field, PrivateAttr
+
+
+def throttling_error() -> errors.ClientError:
+    return errors.ClientError(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                              "status": "RESOURCE_EXHAUSTED"}})
+
+
+class FakeLlm(BaseLlm):
+    """Deterministic (seeded) fake model; keeps the real model's name so request processing is unchanged."""
+
+    model: str = "gemini-2.5-flash"
+    reply: str = "Here is a suggestion from the local fake model."
+    latency_s: float = 0.05
+    latency_sigma: float = 0.0
+    tail_probability: float = 0.0
+    tail_latency_s: float = 1.0
+    throttle_above_in_flight: Optional[int] = None
+    throttle_probability: float = 0.0
+    prompt_tokens_per_s: float = 0.0
+    tokens_per_s: float = 0.0
+    seed: int = 0
+    plan: List[Any] = Field(default_factory=list)
+    _rng: random.Random = PrivateAttr(default=None)
+    _in_flight: int = PrivateAttr(default=0)
+    _calls: int = PrivateAttr(default=0)
+    _throttled: int = PrivateAttr(default=0)
+
+    def model_post_init(self, context):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def throttled(self) -> int:
+        return self._throttled
+
+    def _sample_latency(self) -> float:
+        if self.tail_probability and self._rng.random() < self.tail_probability:
+            return self.tail_latency_s
+        if self.latency_sigma:
+            return self.latency_s * self._rng.lognormvariate(0.0, self.latency_sigma)
+        return self.latency_s
+
+    def _generation_s(self, response: LlmResponse) -> float:
+        usage = response.usage_metadata
+        seconds = usage.prompt_token_count / self.prompt_tokens_per_s if self.prompt_tokens_per_s else 0.0
+        if self.tokens_per_s:
+            seconds += usage.candidates_token_count / self.tokens_per_s
+        return seconds
+
+    def _planned_call(self, llm_request: LlmRequest) -> Optional[types.FunctionCall]:
+        if not self.plan:
+            return None
+        step = 0
+        for content in reversed(llm_request.contents):
+            parts = content.parts or ()
+            if any(p.function_response for p in parts):
+                step += 1
+            elif content.role == "user" and any(p.text for p in parts):
+                break
+        if step >= len(self.plan):
+            return None
+        call = self.plan[step](llm_request) if callable(self.plan[step]) else self.plan[step]
+        return types.FunctionCall(name=call["name"], args=call.get("args", {})) if call else None
+
+    def _reply_text(self, llm_request: LlmRequest) -> str:
+        return self.reply
+
+    def _response(self, llm_request: LlmRequest) -> LlmResponse:
+        call = self._planned_call(llm_request)
+        part = types.Part(function_call=call) if call else types.Part(text=self._reply_text(llm_request))
+        output = json.dumps(call.args, default=str) if call else part.text
+        return LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=sum(len((p.text or "").split()) for c in llm_request.contents for p in c.parts or ()),
+                candidates_token_count=len(output.split()),
+            ),
+        )
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self._calls += 1
+        self._in_flight += 1
+        try:
+            overloaded = self.throttle_above_in_flight is not None and self._in_flight > self.throttle_above_in_flight
+            if overloaded or self._rng.random() < self.throttle_probability:
+                self._throttled += 1
+                await asyncio.sleep(self.latency_s / 10)
+                raise throttling_error()
+            response = self._response(llm_request)
+            await asyncio.sleep(self._sample_latency() + self._generation_s(response))
+        finally:
+            self._in_flight -= 1
+        yield response
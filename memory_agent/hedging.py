@@ -0,0 +1,186 @@
+"""Hedged, deadline-bounded model calls.
+
+One slow model response stalls a whole turn, and in step_02's sequential
+workflow or step_04's planner-plus-specialist chain it stalls every agent
+after it. `HedgedLlm` wraps an agent's model and:
+
+- bounds each call with a deadline (`TimeoutError` once it passes),
+- issues one duplicate request if the first has not answered after the
+  agent's observed p95 time to first response (or a fixed delay),
+- streams from whichever attempt answers first and cancels the other.
+
+Hedges are capped at `max_hedge_ratio` of calls so a backend that is slow
+for everyone is not sent twice the load. Install it outside admission
+control so each attempt is admitted, and counted, separately.
+
+Hedging is opt-in: `install_hedging(root_agent)` does nothing unless
+MEMORY_AGENT_HEDGE=1. MEMORY_AGENT_MODEL_DEADLINE_S sets the deadline and
+MEMORY_AGENT_HEDGE_AFTER_MS pins the hedge delay instead of using the p95.
+"""
+import asyncio
+import dataclasses
+import os
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import Field
+
+from .agents import iter_llm_agents, replace_models
+from .log import get_logger
+from .metrics import Histogram
+
+logger = get_logger("hedging")
+
+
+@dataclasses.dataclass
+class HedgeStats:
+    calls: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    deadline_exceeded: int = 0
+    attempt_latency: Histogram = dataclasses.field(default_factory=Histogram)  # Time to first response.
+    call_latency: Histogram = dataclasses.field(default_factory=Histogram)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "latency": self.call_latency.summary(),
+        }
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+# Marks the end of an attempt's responses in the shared queue.
+_DONE = object()
+
+
+class HedgedLlm(BaseLlm):
+    """Races a delayed duplicate request against slow calls and streams the attempt that answers first."""
+
+    inner: BaseLlm
+    deadline_s: Optional[float] = 60.0
+    hedge_after_s: Optional[float] = None  # None: use the observed hedge_percentile latency.
+    hedge_percentile: float = 95.0
+    initial_hedge_after_s: float = 5.0
+    min_samples: int = 20
+    max_hedge_ratio: float = 0.1
+    stats: Any = Field(default_factory=HedgeStats, exclude=True)
+
+    def hedge_delay(self) -> float:
+        if self.hedge_after_s is not None:
+            return self.hedge_after_s
+        if self.stats.attempt_latency.count < self.min_samples:
+            return self.initial_hedge_after_s
+        return self.stats.attempt_latency.percentile(self.hedge_percentile) / 1000.0
+
+    async def _attempt(self, index: int, llm_request: LlmRequest, stream: bool, results: asyncio.Queue):
+        """Puts (index, response) for each response, then (index, _DONE) or (index, error)."""
+        started = time.perf_counter()
+        first = True
+        try:
+            async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                if first:
+                    self.stats.attempt_latency.observe(time.perf_counter() - started)
+                    first = False
+                results.put_nowait((index, response))
+        except Exception as e:
+            results.put_nowait((index, e))
+            return
+        if first:
+            self.stats.attempt_latency.observe(time.perf_counter() - started)
+        results.put_nowait((index, _DONE))
+
+    async def _get(self, results: asyncio.Queue, deadline: Optional[float],
+                   timeout: Optional[float] = None) -> Optional[Tuple[int, Any]]:
+        """The next (attempt, item), or None once `timeout` passes; raises TimeoutError at the call's deadline."""
+        remaining = None if deadline is None else deadline - time.monotonic()
+        wait = remaining if timeout is None else timeout if remaining is None else min(timeout, remaining)
+        try:
+            return await asyncio.wait_for(results.get(), None if wait is None else max(wait, 0))
+        except TimeoutError:
+            if deadline is not None and time.monotonic() >= deadline:
+                self.stats.deadline_exceeded += 1
+                logger.warning("Model %s call exceeded its %ss deadline", self.model, self.deadline_s)
+                raise TimeoutError(f"Model {self.model} did not answer within {self.deadline_s}s") from None
+            return None
+
+    async def _first(self, llm_request: LlmRequest, stream: bool, results: asyncio.Queue, tasks: List[asyncio.Future],
+                     deadline: Optional[float]) -> Tuple[int, Any]:
+        """Waits for the first attempt to answer, hedging once if the primary is slow; returns (attempt, first item)."""
+        hedge_at: Optional[float] = time.monotonic() + self.hedge_delay()
+        errors: List[BaseException] = []
+        while True:
+            got = await self._get(results, deadline, None if hedge_at is None else hedge_at - time.monotonic())
+            if got is None:
+                if time.monotonic() < hedge_at:
+                    continue
+                hedge_at = None
+                if self.stats.hedges < self.max_hedge_ratio * self.stats.calls:
+                    self.stats.hedges += 1
+                    # The model may annotate the request it is given, so the hedge gets its own copy.
+                    tasks.append(asyncio.ensure_future(
+                        self._attempt(len(tasks), llm_request.model_copy(deep=True), stream, results)))
+                continue
+            index, item = got
+            if isinstance(item, BaseException):
+                errors.append(item)
+                if len(errors) == len(tasks):
+                    raise errors[0]
+                continue
+            if index:
+                self.stats.hedge_wins += 1
+            return index, item
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        self.stats.calls += 1
+        started = time.perf_counter()
+        deadline = None if self.deadline_s is None else time.monotonic() + self.deadline_s
+        results: asyncio.Queue = asyncio.Queue()
+        tasks = [asyncio.ensure_future(self._attempt(0, llm_request, stream, results))]
+        try:
+            winner, item = await self._first(llm_request, stream, results, tasks, deadline)
+            for task in tasks[:winner] + tasks[winner + 1:]:
+                task.cancel()
+            while item is not _DONE:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+                got = None
+                while got is None or got[0] != winner:  # The cancelled attempts' leftovers are skipped.
+                    got = await self._get(results, deadline)
+                item = got[1]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        self.stats.call_latency.observe(time.perf_counter() - started)
+
+
+def hedging_enabled() -> bool:
+    return os.getenv("MEMORY_AGENT_HEDGE", "0").lower() in ("1", "true", "yes")
+
+
+def install_hedging(agent: BaseAgent, enabled: Optional[bool] = None, **options):
+    """Wraps every model in the agent tree in a HedgedLlm (each agent keeps its own latency stats)."""
+    if not (hedging_enabled() if enabled is None else enabled):
+        return
+    options.setdefault("deadline_s", _env_float("MEMORY_AGENT_MODEL_DEADLINE_S") or 60.0)
+    hedge_after_ms = _env_float("MEMORY_AGENT_HEDGE_AFTER_MS")
+    if hedge_after_ms is not None:
+        options.setdefault("hedge_after_s", hedge_after_ms / 1000.0)
+    replace_models(agent, lambda _, model: model if isinstance(model, HedgedLlm)
+                   else HedgedLlm(model=model.model, inner=model, **options))
+
+
+def hedging_report(agent: BaseAgent) -> Dict[str, Dict[str, Any]]:
+    return {a.name: a.model.stats.summary() for a in iter_llm_agents(agent) if isinstance(a.model, HedgedLlm)}
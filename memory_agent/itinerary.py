@@ -0,0 +1,190 @@
+"""Structured multi-day itinerary kept in session state.
+
+The adaptive planners (step_01, step_03) plan one day at a time. Without a
+store, every change is re-planned against the whole conversation, and the
+prompt grows with every day. This module keeps the plan in state instead:
+
+    trip_profile        {"destination": ..., "duration_days": ..., "interests": ...}
+    itinerary_index     {"1": {"hash": ..., "summary": "Asakusa & sushi: Senso-ji, ..."}, ...}
+    itinerary_day_<n>   {"title": ..., "activities": ["Morning: Senso-ji - arrive early", ...]}
+
+The agent gets the profile and one summary line per day through
+`itinerary_instruction`, and loads a day's full details only when it changes
+that day. `trim_history` drops conversation turns the store already covers
+(up to its latest save), so prompt size stays flat as the trip grows.
+`expand_itinerary` swaps the placeholders [[ITINERARY]] and [[DAY n]] in the
+agent's answer for markdown rendered from the store, or a short note for a
+day that isn't saved; each day's markdown is cached by content hash, so
+unchanged days are never regenerated.
+"""
+import collections
+import hashlib
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import ToolContext
+
+PROFILE_KEY = "trip_profile"
+INDEX_KEY = "itinerary_index"
+DAY_KEY = "itinerary_day_{}"
+MAX_SUMMARY_CHARS = 160
+STORE_TOOLS = frozenset({"save_trip_profile", "save_itinerary_day"})
+_DAY_MARKER = re.compile(r"\[\[DAY (\d+)\]\]")
+
+ITINERARY_GUIDE = """
+Itinerary store:
+- Save the trip's destination, length and interests with `save_trip_profile` as soon as you know them.
+- After planning or changing a day, save it with `save_itinerary_day` (one activity per entry, "Slot: activity - details").
+- Before changing an earlier day, load it with `get_itinerary_day`; the summaries below are all you need otherwise.
+- To show days in your answer, write [[DAY n]] or [[ITINERARY]] (all days) on its own line instead of re-typing them.
+"""
+
+_rendered: "collections.OrderedDict[str, str]" = collections.OrderedDict()
+_RENDER_CACHE_SIZE = 1024
+
+
+def _day_hash(day: Dict[str, Any]) -> str:
+    return hashlib.blake2b(json.dumps(day, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+def _summary(title: str, activities: List[str]) -> str:
+    names = [a.split(":", 1)[-1].split(" - ", 1)[0].strip() for a in activities]
+    summary = f"{title}: {', '.join(names)}"
+    return summary if len(summary) <= MAX_SUMMARY_CHARS else summary[:MAX_SUMMARY_CHARS - 1] + "…"
+
+
+# --- Tools ---
+
+def save_trip_profile(destination: str, duration_days: int, interests: str, tool_context: ToolContext) -> dict:
+    """Saves the trip's destination, length in days and the traveller's interests."""
+    tool_context.state[PROFILE_KEY] = {"destination": destination, "duration_days": duration_days, "interests": interests}
+    return {"status": "success"}
+
+
+def save_itinerary_day(day: int, title: str, activities: List[str], tool_context: ToolContext) -> dict:
+    """Saves (or replaces) one day of the itinerary.
+
+    Args:
+        day: Day number, starting at 1.
+        title: Short theme for the day, e.g. "Historic Asakusa".
+        activities: One entry per activity, formatted "Slot: activity - details".
+    """
+    record = {"title": title, "activities": activities}
+    digest = _day_hash(record)
+    index = dict(tool_context.state.get(INDEX_KEY) or {})
+    changed = index.get(str(day), {}).get("hash") != digest
+    if changed:
+        tool_context.state[DAY_KEY.format(day)] = record
+        index[str(day)] = {"hash": digest, "summary": _summary(title, activities)}
+        tool_context.state[INDEX_KEY] = index
+    return {"status": "success", "day": day, "changed": changed}
+
+
+def get_itinerary_day(day: int, tool_context: ToolContext) -> dict:
+    """Returns the full saved plan for one day."""
+    record = tool_context.state.get(DAY_KEY.format(day))
+    if record is None:
+        return {"status": "error", "error_message": f"Day {day} has not been planned yet."}
+    return {"status": "success", "day": day, **record}
+
+
+# --- Prompt shaping ---
+
+def itinerary_context(state) -> str:
+    profile = state.get(PROFILE_KEY)
+    index = state.get(INDEX_KEY) or {}
+    lines = []
+    if profile:
+        lines.append(f"Trip: {profile['destination']}, {profile['duration_days']} days; interests: {profile['interests']}")
+    for day in sorted(index, key=int):
+        lines.append(f"Day {day}: {index[day]['summary']}")
+    return "\n".join(lines) if lines else "Nothing planned yet."
+
+
+def itinerary_instruction(base: str) -> Callable[[ReadonlyContext], str]:
+    """An instruction provider: the agent's own instruction plus the store's compact view of the trip."""
+
+    def provider(context: ReadonlyContext) -> str:
+        return f"{base}\n{ITINERARY_GUIDE}\nTrip so far:\n{itinerary_context(context.state)}\n"
+
+    return provider
+
+
+def trim_history(keep_user_turns: int = 3):
+    """A before_model_callback that drops user turns older than the last `keep_user_turns`.
+
+    Only turns the store covers are dropped: the turn with the latest
+    save_trip_profile / save_itinerary_day result and those before it.
+    Anything said after that turn stays in the prompt, however old.
+    """
+
+    def before_model_callback(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        contents = llm_request.contents
+        turn_starts = [i for i, content in enumerate(contents)
+                       if content.role == "user" and any(part.text for part in content.parts or ())]
+        if len(turn_starts) <= keep_user_turns:
+            return None
+        last_save = max((i for i, content in enumerate(contents) for part in content.parts or ()
+                         if part.function_response and part.function_response.name in STORE_TOOLS), default=-1)
+        if last_save < 0:
+            return None  # Nothing saved yet: every turn may hold something the store doesn't.
+        covered_until = next((start for start in turn_starts if start > last_save), len(contents))
+        cut = max(start for start in turn_starts if start <= min(turn_starts[-keep_user_turns], covered_until))
+        if cut > 0:
+            llm_request.contents = contents[cut:]
+        return None
+
+    return before_model_callback
+
+
+# --- Rendering ---
+
+def render_day(day: int, record: Dict[str, Any], digest: str) -> str:
+    key = f"{day}:{digest}"
+    cached = _rendered.get(key)
+    if cached is None:
+        lines = [f"### Day {day}: {record['title']}"]
+        for activity in record["activities"]:
+            slot, _, rest = activity.partition(":")
+            lines.append(f"- **{slot.strip()}**: {rest.strip()}" if rest else f"- {activity.strip()}")
+        cached = _rendered[key] = "\n".join(lines)
+        while len(_rendered) > _RENDER_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    else:
+        _rendered.move_to_end(key)
+    return cached
+
+
+def render_itinerary(state, days: Optional[List[int]] = None) -> str:
+    index = state.get(INDEX_KEY) or {}
+    selected = sorted(index, key=int) if days is None else [str(d) for d in days if str(d) in index]
+    records = [(d, state.get(DAY_KEY.format(d))) for d in selected]
+    # The index can outlive a day's record (e.g. state edited by hand); skip those days.
+    return "\n\n".join(render_day(int(d), record, index[d]["hash"]) for d, record in records if record is not None)
+
+
+def _render_marker(state, day: int) -> str:
+    return render_itinerary(state, [day]) or f"_Day {day} has not been planned yet._"
+
+
+def expand_itinerary(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """An after_model_callback that replaces [[ITINERARY]] / [[DAY n]] with markdown from the store."""
+    if not llm_response.content or not llm_response.content.parts:
+        return None
+    changed = False
+    for part in llm_response.content.parts:
+        if not part.text or "[[" not in part.text:
+            continue
+        text = part.text
+        if "[[ITINERARY]]" in text:
+            text = text.replace("[[ITINERARY]]", render_itinerary(callback_context.state) or "_Nothing planned yet._")
+        # Every day marker is replaced, so one for an unsaved day never reaches the user.
+        text = _DAY_MARKER.sub(lambda m: _render_marker(callback_context.state, int(m.group(1))), text)
+        changed = changed or text != part.text
+        part.text = text
+    return llm_response if changed else None
@@ -0,0 +1,613 @@
+"""Append-only session journal: segment files, periodic snapshots and group-commit fsync.
+
+`JournalSessionService` is an alternative to SqliteSessionService for
+sessions that are resumed often. Every write (session created, event
+appended, session deleted) is one checksummed record appended to the active
+segment file (`00000001.log`, rolled at `segment_bytes`). A writer thread
+takes all records queued since its last write and writes them with one
+write and one fsync, so concurrent turns share fsyncs (group commit).
+`append_event` returns once its record is durable (`durable=False` returns
+right away).
+
+The session index (state, app/user state and where each event's bytes are)
+lives in memory. After `snapshot_bytes` of new records it is written to a
+snapshot named by its journal position. Opening the journal loads the
+latest snapshot and replays only the records after it; a torn record at the
+end (from a crash) is cut off. Resuming a session reads its event bytes
+straight from the files, without replaying anything.
+
+Segments entirely before the latest snapshot are compacted in the
+background. The live events of all sessions are copied into one file
+(`c00000001.log`), grouped per session, so each compacted file holds a
+session's events as one contiguous run. Then a new snapshot is written and
+the old files are deleted. Compacted files are merged again size-tiered:
+files smaller than a segment, mostly dead files, and all files of a tier
+once it holds `compact_fanout` of them (tier n: up to fanout**n segments).
+A merge regroups each session's events from all its input files, so a
+resume reads one run from each of a logarithmic number of files. Event
+bytes are read outside the index lock.
+
+    python benchmarks/bench_session_journal.py --sessions 2000 --events 20
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .log import get_logger
+from .sessions import _split_state
+
+logger = get_logger("journal_sessions")
+
+SessionKey = Tuple[str, str, str]
+Location = Tuple[str, int, int, float]  # file, offset, length, event timestamp
+
+_HEADER = struct.Struct("<II")  # payload length, crc32
+_CREATE, _EVENT, _DELETE = b"C", b"E", b"D"
+_SEGMENT = re.compile(r"^(\d{8})\.log$")
+_COMPACTED = re.compile(r"^c(\d{8})\.log$")
+_SNAPSHOT = re.compile(r"^snapshot-(\d{8})-(\d{12})\.json$")
+
+
+def _segment_name(segment_id: int) -> str:
+    return f"{segment_id:08d}.log"
+
+
+def _json(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+
+class _StoredSession:
+    __slots__ = ("create_time", "update_time", "state", "events", "last_seq")
+
+    def __init__(self, create_time: float, state: Dict[str, Any]):
+        self.create_time = self.update_time = create_time
+        self.state = state
+        self.events: List[Location] = []
+        self.last_seq = 0  # Last record for this session; get_session waits until it is written.
+
+
+class JournalSessionService(BaseSessionService):
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, snapshot_bytes: int = 8 * 1024 * 1024,
+                 durable: bool = True, compact_dead_ratio: float = 0.5, compact_fanout: int = 4):
+        self.directory = str(directory)
+        self.segment_bytes = segment_bytes
+        self.snapshot_bytes = snapshot_bytes
+        self.durable = durable
+        self.compact_dead_ratio = compact_dead_ratio
+        self.compact_fanout = compact_fanout
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._sessions: Dict[SessionKey, _StoredSession] = {}
+        self._user_state: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._app_state: Dict[str, Dict[str, Any]] = {}
+        self._queue: List[Tuple[int, str, bytes]] = []
+        self._waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._readers: Dict[str, int] = {}
+        self._seq = self._written_seq = 0
+        self._error: Optional[BaseException] = None
+        self._closing = False
+        self._bytes_since_snapshot = 0
+        self._snapshot_segment = 1
+        self._next_compacted = 1
+
+        self.fsyncs = self.records_written = self.bytes_written = 0
+        self.snapshots = self.compactions = self.bytes_compacted = 0
+        self.recovery: Dict[str, Any] = {}
+        self._active_id, self._active_size = self._recover()
+
+        self._maintenance = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._maintainer = threading.Thread(target=self._maintenance_loop, name="journal-maintenance", daemon=True)
+        self._writer.start()
+        self._maintainer.start()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _fsync_directory(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # --- Index updates (shared by appends and replay; caller holds the lock) ---
+
+    def _apply_create(self, key: SessionKey, ts: float, meta: Dict[str, Any]):
+        self._sessions[key] = _StoredSession(ts, dict(meta.get("s") or {}))
+        self._apply_deltas(key, meta)
+
+    def _apply_deltas(self, key: SessionKey, meta: Dict[str, Any]):
+        if meta.get("a"):
+            self._app_state.setdefault(key[0], {}).update(meta["a"])
+        if meta.get("u"):
+            self._user_state.setdefault(key[:2], {}).update(meta["u"])
+
+    def _apply_event(self, key: SessionKey, location: Location, meta: Dict[str, Any]) -> Optional[_StoredSession]:
+        stored = self._sessions.get(key)
+        if stored is None:
+            return None
+        stored.events.append(location)
+        stored.update_time = location[3]
+        if meta.get("s"):
+            stored.state.update(meta["s"])
+        self._apply_deltas(key, meta)
+        return stored
+
+    # --- Writes ---
+
+    def _enqueue(self, tag: bytes, meta: Dict[str, Any], body: bytes = b"") -> Tuple[int, str, int]:
+        """Queues one record for the writer; returns its sequence number, segment and the body's offset."""
+        if self._error is not None:
+            raise RuntimeError("The session journal can no longer be written.") from self._error
+        if self._closing:
+            raise RuntimeError("The session journal is closed.")
+        payload = tag + _json(meta) + b"\n" + body
+        record = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        if self._active_size and self._active_size + len(record) > self.segment_bytes:
+            self._active_id += 1
+            self._active_size = 0
+        name = _segment_name(self._active_id)
+        body_offset = self._active_size + len(record) - len(body)
+        self._active_size += len(record)
+        self._bytes_since_snapshot += len(record)
+        self._seq += 1
+        self._queue.append((self._seq, name, record))
+        self._cond.notify_all()
+        return self._seq, name, body_offset
+
+    def _write_loop(self):
+        fd, fd_name = None, None
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                batch, self._queue = self._queue, []
+            try:
+                start = 0
+                while start < len(batch):
+                    name = batch[start][1]
+                    end = start
+                    while end < len(batch) and batch[end][1] == name:
+                        end += 1
+                    if name != fd_name:
+                        if fd is not None:
+                            os.fsync(fd)
+                            os.close(fd)
+                        created = not os.path.exists(self._path(name))
+                        fd, fd_name = os.open(self._path(name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644), name
+                        if created:
+                            self._fsync_directory()
+                    data = memoryview(b"".join(record for _, _, record in batch[start:end]))
+                    while data:
+                        data = data[os.write(fd, data):]
+                    self.bytes_written += sum(len(record) for _, _, record in batch[start:end])
+                    start = end
+                os.fsync(fd)
+            except OSError as e:
+                logger.error("Journal write failed: %s", e)
+                with self._cond:
+                    self._error = e
+                    waiters, self._waiters = self._waiters, []
+                    self._cond.notify_all()
+                for _, loop, future in waiters:
+                    loop.call_soon_threadsafe(_fail, future, e)
+                return
+            with self._cond:
+                self._written_seq = batch[-1][0]
+                self.fsyncs += 1
+                self.records_written += len(batch)
+                done = [w for w in self._waiters if w[0] <= self._written_seq]
+                self._waiters = [w for w in self._waiters if w[0] > self._written_seq]
+                snapshot_due = self._bytes_since_snapshot >= self.snapshot_bytes
+                self._cond.notify_all()
+            for _, loop, future in done:
+                loop.call_soon_threadsafe(_resolve, future)
+            if snapshot_due:
+                self._maintenance.set()
+        if fd is not None:
+            os.fsync(fd)
+            os.close(fd)
+
+    async def _written(self, seq: int):
+        """Waits until record `seq` is written and fsynced."""
+        with self._lock:
+            if self._written_seq >= seq:
+                return
+            if self._error is not None:
+                raise RuntimeError("The session journal can no longer be written.") from self._error
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((seq, asyncio.get_running_loop(), future))
+        await future
+
+    async def sync(self):
+        """Waits until everything appended so far is durable."""
+        await self._written(self._seq)
+
+    # --- Reads ---
+
+    def _reader(self, name: str) -> int:
+        fd = self._readers.get(name)
+        if fd is None:
+            fd = self._readers[name] = os.open(self._path(name), os.O_RDONLY)
+        return fd
+
+    def _pin(self, locations: List[Location]) -> Dict[str, int]:
+        """Duplicates the reader of each file the locations are in (caller holds the lock).
+
+        The copies stay readable after a compaction closes the readers and removes the files,
+        so the reads can run without the lock.
+        """
+        return {name: os.dup(self._reader(name)) for name in {loc[0] for loc in locations}}
+
+    @staticmethod
+    def _read(locations: List[Location], fds: Dict[str, int]) -> List[bytes]:
+        """Event bodies in order; adjacent bodies in one file are read with a single pread."""
+        bodies: List[bytes] = []
+        i = 0
+        while i < len(locations):
+            name, start, length, _ = locations[i]
+            j, end = i + 1, start + length
+            while j < len(locations) and locations[j][0] == name and locations[j][1] == end:
+                end += locations[j][2]
+                j += 1
+            data = os.pread(fds[name], end - start, start)
+            for name_, offset, length_, _ in locations[i:j]:
+                bodies.append(data[offset - start:offset - start + length_])
+            i = j
+        return bodies
+
+    def _merged_state(self, key: SessionKey, stored: _StoredSession) -> Dict[str, Any]:
+        state = dict(stored.state)
+        for k, v in self._app_state.get(key[0], {}).items():
+            state[State.APP_PREFIX + k] = v
+        for k, v in self._user_state.get(key[:2], {}).items():
+            state[State.USER_PREFIX + k] = v
+        return state
+
+    # --- BaseSessionService ---
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        key = (app_name, user_id, session_id)
+        now = time.time()
+        app_delta, user_delta, session_state = _split_state(state)
+        meta = {"k": key, "ts": now, "s": session_state, "u": user_delta, "a": app_delta}
+        with self._lock:
+            if key in self._sessions:
+                raise AlreadyExistsError(f"Session {session_id} already exists.")
+            seq, _, _ = self._enqueue(_CREATE, meta)
+            self._apply_create(key, now, meta)
+            stored = self._sessions[key]
+            stored.last_seq = seq
+            merged = self._merged_state(key, stored)
+        if self.durable:
+            await self._written(seq)
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=merged, last_update_time=now)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            stored = self._sessions.get(key)
+            if stored is None:
+                return None
+            last_seq = stored.last_seq
+        await self._written(last_seq)  # Its records must be in the files before they can be read back.
+        with self._lock:
+            stored = self._sessions.get(key)
+            if stored is None:
+                return None
+            locations = list(stored.events)
+            if config and config.after_timestamp:
+                locations = [loc for loc in locations if loc[3] >= config.after_timestamp]
+            if config and config.num_recent_events:
+                locations = locations[-config.num_recent_events:]
+            fds = self._pin(locations)
+            state = self._merged_state(key, stored)
+            update_time = stored.update_time
+        try:
+            bodies = await asyncio.to_thread(self._read, locations, fds) if locations else []
+        finally:
+            for fd in fds.values():
+                os.close(fd)
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=state,
+                       events=[Event.model_validate_json(body) for body in bodies], last_update_time=update_time)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        with self._lock:
+            rows = [(key[1], key[2], stored.update_time) for key, stored in self._sessions.items()
+                    if key[0] == app_name and (user_id is None or key[1] == user_id)]
+        return ListSessionsResponse(sessions=[
+            Session(id=session_id, app_name=app_name, user_id=user, state={}, last_update_time=update_time)
+            for user, session_id, update_time in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            if self._sessions.pop(key, None) is None:
+                return
+            seq, _, _ = self._enqueue(_DELETE, {"k": key})
+        if self.durable:
+            await self._written(seq)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        body = event.model_dump_json(exclude_none=True).encode()
+        app_delta, user_delta, session_delta = _split_state(event.actions.state_delta if event.actions else None)
+        meta = {"k": key, "ts": event.timestamp, "s": session_delta, "u": user_delta, "a": app_delta}
+        with self._lock:
+            if key not in self._sessions:
+                logger.warning("append_event: session %s not found (deleted).", session.id)
+                return event
+            seq, name, offset = self._enqueue(_EVENT, meta, body)
+            self._apply_event(key, (name, offset, len(body), event.timestamp), meta).last_seq = seq
+        if self.durable:
+            await self._written(seq)
+        return event
+
+    # --- Recovery ---
+
+    def _recover(self) -> Tuple[int, int]:
+        """Loads the latest readable snapshot and replays the records after it; returns the active segment."""
+        started = time.perf_counter()
+        names = os.listdir(self.directory)
+        snapshots = sorted((n for n in names if _SNAPSHOT.match(n)), reverse=True)
+        position = (1, 0)
+        for name in snapshots:
+            try:
+                with open(self._path(name), "rb") as f:
+                    data = json.loads(f.read())
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable journal snapshot %s: %s", name, e)
+                continue
+            self._load_snapshot(data)
+            position = tuple(data["position"])
+            break
+        snapshot_ms = (time.perf_counter() - started) * 1000
+
+        segments = sorted(int(m.group(1)) for m in map(_SEGMENT.match, names) if m and int(m.group(1)) >= position[0])
+        active_id, active_size, replayed = position[0], position[1], 0
+        for segment_id in segments:
+            name = _segment_name(segment_id)
+            start = position[1] if segment_id == position[0] else 0
+            end, count = self._replay(name, start)
+            replayed += count
+            size = os.path.getsize(self._path(name))
+            if end < size:
+                if segment_id != segments[-1]:
+                    raise RuntimeError(f"Corrupt journal segment {name} at offset {end}.")
+                logger.warning("Truncating torn journal tail: %s at %d (%d bytes).", name, end, size - end)
+                os.truncate(self._path(name), end)
+            active_id, active_size = segment_id, end
+
+        self._snapshot_segment = position[0]
+        referenced = {loc[0] for stored in self._sessions.values() for loc in stored.events}
+        for name in names:
+            compacted, segment = _COMPACTED.match(name), _SEGMENT.match(name)
+            if compacted:
+                self._next_compacted = max(self._next_compacted, int(compacted.group(1)) + 1)
+            if (compacted or (segment and int(segment.group(1)) < position[0])) and name not in referenced:
+                os.remove(self._path(name))  # Left behind by a compaction that did not finish.
+        self.recovery = {"snapshot_ms": round(snapshot_ms, 2), "records_replayed": replayed,
+                         "total_ms": round((time.perf_counter() - started) * 1000, 2), "sessions": len(self._sessions)}
+        return active_id, active_size
+
+    def _load_snapshot(self, data: Dict[str, Any]):
+        self._app_state = {app: dict(state) for app, state in data["app"].items()}
+        self._user_state = {(app, user): dict(state) for app, user, state in data["user"]}
+        self._sessions = {}
+        for app, user, session_id, create_time, update_time, state, events in data["sessions"]:
+            stored = _StoredSession(create_time, state)
+            stored.update_time = update_time
+            stored.events = [tuple(loc) for loc in events]
+            self._sessions[(app, user, session_id)] = stored
+        self._next_compacted = data.get("next_compacted", 1)
+
+    def _replay(self, name: str, start: int) -> Tuple[int, int]:
+        """Applies the records of one segment from `start`; returns where the valid records end and their count."""
+        with open(self._path(name), "rb") as f:
+            f.seek(start)
+            data = f.read()
+        offset, count = 0, 0
+        while offset + _HEADER.size <= len(data):
+            length, crc = _HEADER.unpack_from(data, offset)
+            payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            tag, newline = payload[:1], payload.index(b"\n")
+            meta = json.loads(payload[1:newline])
+            key = tuple(meta["k"])
+            if tag == _CREATE:
+                self._apply_create(key, meta["ts"], meta)
+            elif tag == _EVENT:
+                body_offset = start + offset + _HEADER.size + newline + 1
+                self._apply_event(key, (name, body_offset, length - newline - 1, meta["ts"]), meta)
+            elif tag == _DELETE:
+                self._sessions.pop(key, None)
+            offset += _HEADER.size + length
+            count += 1
+        return start + offset, count
+
+    # --- Snapshots and compaction ---
+
+    def snapshot(self):
+        """Writes the index as of the current journal position; records before it are then never replayed."""
+        with self._cond:
+            position, seq = (self._active_id, self._active_size), self._seq
+            data = {
+                "position": position,
+                "next_compacted": self._next_compacted,
+                "app": {app: dict(state) for app, state in self._app_state.items()},
+                "user": [[app, user, dict(state)] for (app, user), state in self._user_state.items()],
+                "sessions": [[*key, s.create_time, s.update_time, dict(s.state), list(s.events)]
+                             for key, s in self._sessions.items()],
+            }
+            self._bytes_since_snapshot = 0
+            while self._written_seq < seq and self._error is None:
+                self._cond.wait()  # The snapshot may only cover records that are durable.
+        name = f"snapshot-{position[0]:08d}-{position[1]:012d}.json"
+        tmp = self._path(name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_json(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(name))
+        self._fsync_directory()
+        for old in os.listdir(self.directory):
+            if _SNAPSHOT.match(old) and old < name:
+                os.remove(self._path(old))
+        with self._lock:
+            self._snapshot_segment = position[0]
+        self.snapshots += 1
+
+    def _tier(self, size: int) -> int:
+        """0 below one segment; tier n holds files of up to compact_fanout**n segments."""
+        if size < self.segment_bytes:
+            return 0
+        return int(math.log(size / self.segment_bytes, self.compact_fanout)) + 1
+
+    def compact(self) -> int:
+        """Copies live events out of old segments and merges compacted files size-tiered; returns files removed."""
+        with self._lock:
+            live: Dict[str, int] = {}
+            for stored in self._sessions.values():
+                for name, _, length, _ in stored.events:
+                    live[name] = live.get(name, 0) + length
+            candidates = set()
+            tiers: Dict[int, List[str]] = {}
+            for name in os.listdir(self.directory):
+                segment, compacted = _SEGMENT.match(name), _COMPACTED.match(name)
+                if segment and int(segment.group(1)) < self._snapshot_segment:
+                    candidates.add(name)
+                elif compacted:
+                    size = os.path.getsize(self._path(name))
+                    tier = self._tier(size)
+                    # Mostly dead, or small enough to merge with the next compaction's output.
+                    if tier == 0 or live.get(name, 0) < (1 - self.compact_dead_ratio) * size:
+                        candidates.add(name)
+                    else:
+                        tiers.setdefault(tier, []).append(name)
+            for names in tiers.values():
+                if len(names) >= self.compact_fanout:
+                    candidates.update(names)  # A full tier merges into one file of the next.
+            if not candidates:
+                return 0
+            moves = [(key, [loc for loc in stored.events if loc[0] in candidates])
+                     for key, stored in self._sessions.items()]
+            moves = [(key, locations) for key, locations in moves if locations]
+            target = f"c{self._next_compacted:08d}.log"
+            self._next_compacted += 1
+            fds = self._pin([loc for _, locations in moves for loc in locations])
+
+        try:
+            bodies = [self._read(locations, fds) for _, locations in moves]  # Old files are immutable.
+        finally:
+            for fd in fds.values():
+                os.close(fd)
+
+        mapping: Dict[Tuple[str, int, int], Tuple[str, int, int]] = {}
+        offset = 0
+        with open(self._path(target), "wb") as f:
+            for (_, locations), session_bodies in zip(moves, bodies):
+                f.write(b"".join(session_bodies))
+                for (name, old_offset, length, _), body in zip(locations, session_bodies):
+                    mapping[(name, old_offset, length)] = (target, offset, length)
+                    offset += length
+            f.flush()
+            os.fsync(f.fileno())
+        self._fsync_directory()
+
+        with self._lock:
+            for key, _ in moves:
+                stored = self._sessions.get(key)
+                if stored is not None:
+                    stored.events = [(*mapping[loc[:3]], loc[3]) if loc[:3] in mapping else loc for loc in stored.events]
+        self.snapshot()  # The new snapshot points at the compacted file; only then are the old files removed.
+        with self._lock:
+            for name in candidates:
+                fd = self._readers.pop(name, None)
+                if fd is not None:
+                    os.close(fd)
+                os.remove(self._path(name))
+        if offset == 0:
+            os.remove(self._path(target))
+        self.compactions += 1
+        self.bytes_compacted += offset
+        logger.info("Compacted %d journal files into %s (%d live bytes).", len(candidates), target, offset)
+        return len(candidates)
+
+    def _maintenance_loop(self):
+        while True:
+            self._maintenance.wait()
+            self._maintenance.clear()
+            if self._closing:
+                return
+            try:
+                self.snapshot()
+                self.compact()
+            except Exception as e:
+                logger.warning("Journal maintenance failed: %s", e)
+
+    def close(self, snapshot: bool = True):
+        """Drains the writer; with `snapshot`, writes a final snapshot so the next open replays nothing."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._maintenance.set()
+        self._writer.join()
+        self._maintainer.join()
+        if snapshot and self._error is None:
+            self.snapshot()
+        with self._lock:
+            for fd in self._readers.values():
+                os.close(fd)
+            self._readers.clear()
+
+    # --- Accounting ---
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "records_written": self.records_written,
+            "fsyncs": self.fsyncs,
+            "records_per_fsync": round(self.records_written / self.fsyncs, 2) if self.fsyncs else 0.0,
+            "bytes_written": self.bytes_written,
+            "snapshots": self.snapshots,
+            "compactions": self.compactions,
+            "bytes_compacted": self.bytes_compacted,
+            "recovery": self.recovery,
+        }
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _fail(future: asyncio.Future, error: BaseException):
+    if not future.done():
+        future.set_exception(RuntimeError(f"Session journal write failed: {error}"))
@@ -0,0 +1,117 @@
+"""A local stand-in for Vertex AI Memory Bank.
+
+`LocalMemoryService` keeps memories per (app, user) in process, optionally
+persisted to a JSON file, and answers `search_memory` with a keyword-overlap
+ranking over every memory the user has. Like the real service, each
+consolidated session adds new entries, so repeated sessions pile up
+near-duplicates; `memory_agent.memory_dedup` merges them.
+
+Consolidation is deliberately simple: each sentence the user wrote (three
+words or more) becomes one memory.
+"""
+import datetime
+import json
+import math
+import os
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.genai import types
+
+_WORD = re.compile(r"[a-z0-9']+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i i'm in is it its me my of on or so that the this to was "
+    "we were with you your".split()
+)
+
+UserKey = Tuple[str, str]
+
+
+def tokens(text: str) -> FrozenSet[str]:
+    return frozenset(w for w in _WORD.findall(text.lower()) if w not in STOPWORDS)
+
+
+class StoredMemory:
+    __slots__ = ("text", "author", "timestamp", "merged", "tokens")
+
+    def __init__(self, text: str, author: str = "user", timestamp: Optional[str] = None, merged: int = 1):
+        self.text = text
+        self.author = author
+        self.timestamp = timestamp
+        self.merged = merged  # How many raw memories this entry stands for.
+        self.tokens = tokens(text)
+
+    def to_dict(self) -> dict:
+        return {"text": self.text, "author": self.author, "timestamp": self.timestamp, "merged": self.merged}
+
+    def to_entry(self) -> MemoryEntry:
+        return MemoryEntry(content=types.Content(role="user", parts=[types.Part(text=self.text)]),
+                           author=self.author, timestamp=self.timestamp)
+
+
+class LocalMemoryService(BaseMemoryService):
+    def __init__(self, path: Optional[str] = None, top_k: int = 10):
+        self.path = path
+        self.top_k = top_k
+        self.memories: Dict[UserKey, List[StoredMemory]] = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    # --- Persistence ---
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.memories = {
+            (app, user): [StoredMemory(**m) for m in entries]
+            for app, users in data.items() for user, entries in users.items()
+        }
+
+    def save(self):
+        if not self.path:
+            return
+        data: Dict[str, Dict[str, list]] = {}
+        for (app, user), entries in self.memories.items():
+            data.setdefault(app, {})[user] = [m.to_dict() for m in entries]
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    # --- Writes ---
+
+    def add_memories(self, app_name: str, user_id: str, texts: Iterable[str], author: str = "user",
+                     timestamp: Optional[str] = None):
+        timestamp = timestamp or datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.memories.setdefault((app_name, user_id), []).extend(StoredMemory(t, author, timestamp) for t in texts)
+
+    async def add_session_to_memory(self, session):
+        facts = []
+        for event in session.events:
+            if event.author != "user" or not event.content or not event.content.parts:
+                continue
+            for part in event.content.parts:
+                for sentence in _SENTENCE.split(part.text or ""):
+                    if len(sentence.split()) >= 3:
+                        facts.append(sentence.strip())
+        if facts:
+            self.add_memories(session.app_name, session.user_id, facts)
+            self.save()
+
+    # --- Reads ---
+
+    def rank(self, app_name: str, user_id: str, query: str) -> List[StoredMemory]:
+        query_tokens = tokens(query)
+        scored = []
+        for memory in self.memories.get((app_name, user_id), ()):
+            overlap = len(query_tokens & memory.tokens)
+            if overlap:
+                scored.append((overlap / math.sqrt(len(memory.tokens)), memory))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [m for _, m in scored[:self.top_k]]
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        return SearchMemoryResponse(memories=[m.to_entry() for m in self.rank(app_name, user_id, query)])
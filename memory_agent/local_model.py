@@ -0,0 +1,186 @@
+"""A local, deterministic model backend that decides tool calls and hand-offs from rules.
+
+`LocalLlm` is a FakeLlm (same latency, throughput and throttling knobs)
+whose answers come from an ordered rule list instead of a fixed plan, so
+every step's scenario runs end to end without network or credentials:
+
+    {"agent": "master_trip_planner",                  # optional: name or list of agent names
+     "when": r"in (?P<city>[A-Z]\\w+)",                # optional: regex on the user's message
+     "unless": r"...",                                 # optional: must not match the message
+     "tools": "save_itinerary_day",                    # optional: only for agents that have this tool
+     "instruction": r"...", "not_instruction": r"...", # optional: regexes on the system instruction
+     "call": "get_itinerary_day", "args": {"day": 1}}  # or "transfer": "<agent>", or "reply": "<text>"
+
+Rules are tried in order and the first that applies decides the response.
+A call rule applies only if the agent has the tool and has not made that
+exact call since the user's message, so call rules run once per turn and a
+reply rule placed after them answers once they are done. Named groups of
+the `when` / `instruction` matches fill `{name}` placeholders in args,
+replies and transfer targets; an arg that is only a placeholder for a
+number becomes an int.
+With no applicable rule the model answers with `reply`.
+
+DEFAULT_RULES drive the six steps' scenarios. Rules from the JSON file in
+MEMORY_AGENT_LOCAL_RULES are tried before them.
+"""
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+from pydantic import Field
+
+from .fake_model import FakeLlm
+
+TRANSFER_TOOL = "transfer_to_agent"
+_CONTEXT_PREFIX = "For context:"  # How ADK shows other agents' turns to the current one.
+_NUMBER_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+_TRIP = r"(?P<days>\d+)-day trip to (?P<destination>[A-Z]\w+)"
+
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    # step_01 / step_03: itinerary planners.
+    {"when": _TRIP + r"|trip to (?P<city>[A-Z]\w+)", "call": "search_agent",
+     "args": {"request": "Top historic sites and food in {destination}{city}"}},
+    {"when": _TRIP, "call": "save_trip_profile",
+     "args": {"destination": "{destination}", "duration_days": "{days}", "interests": "sightseeing, local food"}},
+    {"when": _TRIP, "call": "save_itinerary_day", "args": {"day": 1, "title": "Historic {destination}", "activities": [
+        "Morning: Old town walk - arrive early", "Lunch: Local market - counter seats", "Afternoon: City museum"]}},
+    {"when": _TRIP, "call": "save_itinerary_day", "args": {"day": 2, "title": "Modern {destination}", "activities": [
+        "Morning: Gardens - quiet before 10", "Lunch: Food hall", "Evening: Night views"]}},
+    {"when": _TRIP, "tools": "save_itinerary_day", "reply": "Here is your {days}-day plan for {destination}:\n[[ITINERARY]]"},
+    {"when": r"(?i)\b(?:remember|liked|previous)\b", "call": "get_itinerary_day", "args": {"day": 1}},
+    {"when": r"(?i)\b(?:remember|liked|previous)\b", "tools": "get_itinerary_day",
+     "reply": "From what you told me before, here is what we planned:\n[[DAY 1]]"},
+    {"agent": "search_agent", "reply": "Top picks: the historic temple district, the central fish market and a "
+                                       "sushi counter near the station."},
+    # step_02: sequential foodie -> transportation.
+    {"agent": "foodie_agent", "when": r"(?i)sushi", "reply": "Jin Sho"},
+    {"agent": "foodie_agent", "reply": "Evvia Estiatorio"},
+    {"agent": "transportation_agent", "instruction": r"go to: (?P<place>[^.\n]+)",
+     "reply": "From the downtown Caltrain station, walk north on University Avenue for five minutes; "
+              "{place} is on your right."},
+    # step_04: the master planner hands off, never repeating the last activity type.
+    {"agent": "master_trip_planner", "when": r"(?i)\b(?:museum|art|history|culture)", "not_instruction": r"planned was: CULTURAL",
+     "transfer": "museum_expert"},
+    {"agent": "master_trip_planner", "when": r"(?i)\b(?:eat|food|restaurant|lunch|dinner)\b", "not_instruction": r"planned was: FOOD",
+     "transfer": "restaurant_expert"},
+    {"agent": "master_trip_planner", "when": r"(?i)\b(?:hike|park|outdoor|walk)", "not_instruction": r"planned was: OUTDOOR",
+     "transfer": "outdoor_expert"},
+    {"agent": "master_trip_planner", "instruction": r"measured speed, fastest first\): `(?P<specialist>\w+)`", "transfer": "{specialist}"},
+    {"agent": "master_trip_planner", "not_instruction": r"planned was: CULTURAL", "transfer": "museum_expert"},
+    {"agent": "master_trip_planner", "transfer": "restaurant_expert"},
+    {"agent": "museum_expert", "reply": "Visit Kiyomizu-dera early in the morning, before the crowds."},
+    {"agent": "restaurant_expert", "reply": "Try kaiseki at Gion Karyo for lunch."},
+    {"agent": "outdoor_expert", "reply": "Walk the Arashiyama bamboo grove and up to the monkey park."},
+    # step_05: recall the profile every turn, save what the user states.
+    {"call": "recall_user_preferences", "args": {}},
+    {"when": r"(?i)allergic to (?P<allergen>[\w ]+?)[.,!]", "call": "save_user_preferences",
+     "args": {"new_preferences": {"allergies": "{allergen}"}}},
+    {"when": r"(?i)\bI(?: am|'m) (?:a )?(?P<diet>vegetarian|vegan)", "call": "save_user_preferences",
+     "args": {"new_preferences": {"dietary_restrictions": "{diet}"}}},
+    # step_06: budget estimates.
+    {"when": _TRIP + r"(?=.*\b(?:[Cc]ost|[Bb]udget))", "call": "calculate_trip_budget",
+     "args": {"destination": "{destination}", "days": "{days}", "style": "mid-range"}},
+]
+
+
+def load_rules(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rules from `path` (or MEMORY_AGENT_LOCAL_RULES) followed by DEFAULT_RULES."""
+    path = path or os.getenv("MEMORY_AGENT_LOCAL_RULES")
+    extra = []
+    if path:
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+    return extra + DEFAULT_RULES
+
+
+def _user_text(llm_request: LlmRequest) -> Tuple[str, int]:
+    """The user's message for this turn and its index in the contents."""
+    for index in range(len(llm_request.contents) - 1, -1, -1):
+        content = llm_request.contents[index]
+        if content.role != "user":
+            continue
+        text = " ".join(p.text for p in content.parts or () if p.text)
+        if text and not text.startswith(_CONTEXT_PREFIX):
+            return text, index
+    return "", -1
+
+
+def _fill(template: Any, groups: Dict[str, str]) -> Any:
+    if isinstance(template, dict):
+        return {k: _fill(v, groups) for k, v in template.items()}
+    if isinstance(template, list):
+        return [_fill(v, groups) for v in template]
+    if not isinstance(template, str):
+        return template
+    filled = _NUMBER_PLACEHOLDER.sub(lambda m: groups.get(m.group(1)) or "", template)
+    whole = _NUMBER_PLACEHOLDER.fullmatch(template)
+    return int(filled) if whole and filled.isdigit() else filled
+
+
+def _matches(pattern: Optional[str], text: str, groups: Dict[str, str]) -> bool:
+    if pattern is None:
+        return True
+    match = re.search(pattern, text)
+    if match:
+        groups.update({k: v for k, v in match.groupdict().items() if v is not None})
+    return bool(match)
+
+
+class LocalLlm(FakeLlm):
+    """FakeLlm that answers from `rules`; one instance per agent (`agent_name` selects agent-specific rules)."""
+
+    agent_name: str = ""
+    rules: List[Dict[str, Any]] = Field(default_factory=list)
+    reply: str = "Noted! (local model)"
+
+    def _decide(self, llm_request: LlmRequest) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """The first applicable rule's function call ({"name", "args"}) or reply text."""
+        text, index = _user_text(llm_request)
+        instruction = str(llm_request.config.system_instruction or "") if llm_request.config else ""
+        made = [(p.function_call.name, p.function_call.args or {})
+                for content in llm_request.contents[index + 1:] for p in content.parts or () if p.function_call]
+        tools = llm_request.tools_dict
+        for rule in self.rules:
+            agents = rule.get("agent")
+            if agents and self.agent_name not in ([agents] if isinstance(agents, str) else agents):
+                continue
+            if rule.get("tools") and rule["tools"] not in tools:
+                continue
+            groups: Dict[str, str] = {}
+            if not (_matches(rule.get("when"), text, groups) and _matches(rule.get("instruction"), instruction, groups)):
+                continue
+            if (rule.get("unless") and re.search(rule["unless"], text)) or (
+                    rule.get("not_instruction") and re.search(rule["not_instruction"], instruction)):
+                continue
+            if "reply" in rule:
+                return None, _fill(rule["reply"], groups)
+            if "transfer" in rule:
+                call = {"name": TRANSFER_TOOL, "args": {"agent_name": _fill(rule["transfer"], groups)}}
+                if any(name == TRANSFER_TOOL for name, _ in made):
+                    continue
+            else:
+                call = {"name": rule["call"], "args": _fill(rule.get("args", {}), groups)}
+                if call["name"] not in tools or (call["name"], call["args"]) in made:
+                    continue
+            return call, None
+        return None, None
+
+    def _planned_call(self, llm_request: LlmRequest) -> Optional[types.FunctionCall]:
+        call, _ = self._decide(llm_request)
+        return types.FunctionCall(name=call["name"], args=call["args"]) if call else None
+
+    def _reply_text(self, llm_request: LlmRequest) -> str:
+        _, text = self._decide(llm_request)
+        return text or self.reply
+
+    @classmethod
+    def from_env(cls, agent_name: str, model: str = "gemini-2.5-flash", rules: Optional[Iterable[dict]] = None) -> "LocalLlm":
+        """Latency and throughput from MEMORY_AGENT_LOCAL_LATENCY_MS, _PROMPT_TOKENS_PER_S and _TOKENS_PER_S."""
+        return cls(model=model, agent_name=agent_name, rules=list(rules) if rules is not None else load_rules(),
+                   latency_s=float(os.getenv("MEMORY_AGENT_LOCAL_LATENCY_MS", "0")) / 1000,
+                   prompt_tokens_per_s=float(os.getenv("MEMORY_AGENT_LOCAL_PROMPT_TOKENS_PER_S", "0")),
+                   tokens_per_s=float(os.getenv("MEMORY_AGENT_LOCAL_TOKENS_PER_S", "0")))
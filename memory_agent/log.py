@@ -0,0 +1,149 @@
+"""Structured, level-gated logging with a non-blocking queue sink.
+
+All agent modules log through children of the `memory_agent` logger:
+
+    logger = get_logger("step_04")
+    logger.info("Transferred to %s", agent_name, extra={"agent": agent_name})
+
+- Records are handed to a `QueueHandler`; formatting and the stderr write
+  happen on a background `QueueListener` thread, never on the event loop.
+- Use %-style arguments: when a level is disabled the call returns after
+  the cached `isEnabledFor` check, without building the message.
+- The queue holds at most MEMORY_AGENT_LOG_QUEUE_SIZE records (default
+  10000). When the listener falls that far behind, new records are dropped
+  and counted (`dropped_records()`) rather than growing memory without bound.
+- Per-turn chatter goes to `get_turn_logger(...)`, which keeps only one in
+  every MEMORY_AGENT_LOG_SAMPLE_EVERY records (default: all of them).
+
+Environment: MEMORY_AGENT_LOG_LEVEL (default INFO), MEMORY_AGENT_LOG_FORMAT
+(`text` or `json`), MEMORY_AGENT_LOG_SAMPLE_EVERY (default 1),
+MEMORY_AGENT_LOG_QUEUE_SIZE (default 10000).
+"""
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import Optional
+
+ROOT_LOGGER = "memory_agent"
+
+# Attributes present on every LogRecord; anything else came in through `extra`.
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["_DeferredQueueHandler"] = None
+_configure_lock = threading.Lock()
+
+
+class StructuredFormatter(logging.Formatter):
+    """Renders the message plus any `extra` fields, as text or one JSON object per line."""
+
+    def __init__(self, fmt: str = "text"):
+        super().__init__()
+        self.json = fmt == "json"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {k: v for k, v in record.__dict__.items() if k not in _STANDARD_ATTRS}
+        message = record.getMessage()
+        exc = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if self.json:
+            entry = {"ts": round(record.created, 6), "level": record.levelname, "logger": record.name, "msg": message}
+            entry.update(fields)
+            if exc:
+                entry["exc"] = exc
+            return json.dumps(entry, default=str, ensure_ascii=False)
+        if fields:
+            message += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if exc:
+            message += "\n" + exc
+        return message
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues the raw record; the listener thread does all the formatting. Drops records when the queue is full."""
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the stdlib default, don't merge args here. Exception info is
+        # rendered now because tracebacks can't safely cross threads later.
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Waits for room; the listener is still draining.
+
+
+class SampleEveryN(logging.Filter):
+    """Lets through one record in every `n`; errors always pass."""
+
+    def __init__(self, n: int):
+        super().__init__()
+        self.n = max(1, n)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.ERROR or next(self._counter) % self.n == 0
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None):
+    """Installs the queue sink on the `memory_agent` logger (idempotent unless re-called explicitly)."""
+    global _listener, _handler
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers.clear()
+        root.setLevel((level or os.getenv("MEMORY_AGENT_LOG_LEVEL", "INFO")).upper())
+        root.propagate = False
+
+        sink = logging.StreamHandler(stream or sys.stderr)
+        sink.setFormatter(StructuredFormatter(fmt or os.getenv("MEMORY_AGENT_LOG_FORMAT", "text")))
+        records: queue.Queue = queue.Queue(maxsize=int(os.getenv("MEMORY_AGENT_LOG_QUEUE_SIZE", "10000")))
+        _handler = _DeferredQueueHandler(records)
+        root.addHandler(_handler)
+        _listener = _QueueListener(records, sink, respect_handler_level=True)
+        _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+def get_logger(name: str) -> logging.Logger:
+    if _listener is None:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def get_turn_logger(name: str) -> logging.Logger:
+    """Logger for messages emitted on every turn or tool call; sampled."""
+    logger = get_logger(f"{name}.turn")
+    if not any(isinstance(f, SampleEveryN) for f in logger.filters):
+        logger.addFilter(SampleEveryN(int(os.getenv("MEMORY_AGENT_LOG_SAMPLE_EVERY", "1"))))
+    return logger
@@ -0,0 +1,157 @@
+"""Merges near-duplicate memories per user and topic.
+
+Every consolidated session adds memories, so a user who keeps saying "I
+loved Gaeta" ends up with a dozen versions of it, and every preload search
+scans and ranks all of them. This job clusters each user's memories within
+a topic by token Jaccard similarity (>= `threshold`) and replaces each
+cluster with one canonical entry: the member closest to the cluster's shared
+wording, stamped with the cluster's latest timestamp and the number of
+memories it stands for. The job rewrites the store file, so run it while no
+service process is writing to it.
+
+Candidate pairs come from prefix filtering: tokens are ordered rarest first,
+and two sets can only reach the threshold if their short prefixes share a
+token, so most pairs are never compared.
+
+    python -m memory_agent.memory_dedup memories.json --threshold 0.6 \\
+        --topics step_06_multimodal_agent --interval 3600
+"""
+import argparse
+import collections
+import importlib.util
+import math
+import os
+import random
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .local_memory import LocalMemoryService, StoredMemory
+from .metrics import Histogram
+
+
+def jaccard(a, b) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def cluster(memories: List[StoredMemory], threshold: float) -> List[List[int]]:
+    """Groups indices of memories whose token sets are (transitively) >= threshold similar."""
+    frequency = collections.Counter(t for m in memories for t in m.tokens)
+    ordered = [sorted(m.tokens, key=lambda t: (frequency[t], t)) for m in memories]
+    parent = list(range(len(memories)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index: Dict[str, List[int]] = collections.defaultdict(list)
+    for i, toks in enumerate(ordered):
+        prefix = toks[:len(toks) - math.ceil(threshold * len(toks)) + 1]
+        candidates = {j for t in prefix for j in index[t]}
+        for j in candidates:
+            if find(i) != find(j) and jaccard(memories[i].tokens, memories[j].tokens) >= threshold:
+                parent[find(i)] = find(j)
+        for t in prefix:
+            index[t].append(i)
+
+    groups: Dict[int, List[int]] = collections.defaultdict(list)
+    for i in range(len(memories)):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+def merge(members: List[StoredMemory]) -> StoredMemory:
+    # Canonical phrasing: most tokens the cluster agrees on, fewest one-off additions.
+    counts = collections.Counter(t for m in members for t in m.tokens)
+    consensus = {t for t, n in counts.items() if 2 * n >= len(members)}
+    canonical = max(members, key=lambda m: (len(m.tokens & consensus) - len(m.tokens - consensus), m.timestamp or ""))
+    timestamps = [m.timestamp for m in members if m.timestamp]
+    return StoredMemory(canonical.text, canonical.author, max(timestamps) if timestamps else None,
+                        merged=sum(m.merged for m in members))
+
+
+def dedup_memories(memories: List[StoredMemory], threshold: float = 0.6,
+                   topic_of: Optional[Callable[[str], Hashable]] = None) -> List[StoredMemory]:
+    by_topic: Dict[Hashable, List[StoredMemory]] = collections.defaultdict(list)
+    for memory in memories:
+        by_topic[topic_of(memory.text) if topic_of else None].append(memory)
+    result = []
+    for group in by_topic.values():
+        result.extend(merge([group[i] for i in members]) for members in cluster(group, threshold))
+    result.sort(key=lambda m: m.timestamp or "")
+    return result
+
+
+def _search_latency(service: LocalMemoryService, probes: List[tuple]) -> Histogram:
+    histogram = Histogram()
+    for app_name, user_id, query in probes:
+        started = time.perf_counter()
+        service.rank(app_name, user_id, query)
+        histogram.observe(time.perf_counter() - started)
+    return histogram
+
+
+def run_dedup(service: LocalMemoryService, threshold: float = 0.6, topic_of: Optional[Callable[[str], Hashable]] = None,
+              probes_per_user: int = 20, dry_run: bool = False) -> Dict[str, Any]:
+    """Dedups every user's memories in place and reports the shrinkage and search latency before/after."""
+    rng = random.Random(0)
+    probes = [(app, user, m.text) for (app, user), entries in service.memories.items()
+              for m in rng.sample(entries, min(probes_per_user, len(entries)))]
+    before_count = sum(len(e) for e in service.memories.values())
+    before_bytes = sum(len(m.text.encode()) for e in service.memories.values() for m in e)
+    latency_before = _search_latency(service, probes)
+
+    deduped = {key: dedup_memories(entries, threshold, topic_of) for key, entries in service.memories.items()}
+    original = service.memories
+    service.memories = deduped
+    latency_after = _search_latency(service, probes)
+    if dry_run:
+        service.memories = original
+    else:
+        service.save()
+
+    after_count = sum(len(e) for e in deduped.values())
+    after_bytes = sum(len(m.text.encode()) for e in deduped.values() for m in e)
+    return {
+        "users": len(deduped),
+        "memories_before": before_count,
+        "memories_after": after_count,
+        "shrink_pct": round(100 * (1 - after_count / before_count), 1) if before_count else 0.0,
+        "bytes_before": before_bytes,
+        "bytes_after": after_bytes,
+        "search_before": latency_before.summary(),
+        "search_after": latency_after.summary(),
+    }
+
+
+def load_topic_classifier(step: str) -> Callable[[str], Hashable]:
+    """Uses a step's `memory_topics.classify_topics` (e.g. step_06's) as the topic key."""
+    from .steps import REPO_ROOT
+
+    path = os.path.join(REPO_ROOT, step, "memory_topics.py")
+    spec = importlib.util.spec_from_file_location(f"{step}_memory_topics", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return lambda text: "|".join(sorted(module.classify_topics(text)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge near-duplicate memories in a LocalMemoryService store.")
+    parser.add_argument("store", help="LocalMemoryService JSON file")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Token Jaccard similarity to merge at.")
+    parser.add_argument("--topics", help="Step whose memory_topics.py classifies memories (dedup within a topic).")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--interval", type=float, default=0, help="Rerun every N seconds (0 = once).")
+    args = parser.parse_args()
+
+    topic_of = load_topic_classifier(args.topics) if args.topics else None
+    while True:
+        report = run_dedup(LocalMemoryService(args.store), args.threshold, topic_of, dry_run=args.dry_run)
+        print(f"🧹 {report['users']} users: {report['memories_before']} -> {report['memories_after']} memories "
+              f"(-{report['shrink_pct']}%), {report['bytes_before']} -> {report['bytes_after']} bytes; "
+              f"search p50 {report['search_before']['p50_ms']} -> {report['search_after']['p50_ms']} ms, "
+              f"p95 {report['search_before']['p95_ms']} -> {report['search_after']['p95_ms']} ms")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
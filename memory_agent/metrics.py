@@ -0,0 +1,52 @@
+"""Small, dependency-free latency metrics."""
+import bisect
+import math
+import threading
+from typing import Any, Dict
+
+# Bucket upper bounds in milliseconds: 0.05ms .. ~10min, ~10 buckets per decade.
+DEFAULT_BOUNDS_MS = tuple(round(0.05 * 10 ** (i / 10), 4) for i in range(72))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; safe to record from any thread."""
+
+    def __init__(self, bounds_ms=DEFAULT_BOUNDS_MS):
+        self.bounds_ms = tuple(bounds_ms)
+        self.buckets = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000.0
+        index = bisect.bisect_left(self.bounds_ms, ms)
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        """Returns the upper bound (ms) of the bucket holding the p-th percentile."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(self.count * p / 100.0))
+            seen = 0
+            for index, n in enumerate(self.buckets):
+                seen += n
+                if seen >= rank:
+                    return min(self.bounds_ms[index], self.max_ms) if index < len(self.bounds_ms) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
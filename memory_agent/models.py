@@ -0,0 +1,78 @@
+"""Model backend registry: which model the agents run on, chosen by configuration.
+
+Every agent.py declares `model="gemini-2.5-flash"` and calls
+`install_model_backend(root_agent)` before wrapping its models (admission
+control, hedging). MEMORY_AGENT_MODEL_BACKEND selects the backend:
+
+    gemini   (default) the declared Gemini model; MEMORY_AGENT_MODEL overrides its name
+    local    LocalLlm: deterministic rules, no network (see memory_agent/local_model.py),
+             MEMORY_AGENT_LOCAL_LATENCY_MS / _PROMPT_TOKENS_PER_S / _TOKENS_PER_S set its speed
+
+    MEMORY_AGENT_MODEL_BACKEND=local python step_04_stateful_agent/main.py
+
+Backends registered as offline also tell the mains to use local session and
+memory services (step_06 otherwise needs a Vertex AI project). Register more
+backends with `register_backend`.
+"""
+import os
+from typing import Callable, Dict, NamedTuple, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models.base_llm import BaseLlm
+
+from .agents import replace_models
+
+BACKEND_ENV = "MEMORY_AGENT_MODEL_BACKEND"
+DEFAULT_BACKEND = "gemini"
+
+# (agent, its current model) -> the model it should use
+ModelFactory = Callable[[LlmAgent, BaseLlm], BaseLlm]
+
+
+class Backend(NamedTuple):
+    factory: ModelFactory
+    offline: bool
+
+
+_BACKENDS: Dict[str, Backend] = {}
+
+
+def register_backend(name: str, factory: ModelFactory, offline: bool = False):
+    _BACKENDS[name] = Backend(factory, offline)
+
+
+def backend_name() -> str:
+    return os.getenv(BACKEND_ENV, DEFAULT_BACKEND).lower()
+
+
+def get_backend(name: Optional[str] = None) -> Backend:
+    name = name or backend_name()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown model backend '{name}' ({BACKEND_ENV}). Choose one of: {', '.join(_BACKENDS)}")
+    return _BACKENDS[name]
+
+
+def offline_backend(name: Optional[str] = None) -> bool:
+    """True if the backend needs no network, so the caller should use local services too."""
+    return get_backend(name).offline
+
+
+def install_model_backend(agent: BaseAgent, name: Optional[str] = None):
+    """Swaps every model in the agent tree for the configured backend's; call before wrapping models."""
+    replace_models(agent, get_backend(name).factory)
+
+
+# --- Backends ---
+
+def _gemini(agent: LlmAgent, model: BaseLlm) -> BaseLlm:
+    model_name = os.getenv("MEMORY_AGENT_MODEL")
+    return model.__class__(model=model_name) if model_name and model.model != model_name else model
+
+
+def _local(agent: LlmAgent, model: BaseLlm) -> BaseLlm:
+    from .local_model import LocalLlm
+    return LocalLlm.from_env(agent.name, model=model.model)
+
+
+register_backend("gemini", _gemini)
+register_backend("local", _local, offline=True)
@@ -0,0 +1,187 @@
+"""Warm-start prefetch: load what a returning user's first turn needs as soon as the session exists.
+
+A new session's first turn used to fetch the user's previous session,
+preferences and memories only after the message arrived, one after the
+other, all on the turn's critical path. `Prefetcher` starts every
+registered loader concurrently when the session is created (wrap the
+session service in `PrefetchingSessionService`), so the time the user
+spends typing overlaps the loads and the first turn only awaits results
+that are already in flight:
+
+    prefetcher = Prefetcher()
+    prefetcher.register("session_digest", session_digest_loader(sessions))
+    prefetcher.register("memories", memory_loader(memory, PROFILE_QUERY))
+    session_service = PrefetchingSessionService(sessions, prefetcher)
+    ...
+    digest = await prefetcher.take(app, user_id, session.id, "session_digest")
+
+Each prefetched result is handed out once (`take`); asking for one that was
+never started runs the loader inline and counts as a miss. Sessions that
+never take their results are dropped, and their loads cancelled, beyond
+`max_sessions`. See benchmarks/bench_prefetch.py for the first-turn gain.
+"""
+import asyncio
+import collections
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig
+
+from .log import get_turn_logger
+from .metrics import Histogram
+from .tracing import tracer
+
+turn_logger = get_turn_logger("prefetch")
+
+# (app_name, user_id, session_id) -> result
+Loader = Callable[[str, str, str], Awaitable[Any]]
+SessionKey = Tuple[str, str, str]
+
+
+class Prefetcher:
+    def __init__(self, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        self.loaders: Dict[str, Loader] = {}
+        self._inflight: "collections.OrderedDict[SessionKey, Dict[str, asyncio.Task]]" = collections.OrderedDict()
+        self.hits = self.misses = self.evicted = 0
+        self.load_latency: Dict[str, Histogram] = {}
+        self.wait_latency = Histogram()  # What the first turn still waited for.
+
+    def register(self, name: str, loader: Loader) -> Loader:
+        self.loaders[name] = loader
+        self.load_latency.setdefault(name, Histogram())
+        return loader
+
+    def start(self, app_name: str, user_id: str, session_id: str):
+        """Starts every loader for the session on the running loop; returns immediately."""
+        key = (app_name, user_id, session_id)
+        if key in self._inflight or not self.loaders:
+            return
+        tasks = self._inflight[key] = {name: asyncio.ensure_future(self._load(name, key)) for name in self.loaders}
+        for task in tasks.values():
+            task.add_done_callback(_log_failure)
+        while len(self._inflight) > self.max_sessions:
+            _, stale = self._inflight.popitem(last=False)
+            for task in stale.values():
+                task.cancel()
+            self.evicted += 1
+
+    async def _load(self, name: str, key: SessionKey) -> Any:
+        started = time.perf_counter()
+        with tracer.span("prefetch.load", app=key[0], session_id=key[2], loader=name):
+            try:
+                return await self.loaders[name](*key)
+            finally:
+                self.load_latency[name].observe(time.perf_counter() - started)
+
+    def has(self, app_name: str, user_id: str, session_id: str, name: str) -> bool:
+        """True if `name` was prefetched for the session and not taken yet."""
+        return name in self._inflight.get((app_name, user_id, session_id), ())
+
+    async def take(self, app_name: str, user_id: str, session_id: str, name: str) -> Any:
+        """The prefetched result (awaiting it if still loading), or the loader run inline."""
+        key = (app_name, user_id, session_id)
+        pending = self._inflight.get(key)
+        task = pending.pop(name, None) if pending else None
+        if pending is not None and not pending:
+            del self._inflight[key]
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            if task is not None:
+                task.cancel()  # Started on another event loop; it can't be awaited here.
+            self.misses += 1
+            return await self._load(name, key)
+        self.hits += 1
+        started = time.perf_counter()
+        try:
+            return await task
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_latency.observe(waited)
+            turn_logger.info("Prefetched %s was %s", name, "ready" if waited < 0.001 else f"{waited * 1000:.0f} ms away",
+                             extra={"loader": name, "wait_ms": round(waited * 1000, 1)})
+
+    def discard(self, app_name: str, user_id: str, session_id: str):
+        for task in self._inflight.pop((app_name, user_id, session_id), {}).values():
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "in_flight_sessions": len(self._inflight),
+            "wait": self.wait_latency.summary(),
+            "load": {name: h.summary() for name, h in self.load_latency.items()},
+        }
+
+
+def _log_failure(task: asyncio.Task):
+    # Retrieves the exception so a result nobody takes doesn't warn at garbage collection.
+    if not task.cancelled() and task.exception() is not None:
+        turn_logger.warning("Prefetch failed: %s", task.exception())
+
+
+class PrefetchingSessionService(BaseSessionService):
+    """Delegating session service that starts the prefetcher's loaders for every session it creates."""
+
+    def __init__(self, inner, prefetcher: Prefetcher):
+        self.inner = inner
+        self.prefetcher = prefetcher
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        session = await self.inner.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        self.prefetcher.start(app_name, user_id, session.id)
+        return session
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        return await self.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        return await self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        self.prefetcher.discard(app_name, user_id, session_id)
+        return await self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session, event):
+        return await self.inner.append_event(session, event)
+
+
+# --- Loaders ---
+
+def session_digest_loader(session_service, max_events: int = 40, max_chars: int = 2000,
+                          header: str = "PREVIOUS TRIP CONTEXT:") -> Loader:
+    """Text digest ("- author: text" lines) of the user's most recently updated other session; "" if none."""
+
+    async def load(app_name: str, user_id: str, session_id: str) -> str:
+        listed = await session_service.list_sessions(app_name=app_name, user_id=user_id)
+        previous = [s for s in listed.sessions if s.id != session_id]
+        if not previous:
+            return ""
+        latest = max(previous, key=lambda s: s.last_update_time or 0)
+        session = await session_service.get_session(app_name=app_name, user_id=user_id, session_id=latest.id,
+                                                    config=GetSessionConfig(num_recent_events=max_events))
+        lines, size = [], len(header)
+        for event in session.events if session else ():
+            if not event.content or not event.content.parts:
+                continue
+            text = " ".join(p.text for p in event.content.parts if p.text).strip()
+            if not text:
+                continue
+            line = f"- {event.author}: {text}"
+            size += len(line) + 1
+            if size > max_chars:
+                break
+            lines.append(line)
+        return "\n".join([header, *lines]) + "\n" if lines else ""
+
+    return load
+
+
+def memory_loader(memory_service, query: str) -> Loader:
+    """`search_memory` with a fixed profile query (the first message isn't known yet)."""
+
+    async def load(app_name: str, user_id: str, session_id: str):
+        return await memory_service.search_memory(app_name=app_name, user_id=user_id, query=query)
+
+    return load
@@ -0,0 +1,242 @@
+"""Record a step's conversation once against the live model, then replay it offline.
+
+Recording wraps every LlmAgent's model so each request/response pair lands in
+a compact JSONL fixture (gzip if the path ends in `.gz`). Local tool I/O is
+captured too. Replay swaps in `ReplayLlm`, which answers from the fixture with
+an optional simulated latency, and short-circuits recorded tools. Nothing
+touches the network, so the framework overhead of a step can be measured and
+regression-tested offline.
+
+    python -m memory_agent.replay record step_04_stateful_agent fixtures/step_04.jsonl.gz
+    python -m memory_agent.replay replay step_04_stateful_agent fixtures/step_04.jsonl.gz --latency-scale 1 --repeat 5
+
+The model name is preserved on the stand-ins, so model-specific request
+processing (e.g. google_search grounding config) is identical in both modes.
+"""
+import argparse
+import asyncio
+import collections
+import gzip
+import hashlib
+import json
+import sys
+import time
+from typing import Any, AsyncGenerator, Dict, List
+
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import Field, PrivateAttr
+
+from .agents import add_callback, iter_llm_agents, replace_models
+
+# Tools whose side effects drive the framework itself; they always run for real.
+NEVER_REPLAYED_TOOLS = frozenset({"transfer_to_agent"})
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+def _strip_ids(value: Any) -> Any:
+    """Drops generated function-call ids so identical conversations hash identically."""
+    if isinstance(value, dict):
+        return {k: _strip_ids(v) for k, v in value.items() if k != "id"}
+    if isinstance(value, list):
+        return [_strip_ids(v) for v in value]
+    return value
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    system = llm_request.config.system_instruction if llm_request.config else None
+    if system is not None and not isinstance(system, str):
+        system = system.model_dump(mode="json", exclude_none=True)
+    payload = {
+        "model": llm_request.model,
+        "system": system,
+        "contents": [_strip_ids(c.model_dump(mode="json", exclude_none=True)) for c in llm_request.contents],
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def tool_key(tool_name: str, args: Dict[str, Any]) -> str:
+    return f"{tool_name}:{json.dumps(args, sort_keys=True, default=str)}"
+
+
+# --- Recording ---
+
+class FixtureRecorder:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = _open(path, "w")
+
+    def write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class RecordingLlm(BaseLlm):
+    """Passes requests through to the real model and records the exchange."""
+
+    inner: BaseLlm
+    recorder: Any = Field(exclude=True)
+    agent_name: str = ""
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        started = time.perf_counter()
+        responses: List[LlmResponse] = []
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            responses.append(response)
+            yield response
+        self.recorder.write({
+            "type": "model",
+            "agent": self.agent_name,
+            "key": request_key(llm_request),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "responses": [r.model_dump(mode="json", exclude_none=True) for r in responses],
+        })
+
+
+def install_recorder(agent: BaseAgent, path: str) -> FixtureRecorder:
+    recorder = FixtureRecorder(path)
+    replace_models(agent, lambda a, model: RecordingLlm(model=model.model, inner=model, recorder=recorder, agent_name=a.name))
+
+    def record_tool(tool, args, tool_context, tool_response):
+        if tool.name not in NEVER_REPLAYED_TOOLS:
+            recorder.write({"type": "tool", "key": tool_key(tool.name, args), "result": tool_response})
+        return None
+
+    for llm_agent in iter_llm_agents(agent):
+        # First, so it sees the raw tool result before other callbacks rewrite it.
+        add_callback(llm_agent, "after_tool_callback", record_tool, first=True)
+    return recorder
+
+
+# --- Replay ---
+
+class ReplayMissError(KeyError):
+    """The replayed conversation diverged from the recording."""
+
+
+class Fixture:
+    def __init__(self, path: str):
+        self.models: Dict[str, collections.deque] = collections.defaultdict(collections.deque)
+        self.tools: Dict[str, collections.deque] = collections.defaultdict(collections.deque)
+        with _open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                target = self.models if record["type"] == "model" else self.tools
+                target[record["key"]].append(record)
+
+    @staticmethod
+    def take(queue: collections.deque) -> Dict[str, Any]:
+        # Consume in recorded order, but keep the last answer so scenarios can repeat.
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+
+class ReplayLlm(BaseLlm):
+    """Serves recorded responses deterministically; never touches the network.
+
+    Simulated latency is `latency_ms + latency_scale * recorded latency`.
+    """
+
+    fixture: Any = Field(exclude=True)
+    latency_ms: float = 0.0
+    latency_scale: float = 0.0
+    _simulated_s: float = PrivateAttr(default=0.0)
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def simulated_seconds(self) -> float:
+        return self._simulated_s
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        key = request_key(llm_request)
+        queue = self.fixture.models.get(key)
+        if not queue:
+            raise ReplayMissError(f"No recorded response for request {key}; re-record the fixture.")
+        record = Fixture.take(queue)
+        delay = (self.latency_ms + self.latency_scale * record.get("latency_ms", 0.0)) / 1000.0
+        if delay:
+            await asyncio.sleep(delay)
+            self._simulated_s += delay
+        self._calls += 1
+        for data in record["responses"]:
+            yield LlmResponse.model_validate(data)
+
+
+def install_replay(agent: BaseAgent, path: str, latency_ms: float = 0.0, latency_scale: float = 0.0) -> List[ReplayLlm]:
+    fixture = Fixture(path)
+    models: List[ReplayLlm] = []
+
+    def make(_, model):
+        replay = ReplayLlm(model=model.model, fixture=fixture, latency_ms=latency_ms, latency_scale=latency_scale)
+        models.append(replay)
+        return replay
+
+    replace_models(agent, make)
+
+    def replay_tool(tool, args, tool_context):
+        queue = fixture.tools.get(tool_key(tool.name, args))
+        if tool.name in NEVER_REPLAYED_TOOLS or not queue:
+            return None
+        result = Fixture.take(queue)["result"]
+        return result if isinstance(result, dict) else {"result": result}
+
+    for llm_agent in iter_llm_agents(agent):
+        add_callback(llm_agent, "before_tool_callback", replay_tool, first=True)
+    return models
+
+
+# --- CLI ---
+
+def _run(step: str, mode: str, fixture: str, latency_ms: float, latency_scale: float, repeat: int) -> int:
+    from .steps import load_step_main, step_entrypoint, step_root_agent
+
+    main_module = load_step_main(step)
+    root_agent = step_root_agent()
+    entrypoint = step_entrypoint(step, main_module)
+
+    if mode == "record":
+        recorder = install_recorder(root_agent, fixture)
+        try:
+            asyncio.run(entrypoint())
+        finally:
+            recorder.close()
+        print(f"📼 Recorded '{step}' to {fixture}")
+        return 0
+
+    models = install_replay(root_agent, fixture, latency_ms=latency_ms, latency_scale=latency_scale)
+    wall = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        asyncio.run(entrypoint())
+        wall.append(time.perf_counter() - started)
+    simulated = sum(m.simulated_seconds for m in models)
+    calls = sum(m.calls for m in models)
+    total = sum(wall)
+    print(f"\n▶️ Replayed '{step}' x{repeat}: {calls} model calls, "
+          f"wall {total * 1000 / repeat:.1f} ms/run, simulated model time {simulated * 1000 / repeat:.1f} ms/run, "
+          f"framework overhead {(total - simulated) * 1000 / repeat:.1f} ms/run")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay a step's scenario against a fixture file.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("step")
+    parser.add_argument("fixture")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed simulated latency per model call.")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Multiplier on the recorded model latency.")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(_run(args.step, args.mode, args.fixture, args.latency_ms, args.latency_scale, args.repeat))
@@ -0,0 +1,275 @@
+"""Latency- and success-aware choice between interchangeable sub-agents.
+
+step_04's planner may hand a request to any specialist the variety rule
+allows, and for a generic request ("plan an afternoon activity") several
+are equally good answers. `SpecialistScheduler` measures each specialist
+run (from its start to its final response; a run answered from a cache
+without a model response is not counted) and ranks the eligible ones by
+
+    score = (latency EWMA + ms_per_token * tokens EWMA) / success rate
+
+so the planner's instruction can state a preference for the faster ones.
+`preferred` lists only specialists with at least `min_samples` runs, and
+reorders two of them only when their scores differ by more than `margin`,
+so the instruction doesn't change with every noisy sample. `rank`, for
+callers that pick the specialist themselves, also explores: specialists
+with fewer than `min_samples` runs rank first, and so does one that has not
+run in the last `explore_every` runs, so one that became faster is noticed.
+A run fails when the model returns an error (through the `on_model_error`
+hook; Runners need `ModelErrorPlugin`) or never finishes (`timeout_s`). The
+success rate is smoothed, (ok + 1) / (runs + 2).
+
+Eligibility stays with the caller: `rank` only orders the specialists it
+is given, so hard constraints (the variety rule) are applied first.
+Set MEMORY_AGENT_SCHEDULER_STATS to a JSON file to keep the averages across
+runs (`save()` writes it).
+
+    scheduler = SpecialistScheduler.from_env()
+    scheduler.install(root_agent.sub_agents)
+    scheduler.preferred(["restaurant_expert", "outdoor_expert"])
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .agents import add_callback
+from .callbacks import on_model_error
+from .log import get_logger
+from .metrics import Histogram
+
+logger = get_logger("scheduler")
+
+
+class SpecialistStats:
+    """One specialist's run counters and averages; guarded by the scheduler's lock."""
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.last_run = 0  # The scheduler's run count at this specialist's latest run.
+        self.latency_ms: Optional[float] = None  # EWMA
+        self.tokens: Optional[float] = None  # EWMA
+        self.latency = Histogram()
+
+    def success_rate(self) -> float:
+        return (self.runs - self.failures + 1) / (self.runs + 2)
+
+    def observe(self, seconds: float, tokens: int, ok: bool, alpha: float):
+        self.runs += 1
+        if not ok:
+            self.failures += 1
+            return
+        self.latency.observe(seconds)
+        ms = seconds * 1000
+        self.latency_ms = ms if self.latency_ms is None else self.latency_ms + alpha * (ms - self.latency_ms)
+        self.tokens = tokens if self.tokens is None else self.tokens + alpha * (tokens - self.tokens)
+
+
+class SpecialistScheduler:
+    """Records specialist runs through agent/model callbacks and ranks specialists by expected cost."""
+
+    def __init__(self, alpha: float = 0.2, min_samples: int = 3, explore_every: int = 50, ms_per_token: float = 0.0,
+                 timeout_s: float = 120.0, margin: float = 0.1, path: Optional[str] = None):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.explore_every = explore_every
+        self.runs = 0
+        self.ms_per_token = ms_per_token
+        self.timeout_s = timeout_s
+        self.margin = margin
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, SpecialistStats] = {}
+        # (invocation_id, agent) -> [started, tokens, ok, model responses]
+        self._running: Dict[Tuple[str, str], List[Any]] = {}
+        self._preferred: List[str] = []  # The order `preferred` last returned.
+        on_model_error(self.on_model_error)
+        if path and os.path.exists(path):
+            self._load()
+
+    @classmethod
+    def from_env(cls, **options) -> "SpecialistScheduler":
+        return cls(path=os.getenv("MEMORY_AGENT_SCHEDULER_STATS") or None, **options)
+
+    def _get(self, agent: str) -> SpecialistStats:
+        stats = self._stats.get(agent)
+        if stats is None:
+            stats = self._stats[agent] = SpecialistStats()
+        return stats
+
+    # --- Recording ---
+
+    def start(self, invocation_id: str, agent: str):
+        with self._lock:
+            self._expire()
+            self._get(agent)
+            self._running[(invocation_id, agent)] = [time.perf_counter(), 0, True, 0]
+
+    def model_response(self, invocation_id: str, agent: str, tokens: int, ok: bool):
+        with self._lock:
+            run = self._running.get((invocation_id, agent))
+            if run is not None:
+                run[1] += tokens
+                run[2] = run[2] and ok
+                run[3] += 1
+
+    def finish(self, invocation_id: str, agent: str):
+        """Records the run, unless no model response reached it (answered from a cache): that isn't its speed."""
+        with self._lock:
+            run = self._running.pop((invocation_id, agent), None)
+            if run is not None and run[3]:
+                started, tokens, ok, _ = run
+                self._observe(agent, time.perf_counter() - started, tokens, ok)
+
+    def record(self, agent: str, seconds: float, tokens: int = 0, ok: bool = True):
+        """Records a finished run directly (for callers that time runs themselves)."""
+        with self._lock:
+            self._observe(agent, seconds, tokens, ok)
+
+    def _observe(self, agent: str, seconds: float, tokens: int, ok: bool):
+        self.runs += 1
+        stats = self._get(agent)
+        stats.last_run = self.runs
+        stats.observe(seconds, tokens, ok, self.alpha)
+
+    def fail(self, invocation_id: str, agent: str):
+        """Ends a run as failed now, e.g. when its model call raised."""
+        with self._lock:
+            run = self._running.pop((invocation_id, agent), None)
+            if run is not None:
+                self._observe(agent, time.perf_counter() - run[0], run[1], False)
+
+    def _expire(self):
+        """Counts runs that never finished (cancelled, or no error reached the hook) as failures."""
+        now = time.perf_counter()
+        for key in [k for k, run in self._running.items() if now - run[0] > self.timeout_s]:
+            del self._running[key]
+            self._observe(key[1], self.timeout_s, 0, False)
+
+    # --- Callbacks ---
+
+    def before_agent_callback(self, callback_context):
+        self.start(callback_context.invocation_id, callback_context.agent_name)
+        return None
+
+    def after_model_callback(self, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        usage = llm_response.usage_metadata
+        tokens = (usage.total_token_count or 0) if usage else 0
+        self.model_response(callback_context.invocation_id, callback_context.agent_name, tokens,
+                            ok=not llm_response.error_code)
+        return None
+
+    def after_agent_callback(self, callback_context):
+        self.finish(callback_context.invocation_id, callback_context.agent_name)
+        return None
+
+    def on_model_error(self, callback_context, error: BaseException):
+        self.fail(callback_context.invocation_id, callback_context.agent_name)
+
+    def install(self, specialists: Iterable):
+        """Adds the recording callbacks to each specialist agent, ahead of any that return early (caches)."""
+        for agent in specialists:
+            add_callback(agent, "before_agent_callback", self.before_agent_callback, first=True)
+            add_callback(agent, "after_model_callback", self.after_model_callback, first=True)
+            add_callback(agent, "after_agent_callback", self.after_agent_callback, first=True)
+            with self._lock:
+                self._get(agent.name)
+
+    # --- Ranking ---
+
+    def score(self, agent: str) -> float:
+        """Expected cost of a run in ms; lower is better."""
+        with self._lock:
+            stats = self._get(agent)
+            latency = stats.latency_ms or 0.0
+            return (latency + self.ms_per_token * (stats.tokens or 0.0)) / stats.success_rate()
+
+    def rank(self, eligible: Iterable[str]) -> List[str]:
+        """`eligible` ordered best first: specialists due for measuring (fewest runs first), then by score."""
+        eligible = list(eligible)
+        with self._lock:
+            self._expire()
+            stats = {agent: self._get(agent) for agent in eligible}
+            runs = {agent: s.runs for agent, s in stats.items()}
+            due = {agent: s.runs < self.min_samples or self.runs - s.last_run > self.explore_every
+                   for agent, s in stats.items()}
+        scores = {agent: self.score(agent) for agent in eligible}
+
+        def key(agent: str):
+            if due[agent]:
+                return 0, runs[agent], eligible.index(agent)
+            return 1, scores[agent], eligible.index(agent)
+
+        return sorted(eligible, key=key)
+
+    def preferred(self, eligible: Iterable[str]) -> List[str]:
+        """The measured specialists among `eligible`, fastest first; unmeasured ones are left out.
+
+        Starts from the previous order and swaps neighbours only when the
+        later one is more than `margin` cheaper, so close scores don't flip
+        the order back and forth.
+        """
+        eligible = list(eligible)
+        with self._lock:
+            self._expire()
+            measured = {agent for agent in eligible if self._get(agent).runs >= self.min_samples}
+            previous = list(self._preferred)
+        scores = {agent: self.score(agent) for agent in measured}
+        order = [agent for agent in previous if agent in measured]
+        order += sorted((agent for agent in measured if agent not in order), key=scores.__getitem__)
+        swapped = True
+        while swapped:
+            swapped = False
+            for i in range(len(order) - 1):
+                if scores[order[i]] > scores[order[i + 1]] * (1 + self.margin):
+                    order[i], order[i + 1] = order[i + 1], order[i]
+                    swapped = True
+        with self._lock:
+            self._preferred = order + [agent for agent in self._preferred if agent not in order]
+        return order
+
+    # --- Reporting and persistence ---
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._expire()
+            return {
+                agent: {
+                    "runs": s.runs,
+                    "failures": s.failures,
+                    "success_rate": round(s.success_rate(), 3),
+                    "ewma_ms": round(s.latency_ms, 3) if s.latency_ms is not None else None,
+                    "ewma_tokens": round(s.tokens, 1) if s.tokens is not None else None,
+                    "latency": s.latency.summary(),
+                }
+                for agent, s in self._stats.items()
+            }
+
+    def save(self, path: Optional[str] = None):
+        """Writes the run counters and averages (not the histograms) to `path` or the configured file."""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            data = {agent: {"runs": s.runs, "failures": s.failures, "latency_ms": s.latency_ms, "tokens": s.tokens}
+                    for agent, s in self._stats.items()}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring scheduler stats in %s: %s", self.path, e)
+            return
+        for agent, saved in data.items():
+            stats = self._get(agent)
+            stats.runs, stats.failures = saved.get("runs", 0), saved.get("failures", 0)
+            stats.latency_ms, stats.tokens = saved.get("latency_ms"), saved.get("tokens")
@@ -0,0 +1,310 @@
+"""Serves the step agents over HTTP, streaming each turn as server-sent events.
+
+    python -m memory_agent.serve --steps step_04_stateful_agent step_05_profile_agent --workers 4 --port 8080
+
+The front end is one asyncio process that spawns `--workers` worker
+processes per step (fresh interpreters, not forks). A worker loads its step
+once (agent tree, Runner, session and memory services) and keeps it warm
+for every request; a step's main imports its agent as the top-level module
+`agent`, so a worker only ever holds one step. Sessions are pinned to a
+worker by crc32(session_id), which keeps in-memory session state in the
+process that owns it, and a worker runs one turn at a time per session;
+the front end only relays lines from the worker's Unix socket. Dead
+workers are restarted (their in-memory sessions are lost).
+
+Needs the `serve` extra: pip install -e '.[serve]'.
+
+    POST /apps/{step}/users/{user_id}/sessions                       {"state": {...}}   -> {"session_id": ...}
+    POST /apps/{step}/users/{user_id}/sessions/{session_id}/turns    {"message": "..."} -> text/event-stream
+    POST /apps/{step}/users/{user_id}/sessions/{session_id}/memory   add the session to the step's memory service
+    GET  /healthz
+
+Turns run in ADK's SSE streaming mode. Every SSE `data:` line is one ADK
+Event as JSON: events with `"partial": true` carry text as the model
+generates it, and the complete event follows. The stream ends with
+`event: done` (the final response text) or `event: error`.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from .log import get_logger
+from .steps import STEP_ENTRYPOINTS
+
+logger = get_logger("serve")
+
+# Worker -> front end lines that are not events start with this prefix.
+_STATUS_PREFIX = b'{"_status"'
+
+
+def _status_line(status: str, **fields) -> bytes:
+    return json.dumps({"_status": status, **fields}, ensure_ascii=False).encode() + b"\n"
+
+
+# --- Worker process ---
+
+class _Worker:
+    def __init__(self, step: str, fake_model_latency_ms: Optional[float] = None):
+        from .batch import _StepRunner
+
+        self.step_runner = _StepRunner(step, add_to_memory=False)
+        if fake_model_latency_ms is not None:
+            from .agents import replace_models
+            from .fake_model import FakeLlm
+
+            replace_models(self.step_runner.agent,
+                           lambda agent, model: FakeLlm(model=model.model, latency_s=fake_model_latency_ms / 1000))
+
+    async def _create_session(self, request: Dict[str, Any], writer: asyncio.StreamWriter):
+        runner = self.step_runner
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=request["user_id"], session_id=request["session_id"],
+            state=request.get("state"))
+        writer.write(_status_line("done", session_id=session.id))
+
+    async def _turn(self, request: Dict[str, Any], writer: asyncio.StreamWriter):
+        final_response = ""
+        async with self.step_runner.session_lock(request["user_id"], request["session_id"]):
+            async for event in self.step_runner.stream_turn(request["user_id"], request["session_id"], request["message"],
+                                                            partial=True):
+                if event.is_final_response() and event.content and event.content.parts:
+                    final_response = event.content.parts[0].text or ""
+                writer.write(event.model_dump_json(exclude_none=True, by_alias=True).encode() + b"\n")
+                await writer.drain()
+        writer.write(_status_line("done", final_response=final_response))
+
+    async def _add_to_memory(self, request: Dict[str, Any], writer: asyncio.StreamWriter):
+        runner = self.step_runner
+        if runner.memory_service is None:
+            raise ValueError("This step has no memory service.")
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=request["user_id"], session_id=request["session_id"])
+        if session is None:
+            raise ValueError(f"Session not found: {request['session_id']}")
+        await runner.memory_service.add_session_to_memory(session)
+        writer.write(_status_line("done"))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(await reader.readline())
+            await {"create_session": self._create_session, "turn": self._turn,
+                   "add_to_memory": self._add_to_memory}[request["op"]](request, writer)
+        except Exception as e:
+            writer.write(_status_line("error", error=f"{type(e).__name__}: {e}"))
+        finally:
+            with contextlib.suppress(ConnectionError):
+                await writer.drain()
+            writer.close()
+
+    async def serve(self, socket_path: str):
+        # Bind only once the step is loaded: the socket appearing means "ready".
+        server = await asyncio.start_unix_server(self.handle, path=f"{socket_path}.tmp", limit=2 ** 20)
+        os.replace(f"{socket_path}.tmp", socket_path)
+        async with server:
+            await server.serve_forever()
+
+
+def _worker_main(step: str, socket_path: str, fake_model_latency_ms: Optional[float]):
+    worker = _Worker(step, fake_model_latency_ms)
+    asyncio.run(worker.serve(socket_path))
+
+
+# --- Front end ---
+
+class WorkerPool:
+    """`workers` spawned processes per step, each listening on its own Unix socket."""
+
+    def __init__(self, steps: List[str], workers: int = 2, fake_model_latency_ms: Optional[float] = None):
+        self.steps = list(steps)
+        self.workers = workers
+        self.fake_model_latency_ms = fake_model_latency_ms
+        self.socket_dir = tempfile.mkdtemp(prefix="memory_agent_serve_")
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[str, List[multiprocessing.Process]] = {step: [None] * workers for step in self.steps}
+
+    def socket_path(self, step: str, index: int) -> str:
+        return os.path.join(self.socket_dir, f"{step}-{index}.sock")
+
+    def _spawn(self, step: str, index: int):
+        path = self.socket_path(step, index)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        process = self._context.Process(target=_worker_main, args=(step, path, self.fake_model_latency_ms),
+                                        name=f"{step}-{index}", daemon=True)
+        process.start()
+        self._processes[step][index] = process
+
+    def start(self, timeout_s: float = 120.0):
+        for step in self.steps:
+            for index in range(self.workers):
+                self._spawn(step, index)
+        deadline = time.monotonic() + timeout_s
+        for step in self.steps:
+            for index in range(self.workers):
+                while not os.path.exists(self.socket_path(step, index)):
+                    if not self._processes[step][index].is_alive():
+                        raise RuntimeError(f"Worker {step}-{index} exited while loading; see its output above.")
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Worker {step}-{index} did not start within {timeout_s}s.")
+                    time.sleep(0.05)
+        logger.info("%d workers ready for %s", self.workers * len(self.steps), ", ".join(self.steps))
+
+    async def supervise(self, interval_s: float = 1.0):
+        while True:
+            await asyncio.sleep(interval_s)
+            for step, processes in self._processes.items():
+                for index, process in enumerate(processes):
+                    if not process.is_alive():
+                        logger.warning("Worker %s-%d exited (code %s); restarting", step, index, process.exitcode)
+                        self.restarts += 1
+                        self._spawn(step, index)
+
+    def stop(self):
+        for processes in self._processes.values():
+            for process in processes:
+                if process is not None and process.is_alive():
+                    process.terminate()
+        for processes in self._processes.values():
+            for process in processes:
+                if process is not None:
+                    process.join(timeout=5)
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def worker_for(self, step: str, session_id: str) -> int:
+        return zlib.crc32(session_id.encode()) % self.workers
+
+    async def request(self, step: str, session_id: str, payload: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """Sends one request to the session's worker and yields its response lines."""
+        path = self.socket_path(step, self.worker_for(step, session_id))
+        try:
+            reader, writer = await asyncio.open_unix_connection(path, limit=2 ** 20)
+        except (FileNotFoundError, ConnectionError):
+            yield _status_line("error", error="Worker unavailable (restarting); retry shortly.")
+            return
+        try:
+            writer.write(json.dumps({**payload, "session_id": session_id}, ensure_ascii=False).encode() + b"\n")
+            await writer.drain()
+            while line := await reader.readline():
+                yield line
+                if line.startswith(_STATUS_PREFIX):
+                    return
+            yield _status_line("error", error="Worker closed the connection mid-turn.")
+        finally:
+            writer.close()
+
+    async def call(self, step: str, session_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """A request whose only response is its status line."""
+        async for line in self.request(step, session_id, payload):
+            if line.startswith(_STATUS_PREFIX):
+                return json.loads(line)
+        return {"_status": "error", "error": "No response from worker."}
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "workers": {step: [p.is_alive() for p in processes] for step, processes in self._processes.items()},
+            "restarts": self.restarts,
+        }
+
+
+class SessionRequest(BaseModel):
+    session_id: Optional[str] = None
+    state: Optional[Dict[str, Any]] = None
+
+
+class TurnRequest(BaseModel):
+    message: str
+
+
+def build_app(pool: WorkerPool) -> FastAPI:
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI):
+        supervisor = asyncio.create_task(pool.supervise())
+        try:
+            yield
+        finally:
+            supervisor.cancel()
+
+    app = FastAPI(title="memory-agent", lifespan=lifespan)
+
+    def check_step(step: str):
+        if step not in pool.steps:
+            raise HTTPException(status_code=404, detail=f"Step '{step}' is not served here.")
+
+    def check_status(response: Dict[str, Any]) -> Dict[str, Any]:
+        if response["_status"] == "error":
+            raise HTTPException(status_code=400, detail=response["error"])
+        response.pop("_status")
+        return response
+
+    @app.get("/healthz")
+    async def healthz():
+        return pool.health()
+
+    @app.post("/apps/{step}/users/{user_id}/sessions")
+    async def create_session(step: str, user_id: str, body: SessionRequest):
+        check_step(step)
+        session_id = body.session_id or uuid.uuid4().hex
+        return check_status(await pool.call(step, session_id, {"op": "create_session", "user_id": user_id,
+                                                               "state": body.state}))
+
+    @app.post("/apps/{step}/users/{user_id}/sessions/{session_id}/turns")
+    async def turn(step: str, user_id: str, session_id: str, body: TurnRequest):
+        check_step(step)
+
+        async def events():
+            async for line in pool.request(step, session_id, {"op": "turn", "user_id": user_id,
+                                                              "message": body.message}):
+                if line.startswith(_STATUS_PREFIX):
+                    status = json.loads(line)
+                    yield f"event: {status.pop('_status')}\ndata: {json.dumps(status, ensure_ascii=False)}\n\n".encode()
+                else:
+                    yield b"data: " + line.rstrip(b"\n") + b"\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.post("/apps/{step}/users/{user_id}/sessions/{session_id}/memory")
+    async def add_to_memory(step: str, user_id: str, session_id: str):
+        check_step(step)
+        return check_status(await pool.call(step, session_id, {"op": "add_to_memory", "user_id": user_id}))
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve step agents over HTTP with SSE streaming.")
+    parser.add_argument("--steps", nargs="+", default=["step_04_stateful_agent"], choices=list(STEP_ENTRYPOINTS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes per step.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fake-model-latency-ms", type=float,
+                        help="Replace every model with FakeLlm at this latency (load tests, no API calls).")
+    args = parser.parse_args(argv)
+
+    pool = WorkerPool(args.steps, args.workers, args.fake_model_latency_ms)
+    pool.start()
+    try:
+        print(f"🚀 Serving {', '.join(args.steps)} on http://{args.host}:{args.port} "
+              f"({args.workers} workers per step)")
+        uvicorn.run(build_app(pool), host=args.host, port=args.port, log_level="warning")
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Sharded, memory-bounded drop-in for `InMemorySessionService`.
+
+- Sessions are hash-partitioned by user_id into shards, each with its own LRU.
+- Events are stored in a columnar `CompactEventLog` and only turned back
+  into `Event` objects when a session is read.
+- Once a shard exceeds its share of `max_sessions`/`max_bytes`, its idle
+  least-recently-used sessions are evicted: spilled to `spill_dir` if one is
+  configured (and transparently reloaded on the next read).
+  WITHOUT A `spill_dir`, EVICTED SESSIONS ARE DELETED: their events and
+  state are gone, and each one is logged as a warning and counted in
+  `dropped`. Configure a `spill_dir` unless the bounds are only a safety net.
+  A session that can't be spilled (the write fails) stays in memory.
+- `session_lock()` hands out a per-session asyncio lock; hold it for a whole
+  turn so two concurrent turns on the same session can't interleave.
+"""
+import asyncio
+import collections
+import copy
+import hashlib
+import json
+import os
+import time
+import uuid
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .compact_events import CompactEventLog
+from .log import get_logger
+
+logger = get_logger("sessions")
+
+SessionKey = Tuple[str, str, str]
+
+
+def _state_entry_bytes(key: str, value: Any) -> int:
+    return len(json.dumps({key: value}, default=str))
+
+
+class _StoredSession:
+    __slots__ = ("id", "app_name", "user_id", "state", "events", "last_update_time", "nbytes")
+
+    def __init__(self, id: str, app_name: str, user_id: str, state: Dict[str, Any], last_update_time: float):
+        self.id = id
+        self.app_name = app_name
+        self.user_id = user_id
+        self.state = state
+        self.events = CompactEventLog()
+        self.last_update_time = last_update_time
+        self.nbytes = sum(_state_entry_bytes(k, v) for k, v in state.items())
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": self.id, "app_name": self.app_name, "user_id": self.user_id, "state": self.state,
+            "last_update_time": self.last_update_time,
+            "events": [self.events.event_dict(i) for i in range(len(self.events))],
+        }, default=str)
+
+    @classmethod
+    def from_json(cls, data: str) -> "_StoredSession":
+        d = json.loads(data)
+        stored = cls(d["id"], d["app_name"], d["user_id"], d["state"], d["last_update_time"])
+        for event in d["events"]:
+            stored.nbytes += stored.events.append_dict(event)
+        return stored
+
+    def add_event(self, event: Event):
+        self.nbytes += self.events.append(event)
+
+    def update_state(self, delta: Dict[str, Any]):
+        """Applies a state delta; a replaced value's size is given back, so repeated writes don't accumulate."""
+        for key, value in delta.items():
+            if key in self.state:
+                self.nbytes -= _state_entry_bytes(key, self.state[key])
+            self.state[key] = value
+            self.nbytes += _state_entry_bytes(key, value)
+
+
+class _Shard:
+    def __init__(self):
+        self.sessions: "collections.OrderedDict[SessionKey, _StoredSession]" = collections.OrderedDict()
+        self.spilled: Dict[SessionKey, str] = {}
+        self.user_state: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.locks: Dict[SessionKey, asyncio.Lock] = {}
+        self.nbytes = 0
+
+
+def _split_state(state: Optional[Dict[str, Any]]):
+    app, user, session = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+class ShardedInMemorySessionService(BaseSessionService):
+    def __init__(self, num_shards: int = 16, max_sessions: int = 100_000, max_bytes: int = 512 * 1024 * 1024,
+                 spill_dir: Optional[str] = None):
+        self.num_shards = num_shards
+        self.max_sessions_per_shard = max(1, max_sessions // num_shards)
+        self.max_bytes_per_shard = max(1, max_bytes // num_shards)
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._shards = [_Shard() for _ in range(num_shards)]
+        self._app_state: Dict[str, Dict[str, Any]] = {}
+        self.evictions = 0
+        self.dropped = 0
+        self.reloads = 0
+
+    # --- Internals ---
+
+    def _shard(self, user_id: str) -> _Shard:
+        return self._shards[zlib.crc32(user_id.encode()) % self.num_shards]
+
+    def _spill_path(self, key: SessionKey) -> str:
+        name = hashlib.blake2b("\0".join(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}.json")
+
+    def _lookup(self, shard: _Shard, key: SessionKey) -> Optional[_StoredSession]:
+        stored = shard.sessions.get(key)
+        if stored is not None:
+            shard.sessions.move_to_end(key)
+            return stored
+        path = shard.spilled.pop(key, None)
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            stored = _StoredSession.from_json(f.read())
+        os.remove(path)
+        self.reloads += 1
+        self._admit(shard, key, stored)
+        return stored
+
+    def _admit(self, shard: _Shard, key: SessionKey, stored: _StoredSession):
+        shard.sessions[key] = stored
+        shard.nbytes += stored.nbytes
+        self._evict(shard)
+
+    def _evict(self, shard: _Shard):
+        # Pop from the least recently used end; never evict a session mid-turn,
+        # one that can't be spilled, or the one that was just touched.
+        kept = []
+        while (len(shard.sessions) > self.max_sessions_per_shard or shard.nbytes > self.max_bytes_per_shard) \
+                and len(shard.sessions) > 1:
+            key, stored = shard.sessions.popitem(last=False)
+            lock = shard.locks.get(key)
+            if lock is not None and lock.locked():
+                kept.append((key, stored))
+                continue
+            if self.spill_dir:
+                # Written before the session leaves the shard; on failure it stays.
+                path = self._spill_path(key)
+                try:
+                    data = stored.to_json()
+                    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                        f.write(data)
+                    os.replace(f"{path}.tmp", path)
+                except (OSError, TypeError, ValueError) as e:
+                    logger.error("Could not spill session %s/%s/%s, keeping it in memory: %s", *key, e)
+                    kept.append((key, stored))
+                    continue
+                shard.spilled[key] = path
+            else:
+                self.dropped += 1
+                logger.warning("Dropped session %s/%s/%s: evicted with no spill_dir configured.", *key)
+            shard.nbytes -= stored.nbytes
+            shard.locks.pop(key, None)
+            self.evictions += 1
+        for key, stored in reversed(kept):
+            shard.sessions[key] = stored
+            shard.sessions.move_to_end(key, last=False)
+
+    def _materialize(self, shard: _Shard, stored: _StoredSession, config: Optional[GetSessionConfig] = None) -> Session:
+        start = 0
+        if config:
+            if config.after_timestamp:
+                start = stored.events.index_after(config.after_timestamp)
+            if config.num_recent_events:
+                start = max(start, len(stored.events) - config.num_recent_events)
+        state = copy.deepcopy(stored.state)
+        for key, value in self._app_state.get(stored.app_name, {}).items():
+            state[State.APP_PREFIX + key] = copy.deepcopy(value)
+        for key, value in shard.user_state.get((stored.app_name, stored.user_id), {}).items():
+            state[State.USER_PREFIX + key] = copy.deepcopy(value)
+        return Session(
+            id=stored.id, app_name=stored.app_name, user_id=stored.user_id, state=state,
+            events=stored.events.events(start),
+            last_update_time=stored.last_update_time,
+        )
+
+    # --- Locking ---
+
+    def session_lock(self, app_name: str, user_id: str, session_id: str) -> asyncio.Lock:
+        shard = self._shard(user_id)
+        key = (app_name, user_id, session_id)
+        lock = shard.locks.get(key)
+        if lock is None:
+            lock = shard.locks[key] = asyncio.Lock()
+        return lock
+
+    # --- BaseSessionService ---
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        shard = self._shard(user_id)
+        key = (app_name, user_id, session_id)
+        if key in shard.sessions or key in shard.spilled:
+            raise AlreadyExistsError(f"Session {session_id} already exists.")
+        app_delta, user_delta, session_state = _split_state(state)
+        self._app_state.setdefault(app_name, {}).update(app_delta)
+        shard.user_state.setdefault((app_name, user_id), {}).update(user_delta)
+        stored = _StoredSession(session_id, app_name, user_id, session_state, time.time())
+        self._admit(shard, key, stored)
+        return self._materialize(shard, stored)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        shard = self._shard(user_id)
+        stored = self._lookup(shard, (app_name, user_id, session_id))
+        return self._materialize(shard, stored, config) if stored else None
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        shards = [self._shard(user_id)] if user_id is not None else self._shards
+        sessions = []
+        for shard in shards:
+            for (app, user, session_id), stored in shard.sessions.items():
+                if app == app_name and (user_id is None or user == user_id):
+                    sessions.append(Session(id=session_id, app_name=app, user_id=user, state={},
+                                            last_update_time=stored.last_update_time))
+            for (app, user, session_id) in shard.spilled:
+                if app == app_name and (user_id is None or user == user_id):
+                    sessions.append(Session(id=session_id, app_name=app, user_id=user, state={}))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        shard = self._shard(user_id)
+        key = (app_name, user_id, session_id)
+        stored = shard.sessions.pop(key, None)
+        if stored is not None:
+            shard.nbytes -= stored.nbytes
+        path = shard.spilled.pop(key, None)
+        if path and os.path.exists(path):
+            os.remove(path)
+        shard.locks.pop(key, None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        shard = self._shard(session.user_id)
+        key = (session.app_name, session.user_id, session.id)
+        stored = self._lookup(shard, key)
+        if stored is None:
+            logger.warning("append_event: session %s not found (deleted or evicted without spill_dir).", session.id)
+            return event
+
+        before = stored.nbytes
+        stored.add_event(event)
+        stored.last_update_time = event.timestamp
+        if event.actions and event.actions.state_delta:
+            app_delta, user_delta, session_delta = _split_state(event.actions.state_delta)
+            if app_delta:
+                self._app_state.setdefault(session.app_name, {}).update(app_delta)
+            if user_delta:
+                shard.user_state.setdefault((session.app_name, session.user_id), {}).update(user_delta)
+            if session_delta:
+                stored.update_state(session_delta)
+        shard.nbytes += stored.nbytes - before
+        self._evict(shard)
+        return event
+
+    # --- Accounting ---
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident_sessions": sum(len(s.sessions) for s in self._shards),
+            "spilled_sessions": sum(len(s.spilled) for s in self._shards),
+            "resident_bytes": sum(s.nbytes for s in self._shards),
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+            "largest_shard": max(len(s.sessions) for s in self._shards),
+        }
@@ -0,0 +1,248 @@
+"""SQLite session service that persists state deltas, not whole state dicts.
+
+ADK's DatabaseSessionService stores a session's state as one JSON column and
+rewrites all of it whenever an event carries a `state_delta`. Step_04 touches
+one key (`last_activity_type`) per transfer, and step_02 one `output_key`, so
+a session with a large state pays for the whole dict on every small change.
+
+`SqliteSessionService` keeps one row per state key (session, `user:` and
+`app:` scopes in separate tables) and upserts only the keys a delta names.
+With `coalesce_turns=True` (the default) the events and deltas of one
+invocation are buffered and written in a single transaction when an agent
+gives its final response, the invocation changes, or the session is read
+again, so a turn that changes the same key three times writes it once.
+
+Buffered writes are lost if the process dies mid-turn; the turn itself would
+be incomplete anyway. Call `flush()` or `close()` before exiting.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .sessions import _split_state
+
+SessionKey = Tuple[str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, id TEXT NOT NULL,
+    create_time REAL NOT NULL, update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS session_state (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_state (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS app_state (
+    app_name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+    PRIMARY KEY (app_name, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, timestamp REAL NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, timestamp);
+"""
+
+
+class _PendingWrites:
+    __slots__ = ("invocation_id", "events", "session_delta", "user_delta", "app_delta", "update_time")
+
+    def __init__(self, invocation_id: str):
+        self.invocation_id = invocation_id
+        self.events: List[Tuple[float, str]] = []
+        self.session_delta: Dict[str, Any] = {}
+        self.user_delta: Dict[str, Any] = {}
+        self.app_delta: Dict[str, Any] = {}
+        self.update_time = 0.0
+
+
+class SqliteSessionService(BaseSessionService):
+    def __init__(self, db_path: str, coalesce_turns: bool = True):
+        self.db_path = str(db_path)
+        self.coalesce_turns = coalesce_turns
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: Dict[SessionKey, _PendingWrites] = {}
+        self.transactions = 0
+        self.state_keys_written = 0
+        self.state_bytes_written = 0
+        self.event_bytes_written = 0
+        self.full_state_bytes = 0  # What rewriting the whole session state per delta would have written.
+
+    # --- Writes ---
+
+    def _upsert_state(self, app_name: str, user_id: str, session_id: str, app_delta: Dict[str, Any],
+                      user_delta: Dict[str, Any], session_delta: Dict[str, Any]):
+        rows = [(app_name, user_id, session_id, k, json.dumps(v, default=str)) for k, v in session_delta.items()]
+        self._conn.executemany(
+            "INSERT INTO session_state VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (app_name, user_id, session_id, key) DO UPDATE SET value = excluded.value", rows)
+        user_rows = [(app_name, user_id, k, json.dumps(v, default=str)) for k, v in user_delta.items()]
+        self._conn.executemany(
+            "INSERT INTO user_state VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (app_name, user_id, key) DO UPDATE SET value = excluded.value", user_rows)
+        app_rows = [(app_name, k, json.dumps(v, default=str)) for k, v in app_delta.items()]
+        self._conn.executemany(
+            "INSERT INTO app_state VALUES (?, ?, ?) ON CONFLICT (app_name, key) DO UPDATE SET value = excluded.value",
+            app_rows)
+        self.state_keys_written += len(rows) + len(user_rows) + len(app_rows)
+        self.state_bytes_written += sum(len(r[-1]) + len(r[-2]) for r in rows + user_rows + app_rows)
+
+    def _flush(self, key: SessionKey):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        app_name, user_id, session_id = key
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO events (app_name, user_id, session_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                [(app_name, user_id, session_id, ts, data) for ts, data in pending.events])
+            self._upsert_state(app_name, user_id, session_id, pending.app_delta, pending.user_delta, pending.session_delta)
+            self._conn.execute("UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                               (pending.update_time, app_name, user_id, session_id))
+        self.transactions += 1
+        self.event_bytes_written += sum(len(data) for _, data in pending.events)
+
+    def flush(self, app_name: Optional[str] = None):
+        for key in [k for k in self._pending if app_name is None or k[0] == app_name]:
+            self._flush(key)
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    # --- Reads ---
+
+    def _load_state(self, app_name: str, user_id: str, session_id: str) -> Dict[str, Any]:
+        state = {k: json.loads(v) for k, v in self._conn.execute(
+            "SELECT key, value FROM session_state WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            (app_name, user_id, session_id))}
+        for k, v in self._conn.execute("SELECT key, value FROM app_state WHERE app_name = ?", (app_name,)):
+            state[State.APP_PREFIX + k] = json.loads(v)
+        for k, v in self._conn.execute("SELECT key, value FROM user_state WHERE app_name = ? AND user_id = ?",
+                                       (app_name, user_id)):
+            state[State.USER_PREFIX + k] = json.loads(v)
+        return state
+
+    def _load_events(self, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig]) -> List[Event]:
+        query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+        params: List[Any] = [app_name, user_id, session_id]
+        if config and config.after_timestamp:
+            query += " AND timestamp >= ?"
+            params.append(config.after_timestamp)
+        if config and config.num_recent_events:
+            query += " ORDER BY seq DESC LIMIT ?"
+            params.append(config.num_recent_events)
+            rows = list(self._conn.execute(query, params))[::-1]
+        else:
+            rows = list(self._conn.execute(query + " ORDER BY seq", params))
+        return [Event.model_validate_json(data) for (data,) in rows]
+
+    # --- BaseSessionService ---
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        now = time.time()
+        app_delta, user_delta, session_state = _split_state(state)
+        with self._lock, self._conn:
+            try:
+                self._conn.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, ?)", (app_name, user_id, session_id, now, now))
+            except sqlite3.IntegrityError:
+                raise AlreadyExistsError(f"Session {session_id} already exists.") from None
+            self._upsert_state(app_name, user_id, session_id, app_delta, user_delta, session_state)
+            merged = self._load_state(app_name, user_id, session_id)
+        self.transactions += 1
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=merged, last_update_time=now)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        self._flush((app_name, user_id, session_id))
+        with self._lock:
+            row = self._conn.execute("SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                                     (app_name, user_id, session_id)).fetchone()
+            if row is None:
+                return None
+            state = self._load_state(app_name, user_id, session_id)
+            events = self._load_events(app_name, user_id, session_id, config)
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=state, events=events,
+                       last_update_time=row[0])
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        self.flush(app_name)
+        query = "SELECT user_id, id, update_time FROM sessions WHERE app_name = ?"
+        params = [app_name]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        with self._lock:
+            rows = list(self._conn.execute(query, params))
+        return ListSessionsResponse(sessions=[
+            Session(id=session_id, app_name=app_name, user_id=user, state={}, last_update_time=update_time)
+            for user, session_id, update_time in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._pending.pop((app_name, user_id, session_id), None)
+        params = (app_name, user_id, session_id)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", params)
+            self._conn.execute("DELETE FROM session_state WHERE app_name = ? AND user_id = ? AND session_id = ?", params)
+            self._conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", params)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        pending = self._pending.get(key)
+        if pending is not None and pending.invocation_id != event.invocation_id:
+            self._flush(key)
+            pending = None
+        if pending is None:
+            pending = self._pending[key] = _PendingWrites(event.invocation_id)
+
+        pending.events.append((event.timestamp, event.model_dump_json(exclude_none=True)))
+        pending.update_time = event.timestamp
+        if event.actions and event.actions.state_delta:
+            app_delta, user_delta, session_delta = _split_state(event.actions.state_delta)
+            pending.app_delta.update(app_delta)
+            pending.user_delta.update(user_delta)
+            pending.session_delta.update(session_delta)
+            self.full_state_bytes += len(json.dumps(session.state, default=str))
+
+        if not self.coalesce_turns or (event.author != "user" and event.is_final_response()):
+            self._flush(key)
+        return event
+
+    # --- Accounting ---
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "transactions": self.transactions,
+            "state_keys_written": self.state_keys_written,
+            "state_bytes_written": self.state_bytes_written,
+            "event_bytes_written": self.event_bytes_written,
+            "full_state_bytes": self.full_state_bytes,
+        }
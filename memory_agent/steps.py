@@ -0,0 +1,44 @@
+"""Loads the step demos (their `main.py` scenarios and root agents) by name."""
+import importlib.util
+import os
+import sys
+from types import ModuleType
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Step directory -> coroutine function in its main.py that runs the scenario.
+STEP_ENTRYPOINTS = {
+    "step_01_session_agent": "main",
+    "step_02_multi_agent": "run_sequential_workflow",
+    "step_03_persistent_agent": "main",
+    "step_04_stateful_agent": "run_variety_test",
+    "step_05_profile_agent": "main",
+    "step_06_multimodal_agent": "test_trip_planner",
+}
+
+
+def load_step_main(step: str) -> ModuleType:
+    """Imports `<step>/main.py` the same way `python <step>/main.py` would.
+
+    The mains import their agent as the top-level module `agent`, so only one
+    step can be loaded per process.
+    """
+    if step not in STEP_ENTRYPOINTS:
+        raise ValueError(f"Unknown step '{step}'. Choose one of: {', '.join(STEP_ENTRYPOINTS)}")
+    loaded = sys.modules.get("agent")
+    if loaded is not None and os.path.dirname(os.path.abspath(loaded.__file__)) != os.path.join(REPO_ROOT, step):
+        raise RuntimeError(f"Another step's agent module is already loaded ({loaded.__file__}).")
+    path = os.path.join(REPO_ROOT, step, "main.py")
+    spec = importlib.util.spec_from_file_location(f"{step}_main", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def step_root_agent():
+    """The root agent object the loaded step's scenario actually runs."""
+    return sys.modules["agent"].root_agent
+
+
+def step_entrypoint(step: str, main_module: ModuleType):
+    return getattr(main_module, STEP_ENTRYPOINTS[step])
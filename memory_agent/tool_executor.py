@@ -0,0 +1,113 @@
+"""Runs blocking function tools off the event loop.
+
+ADK calls synchronous FunctionTools inline on the runner's event loop, so a
+slow SQLite write or CPU-heavy calculation stalls every other session. Wrap
+the function with `ToolExecutor.offload` before handing it to `FunctionTool`:
+
+    save_tool = FunctionTool(tool_executor.offload(save_user_preferences, max_concurrency=4, timeout=10))
+
+The wrapper is an `async def` with the original signature, so ADK still
+builds the same function declaration and injects `tool_context`.
+"""
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import Histogram
+
+
+@dataclass
+class ToolStats:
+    queue_wait: Histogram = field(default_factory=Histogram)
+    execution: Histogram = field(default_factory=Histogram)
+    timeouts: int = 0
+    errors: int = 0
+
+
+class ToolExecutor:
+    """Bounded thread pool (plus an optional process pool) with per-tool limits and timings."""
+
+    def __init__(self, max_threads: int = 8, max_processes: int = 0):
+        self._threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="tool")
+        self._max_processes = max_processes
+        self._processes: Optional[ProcessPoolExecutor] = None
+        # Semaphores are created per event loop: each `asyncio.run` gets fresh ones.
+        self._limits: Dict[str, tuple] = {}
+        self.stats: Dict[str, ToolStats] = {}
+
+    def _pool(self, use_process: bool):
+        if not use_process:
+            return self._threads
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self._max_processes or os.cpu_count())
+        return self._processes
+
+    def _semaphore(self, name: str, max_concurrency: int) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        entry = self._limits.get(name)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(max_concurrency))
+            self._limits[name] = entry
+        return entry[1]
+
+    def offload(self, func: Callable, *, max_concurrency: int = 4, timeout: Optional[float] = 30.0, use_process: bool = False) -> Callable:
+        """Returns an async wrapper of `func` that runs it on the executor.
+
+        `use_process` is only for CPU-heavy tools whose arguments and result
+        pickle cleanly; it cannot be used with tools that take `tool_context`.
+        """
+        name = func.__name__
+        stats = self.stats.setdefault(name, ToolStats())
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            semaphore = self._semaphore(name, max_concurrency)
+            queued_at = time.perf_counter()
+            await semaphore.acquire()
+            started_at = time.perf_counter()
+            stats.queue_wait.observe(started_at - queued_at)
+
+            future = asyncio.get_running_loop().run_in_executor(
+                self._pool(use_process), functools.partial(func, *args, **kwargs))
+
+            def _finished(_):
+                # Hold the slot until the worker is really done, even after a timeout,
+                # so a hung tool can only ever tie up its own concurrency budget.
+                stats.execution.observe(time.perf_counter() - started_at)
+                semaphore.release()
+
+            future.add_done_callback(_finished)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except TimeoutError:
+                stats.timeouts += 1
+                return {"status": "error", "error_message": f"Tool '{name}' timed out after {timeout} seconds."}
+            except Exception:
+                stats.errors += 1
+                raise
+
+        return wrapper
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "queue_wait": s.queue_wait.summary(),
+                "execution": s.execution.summary(),
+                "timeouts": s.timeouts,
+                "errors": s.errors,
+            }
+            for name, s in self.stats.items()
+        }
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared executor for the step agents' tools.
+tool_executor = ToolExecutor(max_threads=int(os.getenv("MEMORY_AGENT_TOOL_THREADS", "8")))
@@ -0,0 +1,392 @@
+"""Per-turn spans for runner setup, session I/O, agents, model calls, tools and callbacks.
+
+Spans are exported in the OTLP/JSON span shape, either to an in-memory
+collector (default) or, when MEMORY_AGENT_TRACE_FILE is set, one span per
+line to that file so any OpenTelemetry-aware tool can read them.
+
+Hook it into a runner with the plugin and the session/memory wrappers:
+
+    runner = Runner(
+        agent=agent,
+        app_name=agent.name,
+        session_service=TracedSessionService(session_service),
+        plugins=[TracingPlugin()],
+    )
+
+and summarize a trace file with `python -m memory_agent.tracing trace.jsonl`.
+"""
+import atexit
+import collections
+import contextlib
+import contextvars
+import inspect
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.adk.memory.base_memory_service import BaseMemoryService
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions.base_session_service import BaseSessionService
+
+from .metrics import Histogram
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration_s(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_OK"},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _from_otlp_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()))
+
+
+# --- Exporters ---
+
+class InMemoryCollector:
+    """Keeps the most recent spans in memory (handy for tests and benchmarks)."""
+
+    def __init__(self, max_spans: int = 100_000):
+        self.spans = collections.deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class JsonlFileExporter:
+    """Appends one OTLP/JSON span per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_otlp(), separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+# --- Tracer ---
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("memory_agent_span", default=None)
+
+
+class Tracer:
+    def __init__(self, exporter=None):
+        self.exporter = exporter or InMemoryCollector()
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        path = os.getenv("MEMORY_AGENT_TRACE_FILE")
+        return cls(JsonlFileExporter(path) if path else InMemoryCollector())
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        parent = parent or _current_span.get()
+        if parent is not None:
+            for key in ("app", "agent", "session_id"):
+                if key in parent.attributes and key not in attributes:
+                    attributes[key] = parent.attributes[key]
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        return Span(name, trace_id, parent.span_id if parent else None, attributes)
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None):
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self.exporter.export(span)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Opens a child of the current span for the duration of the block."""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            _current_span.reset(token)
+            self.end_span(span, e)
+            raise
+        _current_span.reset(token)
+        self.end_span(span)
+
+
+tracer = Tracer.from_env()
+
+
+def traced_callback(callback, tracer: Tracer = tracer):
+    """Wraps an agent callback (e.g. after_tool_callback) in a `callback.<name>` span."""
+    name = f"callback.{callback.__name__}"
+
+    def wrapper(*args, **kwargs):
+        span = tracer.start_span(name)
+        try:
+            result = callback(*args, **kwargs)
+        except BaseException as e:
+            tracer.end_span(span, e)
+            raise
+        if not inspect.isawaitable(result):
+            tracer.end_span(span)
+            return result
+
+        async def _await():
+            try:
+                value = await result
+            except BaseException as e:
+                tracer.end_span(span, e)
+                raise
+            tracer.end_span(span)
+            return value
+
+        return _await()
+
+    wrapper.__name__ = callback.__name__
+    wrapper.__doc__ = callback.__doc__
+    return wrapper
+
+
+# --- ADK integration ---
+
+class TracingPlugin(BasePlugin):
+    """Records agent, model request and tool spans for every invocation.
+
+    A callback that returns early (a cache hit in before_model_callback)
+    makes ADK skip the matching after/error callbacks. Such spans are ended
+    with `short_circuited=True` when the agent or the run ends, and runs that
+    never end (cancelled) are ended with `expired=True` once `max_run_s` old.
+    """
+
+    def __init__(self, tracer: Tracer = tracer, name: str = "tracing", max_run_s: float = 3600.0):
+        super().__init__(name=name)
+        self.tracer = tracer
+        self.max_run_s = max_run_s
+        self._invocations: Dict[str, Span] = {}
+        self._agents: Dict[tuple, List[Span]] = {}  # (invocation_id, agent) -> open agent.run spans
+        self._models: Dict[tuple, Span] = {}  # (invocation_id, agent)
+        self._tools: Dict[tuple, Span] = {}  # (invocation_id, function_call_id)
+        self._next_sweep = time.monotonic() + max_run_s / 4
+
+    def _agent_parent(self, invocation_id: str, agent_name: str) -> Optional[Span]:
+        stack = self._agents.get((invocation_id, agent_name))
+        return stack[-1] if stack else self._invocations.get(invocation_id)
+
+    def _end_open(self, span: Optional[Span], **attributes):
+        if span:
+            span.attributes.update(attributes)
+            self.tracer.end_span(span)
+
+    def _end_invocation(self, invocation_id: str, **attributes):
+        """Ends the invocation span and every span of it still open, tagged with `attributes`."""
+        for key in [key for key in self._tools if key[0] == invocation_id]:
+            self._end_open(self._tools.pop(key), **attributes)
+        for key in [key for key in self._models if key[0] == invocation_id]:
+            self._end_open(self._models.pop(key), **attributes)
+        for key in [key for key in self._agents if key[0] == invocation_id]:
+            for span in reversed(self._agents.pop(key)):
+                self._end_open(span, **attributes)
+        self._end_open(self._invocations.pop(invocation_id, None))
+
+    def _expire(self, now: float):
+        self._next_sweep = now + self.max_run_s / 4
+        cutoff = time.time_ns() - int(self.max_run_s * 1e9)
+        for invocation_id in [i for i, span in self._invocations.items() if span.start_ns < cutoff]:
+            self._end_invocation(invocation_id, expired=True)
+        # Spans whose invocation span is gone (plugin added mid-run, or already expired).
+        orphans = {key[0] for key in (*self._agents, *self._models, *self._tools)} - set(self._invocations)
+        for invocation_id in orphans:
+            self._end_invocation(invocation_id, expired=True)
+
+    async def before_run_callback(self, *, invocation_context):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._expire(now)
+        self._invocations[invocation_context.invocation_id] = self.tracer.start_span(
+            "invocation", app=invocation_context.app_name, session_id=invocation_context.session.id)
+
+    async def after_run_callback(self, *, invocation_context):
+        self._end_invocation(invocation_context.invocation_id, short_circuited=True)
+
+    async def before_agent_callback(self, *, agent, callback_context):
+        parent = self._invocations.get(callback_context.invocation_id)
+        span = self.tracer.start_span("agent.run", parent=parent, agent=agent.name)
+        self._agents.setdefault((callback_context.invocation_id, agent.name), []).append(span)
+
+    async def after_agent_callback(self, *, agent, callback_context):
+        key = (callback_context.invocation_id, agent.name)
+        self._end_open(self._models.pop(key, None), short_circuited=True)
+        stack = self._agents.get(key)
+        if stack:
+            self.tracer.end_span(stack.pop())
+            if not stack:
+                del self._agents[(callback_context.invocation_id, agent.name)]
+
+    async def before_model_callback(self, *, callback_context, llm_request):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        self._end_open(self._models.pop(key, None), short_circuited=True)
+        self._models[key] = self.tracer.start_span(
+            "model.request", parent=self._agent_parent(*key), agent=callback_context.agent_name,
+            model=llm_request.model or "", contents=len(llm_request.contents))
+
+    async def after_model_callback(self, *, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        span = self._models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span:
+            usage = llm_response.usage_metadata
+            if usage:
+                span.attributes["input_tokens"] = usage.prompt_token_count or 0
+                span.attributes["output_tokens"] = usage.candidates_token_count or 0
+            self.tracer.end_span(span)
+
+    async def on_model_error_callback(self, *, callback_context, llm_request, error):
+        span = self._models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if span:
+            self.tracer.end_span(span, error)
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self._tools[(tool_context.invocation_id, tool_context.function_call_id)] = self.tracer.start_span(
+            "tool.call", parent=self._agent_parent(tool_context.invocation_id, tool_context.agent_name),
+            agent=tool_context.agent_name, tool=tool.name)
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        span = self._tools.pop((tool_context.invocation_id, tool_context.function_call_id), None)
+        if span:
+            self.tracer.end_span(span)
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        span = self._tools.pop((tool_context.invocation_id, tool_context.function_call_id), None)
+        if span:
+            self.tracer.end_span(span, error)
+
+class TracedSessionService(BaseSessionService):
+    """Delegating session service that records `session.*` spans."""
+
+    def __init__(self, inner, tracer: Tracer = tracer):
+        self.inner = inner
+        self.tracer = tracer
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        with self.tracer.span("session.create", app=app_name):
+            return await self.inner.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        with self.tracer.span("session.get", app=app_name, session_id=session_id) as span:
+            session = await self.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+            span.attributes["events"] = len(session.events) if session else 0
+            return session
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        with self.tracer.span("session.list", app=app_name):
+            return await self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        with self.tracer.span("session.delete", app=app_name, session_id=session_id):
+            return await self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session, event):
+        with self.tracer.span("session.append_event", app=session.app_name, session_id=session.id, author=event.author):
+            return await self.inner.append_event(session, event)
+
+class TracedMemoryService(BaseMemoryService):
+    """Delegating memory service; `memory.search` spans cover PreloadMemoryTool's preload."""
+
+    def __init__(self, inner, tracer: Tracer = tracer):
+        self.inner = inner
+        self.tracer = tracer
+
+    async def add_session_to_memory(self, session):
+        with self.tracer.span("memory.add_session", app=session.app_name, session_id=session.id):
+            return await self.inner.add_session_to_memory(session)
+
+    async def search_memory(self, *, app_name, user_id, query):
+        with self.tracer.span("memory.search", app=app_name) as span:
+            response = await self.inner.search_memory(app_name=app_name, user_id=user_id, query=query)
+            span.attributes["results"] = len(response.memories)
+            return response
+
+
+# --- Summaries ---
+
+def summarize(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Latency breakdown per agent (or app for runner/session spans) and span name.
+
+    Accepts OTLP/JSON span dicts, as written by JsonlFileExporter.
+    """
+    histograms: Dict[str, Dict[str, Histogram]] = collections.defaultdict(lambda: collections.defaultdict(Histogram))
+    for span in spans:
+        attributes = {a["key"]: _from_otlp_value(a["value"]) for a in span.get("attributes", [])}
+        owner = attributes.get("agent") or attributes.get("app") or "unknown"
+        seconds = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9
+        histograms[owner][span["name"]].observe(seconds)
+    return {
+        owner: {name: h.summary() for name, h in sorted(by_name.items())}
+        for owner, by_name in sorted(histograms.items())
+    }
+
+
+def collected_spans(collector: InMemoryCollector) -> List[Dict[str, Any]]:
+    return [span.to_otlp() for span in collector.spans]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m memory_agent.tracing <trace.jsonl>")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        report = summarize(json.loads(line) for line in f if line.strip())
+    for owner, by_name in report.items():
+        print(f"\n=== {owner} ===")
+        for name, s in by_name.items():
+            print(f"  {name:<24} n={s['count']:<6} mean={s['mean_ms']:>9.2f}ms  p95={s['p95_ms']:>9.2f}ms  max={s['max_ms']:>9.2f}ms")
@@ -4,29 +4,53 @@ import os
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
 from google.adk.tools import google_search
+from google.adk.tools.agent_tool import AgentTool
+from memory_agent.log import get_logger
+from memory_agent.models import install_model_backend
+from memory_agent.admission import install_admission_control
+from memory_agent.hedging import install_hedging
+from memory_agent.itinerary import (
+    expand_itinerary, get_itinerary_day, itinerary_instruction, save_itinerary_day, save_trip_profile, trim_history,
+)
 
 load_dotenv()
 
+logger = get_logger("step_01")
+
 from google.adk.apps.app import App
 
+# google_search can't share an agent with function tools, so it runs as its own agent.
+search_agent = LlmAgent(
+    name="search_agent",
+    model="gemini-2.5-flash",
+    instruction="Answer the question using Google Search. Be concise and include names and locations.",
+    tools=[google_search],
+)
+
 root_agent = LlmAgent(
     name="multi_day_trip_agent",
     model="gemini-2.5-flash",
     description="Agent that progressively plans a multi-day trip, remembering previous days and adapting to user feedback.",
-    instruction="""
+    instruction=itinerary_instruction("""
     You are the "Adaptive Trip Planner" 🗺️ - an AI assistant that builds multi-day travel itineraries step-by-step.
 
     Your Defining Feature:
-    You have short-term memory. You MUST refer back to our conversation to understand the trip's context, what has already been planned, and the user's preferences. If the user asks for a change, you must adapt the plan while keeping the unchanged parts consistent.
+    You have short-term memory. The trip so far is kept in an itinerary store (summarized below) and only the latest turns of our conversation are shown to you. Use them to understand the trip's context, what has already been planned, and the user's preferences. If the user asks for a change, you must adapt the plan while keeping the unchanged parts consistent.
 
     Your Mission:
     1.  **Initiate**: Start by asking for the destination, trip duration, and interests.
     2.  **Plan Progressively**: Plan ONLY ONE DAY at a time. After presenting a plan, ask for confirmation.
     3.  **Handle Feedback**: If a user dislikes a suggestion (e.g., "I don't like museums"), acknowledge their feedback, and provide a *new, alternative* suggestion for that time slot that still fits the overall theme.
     4.  **Maintain Context**: For each new day, ensure the activities are unique and build logically on the previous days. Do not suggest the same things repeatedly.
-    5.  **Final Output**: Return each day's itinerary in MARKDOWN format.
-    """,
-    tools=[google_search]
+    5.  **Final Output**: Return each day's itinerary in MARKDOWN format, using the [[DAY n]] placeholders for saved days.
+    """),
+    tools=[AgentTool(agent=search_agent), save_trip_profile, save_itinerary_day, get_itinerary_day],
+    before_model_callback=trim_history(keep_user_turns=3),
+    after_model_callback=expand_itinerary,
 )
 
-print(f"🗺️ Agent '{root_agent.name}' is created and ready to plan and adapt!")
\ No newline at end of file
+logger.info("🗺️ Agent '%s' is created and ready to plan and adapt!", root_agent.name)
+
+install_model_backend(root_agent)
+install_admission_control(root_agent)
+install_hedging(root_agent)
@@ -2,9 +2,17 @@ import os
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent, SequentialAgent
 from google.adk.tools import google_search
+from memory_agent.coalescing import SingleFlightCache
+from memory_agent.models import install_model_backend
+from memory_agent.admission import install_admission_control
+from memory_agent.hedging import install_hedging
 
 load_dotenv()
 
+# foodie_agent's pick depends only on the request, so identical concurrent
+# queries share one model call and repeats within the TTL reuse the answer.
+foodie_cache = SingleFlightCache(ttl_s=600)
+
 # --- Agent Definitions for our Specialist Team (Refactored for Sequential Workflow) ---
 
 # Note the new `output_key` and the more specific instruction.
@@ -17,7 +25,9 @@ foodie_agent = LlmAgent(
     When you recommend a place, you must output *only* the name of the establishment and nothing else.
     For example, if the best sushi is at 'Jin Sho', you should output only: Jin Sho
     """,
-    output_key="destination"  # ADK will save the agent's final response to state['destination']
+    output_key="destination",  # ADK will save the agent's final response to state['destination']
+    before_model_callback=foodie_cache.before_model_callback,
+    after_model_callback=foodie_cache.after_model_callback,
 )
 
 # The `{destination}` placeholder is automatically filled by the ADK from the state.
@@ -38,4 +48,8 @@ root_agent = SequentialAgent(
     name="find_and_navigate_agent",
     sub_agents=[foodie_agent, transportation_agent],
     description="A workflow that first finds a location and then provides directions to it."
-)
\ No newline at end of file
+)
+
+install_model_backend(root_agent)
+install_admission_control(root_agent)
+install_hedging(root_agent)
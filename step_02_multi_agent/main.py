@@ -6,39 +6,53 @@ import os
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
+# The repo root holds the shared `memory_agent` helpers
+repo_root = os.path.dirname(current_dir)
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
 
 from google.adk.agents import Agent
 from google.genai import types
 from google.adk.runners import Runner
-from google.adk.sessions import Session, InMemorySessionService
+from google.adk.sessions import Session
+from memory_agent.sessions import ShardedInMemorySessionService
+from memory_agent.tracing import tracer, TracingPlugin, TracedSessionService
+from memory_agent.accounting import AccountingPlugin
+from memory_agent.callbacks import ModelErrorPlugin
 from agent import root_agent
 
 # --- A Helper Function to Run Our Agents ---
-async def run_agent_query(agent: Agent, query: str, session: Session, user_id: str, session_service: InMemorySessionService, is_router: bool = False):
+async def run_agent_query(agent: Agent, query: str, session: Session, user_id: str, session_service: ShardedInMemorySessionService, is_router: bool = False):
     """Initializes a runner and executes a query for a given agent and session."""
     print(f"\n🚀 Running query for agent: '{agent.name}' in session: '{session.id}'...")
 
-    runner = Runner(
-        agent=agent,
-        session_service=session_service,
-        app_name=agent.name
-    )
-
     final_response = ""
-    try:
-        async for event in runner.run_async(
-            user_id=user_id,
-            session_id=session.id,
-            new_message=types.Content(parts=[types.Part(text=query)], role="user")
-        ):
-            if not is_router:
-                # Let's see what the agent is thinking!
-                # print(f"EVENT: {event}")
-                pass
-            if event.is_final_response():
-                final_response = event.content.parts[0].text
-    except Exception as e:
-        final_response = f"An error occurred: {e}"
+    # Every turn is traced; set MEMORY_AGENT_TRACE_FILE to export the spans.
+    with tracer.span("turn", app=agent.name, session_id=session.id):
+        with tracer.span("runner.setup"):
+            runner = Runner(
+                agent=agent,
+                session_service=TracedSessionService(session_service),
+                app_name=agent.name,
+                plugins=[TracingPlugin(), AccountingPlugin(), ModelErrorPlugin()],
+            )
+
+        # One turn at a time per session; concurrent turns would interleave events.
+        async with session_service.session_lock(agent.name, user_id, session.id):
+            try:
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session.id,
+                    new_message=types.Content(parts=[types.Part(text=query)], role="user")
+                ):
+                    if not is_router:
+                        # Let's see what the agent is thinking!
+                        # print(f"EVENT: {event}")
+                        pass
+                    if event.is_final_response():
+                        final_response = event.content.parts[0].text
+            except Exception as e:
+                final_response = f"An error occurred: {e}"
 
     if not is_router:
         print("\n" + "-"*50)
@@ -53,7 +67,7 @@ async def run_sequential_workflow():
     A simplified test function that directly invokes the SequentialAgent.
     """
     # Initialize Session Service
-    session_service = InMemorySessionService()
+    session_service = ShardedInMemorySessionService()
     my_user_id = "adk_adventurer_002"
 
     # The query contains all the information needed for the entire sequence.
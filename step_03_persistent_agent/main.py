@@ -7,45 +7,70 @@ from pathlib import Path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
+# The repo root holds the shared `memory_agent` helpers
+repo_root = os.path.dirname(current_dir)
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
 
 from google.adk.agents import Agent
 from google.genai import types
 from google.adk.runners import Runner
-from google.adk.sessions import Session, DatabaseSessionService
+from google.adk.sessions import BaseSessionService, Session
+from memory_agent.sqlite_sessions import SqliteSessionService
+from memory_agent.journal_sessions import JournalSessionService
+from memory_agent.tracing import tracer, TracingPlugin, TracedSessionService
+from memory_agent.accounting import AccountingPlugin
+from memory_agent.callbacks import ModelErrorPlugin
+from memory_agent.prefetch import Prefetcher, PrefetchingSessionService, session_digest_loader
 from agent import root_agent
 
 # --- Configuration for Persistent Sessions ---
 SESSIONS_DIR = Path(os.path.expanduser("~")) / ".adk_codelab" / "sessions"
 os.makedirs(SESSIONS_DIR, exist_ok=True)
-SESSION_DB_FILE = SESSIONS_DIR / "trip_planner.db"
-SESSION_URL = f"sqlite:///{SESSION_DB_FILE}"
+# State is stored per key and only changed keys are written (see memory_agent/sqlite_sessions.py).
+SESSION_DB_FILE = SESSIONS_DIR / "trip_planner_sessions.db"
+# MEMORY_AGENT_SESSION_STORE=journal keeps sessions in an append-only log instead
+# (group-committed appends, snapshot + tail replay on start; see memory_agent/journal_sessions.py).
+SESSION_JOURNAL_DIR = SESSIONS_DIR / "trip_planner_journal"
+
+
+def open_session_store() -> BaseSessionService:
+    if os.getenv("MEMORY_AGENT_SESSION_STORE", "sqlite").lower() == "journal":
+        store = JournalSessionService(SESSION_JOURNAL_DIR)
+        print(f"📒 Journal session store: {SESSION_JOURNAL_DIR} (recovery: {store.recovery})")
+        return store
+    return SqliteSessionService(SESSION_DB_FILE)
 
 # --- A Helper Function to Run Our Agents ---
-async def run_agent_query(agent: Agent, query: str, session: Session, user_id: str, session_service: DatabaseSessionService, is_router: bool = False):
+async def run_agent_query(agent: Agent, query: str, session: Session, user_id: str, session_service: BaseSessionService, is_router: bool = False):
     """Initializes a runner and executes a query for a given agent and session."""
     print(f"\n🚀 Running query for agent: '{agent.name}' in session: '{session.id}'...")
 
-    runner = Runner(
-        agent=agent,
-        session_service=session_service,
-        app_name=agent.name
-    )
-
     final_response = ""
-    try:
-        async for event in runner.run_async(
-            user_id=user_id,
-            session_id=session.id,
-            new_message=types.Content(parts=[types.Part(text=query)], role="user")
-        ):
-            if not is_router:
-                # Let's see what the agent is thinking!
-                # print(f"EVENT: {event}")
-                pass
-            if event.is_final_response():
-                final_response = event.content.parts[0].text
-    except Exception as e:
-        final_response = f"An error occurred: {e}"
+    # Every turn is traced; set MEMORY_AGENT_TRACE_FILE to export the spans.
+    with tracer.span("turn", app=agent.name, session_id=session.id):
+        with tracer.span("runner.setup"):
+            runner = Runner(
+                agent=agent,
+                session_service=TracedSessionService(session_service),
+                app_name=agent.name,
+                plugins=[TracingPlugin(), AccountingPlugin(), ModelErrorPlugin()],
+            )
+
+        try:
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session.id,
+                new_message=types.Content(parts=[types.Part(text=query)], role="user")
+            ):
+                if not is_router:
+                    # Let's see what the agent is thinking!
+                    # print(f"EVENT: {event}")
+                    pass
+                if event.is_final_response():
+                    final_response = event.content.parts[0].text
+        except Exception as e:
+            final_response = f"An error occurred: {e}"
 
     if not is_router:
         print("\n" + "-"*50)
@@ -56,7 +81,10 @@ async def run_agent_query(agent: Agent, query: str, session: Session, user_id: s
     return final_response
 
 async def main():
-    session_service = DatabaseSessionService(db_url=SESSION_URL)
+    store = open_session_store()
+    prefetcher = Prefetcher()
+    prefetcher.register("session_digest", session_digest_loader(store))
+    session_service = PrefetchingSessionService(store, prefetcher)
     
     # --- Test Case 1: New Session ---
     print("\n" + "="*50)
@@ -112,46 +140,21 @@ async def main():
     
     new_session_id = "my_second_trip"
     print(f"Starting NEW session: {new_session_id}")
-    
-    # 1. Retrieve the OLD session to get its history
-    old_session = await session_service.get_session(
-        app_name=root_agent.name, user_id="user_01", session_id=session_id
-    )
-    
-    # 2. Extract relevant info (naive approach: get all user/model turns)
-    # In a real app, you might use an LLM to summarize this, or filter for specific 'preferences'.
-    previous_context = ""
-    if old_session and old_session.events:
-        print(f"Found {len(old_session.events)} events in old session.")
-        previous_context = "PREVIOUS TRIP CONTEXT:\n"
-        for event in old_session.events:
-            # Assuming event structure has 'role' and 'parts' (standard GenAI types)
-            # We need to be careful with the structure. Let's just dump the text.
-            # The 'event' in session.events is likely a Turn or similar object.
-            # Let's inspect it or just try to access standard attributes.
-            # Based on standard ADK, it might be a Pydantic model with 'role' and 'parts'.
-            # Let's try to stringify it safely.
-            try:
-                role = getattr(event, 'role', 'unknown')
-                text = ""
-                if hasattr(event, 'parts'):
-                    text = " ".join([p.text for p in event.parts if hasattr(p, 'text')])
-                elif hasattr(event, 'content') and hasattr(event.content, 'parts'):
-                     text = " ".join([p.text for p in event.content.parts if hasattr(p, 'text')])
-                
-                if text:
-                    previous_context += f"- {role}: {text}\n"
-            except Exception as e:
-                print(f"Error parsing event: {e}")
-
-    print(f"Extracted Context:\n{previous_context}")
 
-    # 3. Create the NEW session
+    # 1. Create the NEW session. This starts loading a digest of the user's most
+    # recent other session ("my_persistent_trip") right away, while the user is
+    # still typing, instead of fetching it once the first message arrives.
     new_session = await session_service.create_session(
         app_name=root_agent.name, user_id="user_01", session_id=new_session_id
     )
-    
-    # 4. Inject the context into the FIRST query of the new session
+
+    # 2. The first turn only awaits the digest that is already in flight
+    # ("- author: text" lines of the old session's turns).
+    # In a real app, you might use an LLM to summarize this, or filter for specific 'preferences'.
+    previous_context = await prefetcher.take(root_agent.name, "user_01", new_session.id, "session_digest")
+    print(f"Extracted Context:\n{previous_context}")
+
+    # 3. Inject the context into the FIRST query of the new session
     # We explicitly tell the agent: "Here is what we know from a past trip..."
     query_3 = f"""
     {previous_context}
@@ -161,6 +164,8 @@ async def main():
     """
     
     await run_agent_query(root_agent, query_3, new_session, "user_01", session_service)
+    print(f"⚡ Prefetch: {prefetcher.stats()}")
+    store.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
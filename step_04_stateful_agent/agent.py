@@ -3,32 +3,68 @@ from dotenv import load_dotenv
 
 from google.adk.agents import LlmAgent, Agent
 from google.adk.tools import google_search
+from memory_agent.callbacks import CallbackRegistry
+from memory_agent.coalescing import SingleFlightCache
+from memory_agent.scheduler import SpecialistScheduler
+from memory_agent.log import get_logger, get_turn_logger
+from memory_agent.tracing import traced_callback
+from memory_agent.models import install_model_backend
+from memory_agent.admission import install_admission_control
+from memory_agent.hedging import install_hedging
 
 load_dotenv()
 
+logger = get_logger("step_04")
+# The callback fires on every tool call; its messages are sampled.
+turn_logger = get_turn_logger("step_04")
+
+# The specialists answer from the request alone, so identical concurrent
+# requests share one model call and repeats are served from a TTL cache.
+specialist_cache = SingleFlightCache(ttl_s=600)
+
 museum_agent = LlmAgent(
     name="museum_expert",
     model="gemini-2.5-flash",
     instruction="You are a generic museum expert. When asked, suggest ONE famous museum or cultural site in the requested city. Keep it brief.",
+    before_model_callback=specialist_cache.before_model_callback,
+    after_model_callback=specialist_cache.after_model_callback,
 )
 
 restaurant_agent = LlmAgent(
     name="restaurant_expert",
     model="gemini-2.5-flash",
     instruction="You are a foodie. When asked, suggest ONE famous local restaurant or dish in the requested city. Keep it brief.",
+    before_model_callback=specialist_cache.before_model_callback,
+    after_model_callback=specialist_cache.after_model_callback,
 )
 
 outdoor_agent = LlmAgent(
     name="outdoor_expert",
     model="gemini-2.5-flash",
     instruction="You are an adventure guide. When asked, suggest ONE outdoor activity or park in the requested city. Keep it brief.",
+    before_model_callback=specialist_cache.before_model_callback,
+    after_model_callback=specialist_cache.after_model_callback,
 )
 
-print("✅ Specialist agents are ready to plan!")
+logger.info("✅ Specialist agents are ready to plan!")
 
 from typing import Dict, Any, Optional
 from google.adk.tools import ToolContext
 
+# Which activity type each specialist plans. The variety rules in the planner's
+# instruction and the state update below are both generated from this table.
+ACTIVITY_TYPES = {
+    "museum_expert": "CULTURAL",
+    "restaurant_expert": "FOOD",
+    "outdoor_expert": "OUTDOOR",
+}
+
+# Tool callbacks are looked up by tool / target agent, so only hand-offs to the
+# specialists above pay for this one.
+callbacks = CallbackRegistry()
+
+@callbacks.on(agents=ACTIVITY_TYPES)
+@traced_callback
 def save_activity_type_callback(
     tool,
     args: Dict[str, Any],
@@ -38,29 +74,24 @@ def save_activity_type_callback(
     """
     Callback to save the TYPE of activity just planned into the session state.
     """
-    # 1. Get the actual agent name.
-    if tool.name == "transfer_to_agent":
-         agent_name = args.get("agent_name")
-    else:
-         agent_name = tool.name
+    agent_name = args.get("agent_name") if tool.name == "transfer_to_agent" else tool.name
+    activity_type = ACTIVITY_TYPES[agent_name]
 
-    activity_type = "unknown"
+    turn_logger.info("🔔 [CALLBACK] The planner transferred to '%s'.", agent_name, extra={"agent": agent_name})
 
-    # 2. Determine the type based on which agent was actually used
-    if agent_name == "museum_expert":
-        activity_type = "CULTURAL"
-    elif agent_name == "restaurant_expert":
-        activity_type = "FOOD"
-    elif agent_name == "outdoor_expert":
-        activity_type = "OUTDOOR"
+    tool_context.state["last_activity_type"] = activity_type
+    turn_logger.info("💾 [STATE UPDATE] 'last_activity_type' is now set to: %s", activity_type, extra={"activity_type": activity_type})
 
-    print(f"\n🔔 [CALLBACK] The planner transferred to '{agent_name}'.")
+    return None
 
-    # 3. Update the state directly
-    tool_context.state["last_activity_type"] = activity_type
-    print(f"💾 [STATE UPDATE] 'last_activity_type' is now set to: {activity_type}\n")
+# Records each specialist's latency and success; the planner is told to prefer
+# the fastest specialist the variety rule allows when several fit the request.
+scheduler = SpecialistScheduler.from_env()
 
-    return tool_response
+VARIETY_RULES = "\n".join(
+    f"           - If last_activity_type is '{activity_type}' -> `{agent_name}` is BANNED for this turn."
+    for agent_name, activity_type in ACTIVITY_TYPES.items()
+)
 
 def get_planner_instruction(context: ToolContext) -> str:
     """
@@ -72,7 +103,15 @@ def get_planner_instruction(context: ToolContext) -> str:
     last_activity = "None"
     if context and hasattr(context, "state") and context.state:
         last_activity = context.state.get("last_activity_type", "None")
-    
+
+    # Only specialists with enough measured runs are listed; the others are left to rules 1-4.
+    measured = scheduler.preferred(agent for agent, activity_type in ACTIVITY_TYPES.items() if activity_type != last_activity)
+    speed_rule = ""
+    if measured:
+        speed_rule = ("5. **PREFERENCE:** If more than one allowed specialist fits the request equally well, prefer "
+                      f"these (measured speed, fastest first): {', '.join(f'`{agent}`' for agent in measured)}. "
+                      "This is only a preference and never overrides rules 2 and 3.")
+
     return f"""
         You are a Master Trip Planner dedicated to creating varied, balanced itineraries.
 
@@ -83,11 +122,10 @@ def get_planner_instruction(context: ToolContext) -> str:
         ### YOUR STRICT RULES
         1. You **MUST** delegate every request to one of your 3 specialists. NEVER answer directly.
         2. **VARIETY IS MANDATORY:** You are FORBIDDEN from using the same specialist twice in a row.
-           - If last_activity_type is 'CULTURAL' -> `museum_expert` is BANNED for this turn.
-           - If last_activity_type is 'FOOD' -> `restaurant_expert` is BANNED for this turn.
-           - If last_activity_type is 'OUTDOOR' -> `outdoor_expert` is BANNED for this turn.
+{VARIETY_RULES}
         3. If the user asks for something that fits a banned specialist (e.g., asking for a hike when OUTDOOR is banned), you MUST politely refuse and suggest a DIFFERENT available type of activity instead.
         4. **CRITICAL:** You must only transfer to ONE agent at a time. Do NOT attempt to call multiple tools or transfer to multiple agents in a single turn.
+        {speed_rule}
     """
 
 
@@ -96,6 +134,12 @@ root_agent = LlmAgent(
     model="gemini-2.5-flash",
     instruction=get_planner_instruction,
     sub_agents=[museum_agent, restaurant_agent, outdoor_agent],
-    after_tool_callback=save_activity_type_callback,
+    after_tool_callback=callbacks.after_tool_callback,
 )
-print("🎩 The Master Planner is ready.")
+logger.info("🎩 The Master Planner is ready.")
+
+scheduler.install(root_agent.sub_agents)
+
+install_model_backend(root_agent)
+install_admission_control(root_agent)
+install_hedging(root_agent)
@@ -1,9 +1,14 @@
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
+from memory_agent.models import install_model_backend
+from memory_agent.admission import install_admission_control
+from memory_agent.hedging import install_hedging
 try:
     from .tools import setup_user_db, save_tool, recall_tool
+    from .preferences import schema_hint
 except ImportError:
     from tools import setup_user_db, save_tool, recall_tool
+    from preferences import schema_hint
     
 load_dotenv()
 
@@ -14,10 +19,17 @@ root_agent = LlmAgent(
     name="profile_planner",
     model="gemini-2.5-flash",
     tools=[save_tool, recall_tool],
-    instruction="""
+    instruction=f"""
     You are a hyper-personalized Master Trip Planner.
     1. RECALL FIRST: Before planning, your first action MUST be to call `recall_user_preferences` to learn about the user.
     2. PERSONALIZE: Use any recalled preferences (like dietary needs) to tailor your suggestions.
     3. LEARN: If a user states a new, long-term preference, your final action MUST be to use `save_user_preferences` to remember it.
+       Use these keys when they fit: {schema_hint()}.
+       A saved value replaces the stored one. To add to or remove from a list (e.g. allergies), either save the full
+       updated list including the recalled items, or save {{"item": true}} to add and {{"item": false}} to remove.
     """,
-)
\ No newline at end of file
+)
+
+install_model_backend(root_agent)
+install_admission_control(root_agent)
+install_hedging(root_agent)
@@ -0,0 +1,236 @@
+"""Canonical preference schema: key aliases, typed value encoding and a bounded recall summary.
+
+The model invents its own keys ("allergy", "allergies", "food_allergies"),
+so every key is normalized and mapped onto a small set of canonical
+preferences before it is stored. Values are stored in a compact typed text
+form instead of JSON:
+
+    L:<item>\\x1f<item>...   list (deduplicated, capped)
+    E:<value>               one of the preference's allowed values
+    B:1 / B:0               yes/no
+    T:<text>                free text (truncated)
+
+Rows written before this schema (JSON values, alias keys) are still read.
+
+A write replaces the stored value, so a list can be corrected ("vegan"
+replaces "vegetarian"). A dict of yes/no values edits the stored list
+instead: {"peanuts": False, "milk": True} removes peanuts and adds milk.
+Lists are only merged when alias rows are folded into one canonical row.
+
+Recall returns a summary with a fixed size budget. Canonical preferences
+come first, in priority order, with safety-relevant ones first. A user has
+at most `MAX_OTHER_KEYS` keys outside the schema; saving another one evicts
+the least recently written. The number of rows read and the prompt payload
+stay bounded however many preferences a user accumulates.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+LIST, ENUM, BOOL, TEXT = "L", "E", "B", "T"
+SEPARATOR = "\x1f"
+MAX_LIST_ITEMS = 8
+MAX_TEXT_CHARS = 120
+MAX_OTHER_KEYS = 8
+SUMMARY_MAX_CHARS = 600
+
+
+class Preference:
+    __slots__ = ("key", "kind", "aliases", "choices")
+
+    def __init__(self, key: str, kind: str, aliases: Tuple[str, ...] = (), choices: Tuple[str, ...] = ()):
+        self.key = key
+        self.kind = kind
+        self.aliases = aliases
+        self.choices = choices
+
+
+# In recall priority order: what must never be dropped comes first.
+SCHEMA: List[Preference] = [
+    Preference("allergies", LIST, ("allergy", "allergic_to", "food_allergies", "food_allergy", "allergens")),
+    Preference("dietary_restrictions", LIST, (
+        "dietary_restriction", "diet", "diets", "dietary_needs", "dietary_preference", "dietary_preferences",
+        "dietary_requirements", "diet_type", "food_restrictions")),
+    Preference("accessibility", TEXT, ("accessibility_needs", "mobility", "mobility_needs", "disability")),
+    Preference("budget", ENUM, ("budget_preference", "travel_budget", "price_range", "budget_level"),
+               choices=("budget", "mid-range", "luxury")),
+    Preference("cuisines", LIST, (
+        "cuisine", "favorite_cuisine", "favorite_cuisines", "favorite_food", "favorite_foods", "food_preferences",
+        "food_preference", "foods")),
+    Preference("activities", LIST, ("activity", "interests", "interest", "favorite_activities", "hobbies", "hobby")),
+    Preference("accommodation", TEXT, ("accommodation_type", "hotel_preference", "hotel", "lodging", "stay")),
+    Preference("transport", TEXT, ("transportation", "transport_preference", "travel_mode", "getting_around")),
+    Preference("travel_companions", TEXT, ("companions", "travelling_with", "traveling_with", "family")),
+    Preference("home_city", TEXT, ("home", "hometown", "home_town", "lives_in")),
+]
+
+CANONICAL: Dict[str, Preference] = {p.key: p for p in SCHEMA}
+PRIORITY: Dict[str, int] = {p.key: i for i, p in enumerate(SCHEMA)}
+_ALIASES: Dict[str, str] = {alias: p.key for p in SCHEMA for alias in (p.key, *p.aliases)}
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_ENUM_SYNONYMS = {"cheap": "budget", "low": "budget", "moderate": "mid-range", "mid": "mid-range",
+                  "midrange": "mid-range", "medium": "mid-range", "high": "luxury", "expensive": "luxury"}
+
+
+def normalize_key(key: str) -> str:
+    """Maps a model-invented key to its canonical key, or to a normalized snake_case key outside the schema."""
+    normalized = _NON_WORD.sub("_", str(key).lower()).strip("_") or "preference"
+    if normalized in _ALIASES:
+        return _ALIASES[normalized]
+    if normalized.endswith("s") and normalized[:-1] in _ALIASES:
+        return _ALIASES[normalized[:-1]]
+    return normalized
+
+
+def _is_edit(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and all(isinstance(v, bool) for v in value.values())
+
+
+def _items(value: Any) -> List[str]:
+    if isinstance(value, dict):
+        value = [k for k, v in value.items() if v] if _is_edit(value) else list(value.values())
+    if not isinstance(value, (list, tuple, set)):
+        value = re.split(r"\s*[,;]\s*", str(value))
+    return [str(item).replace(SEPARATOR, " ").strip()[:MAX_TEXT_CHARS] for item in value if str(item).strip()]
+
+
+def _kind(key: str) -> str:
+    preference = CANONICAL.get(key)
+    return preference.kind if preference else TEXT
+
+
+# --- Encoding ---
+
+def encode(key: str, value: Any, stored: Optional[str] = None, merge: bool = False) -> str:
+    """Typed compact encoding of `value`.
+
+    A list preference replaces the `stored` encoding unless `merge` is set;
+    a dict of booleans always edits it (True adds the item, False removes it).
+    """
+    kind = _kind(key)
+    if kind == LIST:
+        base = _items(decode(stored)) if stored and (merge or _is_edit(value)) else []
+        if _is_edit(value):
+            removed = {str(item).strip().lower() for item, keep in value.items() if not keep}
+            base = [item for item in base if item.lower() not in removed]
+        merged: Dict[str, str] = {}
+        for item in base + _items(value):
+            merged.setdefault(item.lower(), item)
+        items = list(merged.values())[-MAX_LIST_ITEMS:]
+        return LIST + ":" + SEPARATOR.join(items)
+    if kind == ENUM:
+        text = str(value).strip().lower()
+        text = _ENUM_SYNONYMS.get(text, text)
+        if text in CANONICAL[key].choices:
+            return ENUM + ":" + text
+    if isinstance(value, bool):
+        return BOOL + ":" + ("1" if value else "0")
+    if isinstance(value, (list, tuple, set, dict)):
+        value = ", ".join(_items(value))
+    return TEXT + ":" + str(value).strip()[:MAX_TEXT_CHARS]
+
+
+def decode(encoded: str) -> Any:
+    tag, sep, body = encoded.partition(":")
+    if sep and tag == LIST:
+        return body.split(SEPARATOR) if body else []
+    if sep and tag == BOOL:
+        return body == "1"
+    if sep and tag in (ENUM, TEXT):
+        return body
+    return json.loads(encoded)  # Written before the schema existed.
+
+
+# --- Writes ---
+
+def normalize_preferences(new_preferences: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Groups the incoming values by canonical key (several aliases may land on one key)."""
+    grouped: Dict[str, List[Any]] = {}
+    for key, value in new_preferences.items():
+        if value is None or value == "":
+            continue
+        grouped.setdefault(normalize_key(key), []).append(value)
+    return grouped
+
+
+def save(conn, user_id: str, new_preferences: Dict[str, Any]) -> List[str]:
+    """Upserts normalized, encoded preferences in the caller's transaction; returns the canonical keys persisted.
+
+    Rows the user has under a non-canonical spelling (written before the
+    schema) are folded into their canonical row on the way. Rewritten rows
+    get a fresh rowid, so rowid order is last-write order.
+    """
+    grouped = normalize_preferences(new_preferences)
+    if not grouped:
+        return []
+    current: Dict[str, str] = {}  # Canonical key -> encoding, least recently written first.
+    legacy_keys, dirty = [], set()
+    for key, encoded in conn.execute(
+            "SELECT pref_key, pref_value FROM user_preferences WHERE user_id = ? ORDER BY rowid", (user_id,)):
+        canonical = normalize_key(key)
+        if canonical == key and _kind(key) != LIST:
+            current[key] = encoded
+            continue
+        try:
+            value = decode(encoded)
+        except ValueError:
+            value = encoded
+        current[canonical] = encode(canonical, value, current.get(canonical), merge=True)
+        if canonical != key:
+            legacy_keys.append(key)
+            dirty.add(canonical)
+
+    for key, values in grouped.items():
+        # The first value replaces what is stored; more values for the key in this call are added to it.
+        for i, value in enumerate(values):
+            current[key] = encode(key, value, current.get(key), merge=i > 0)
+        current[key] = current.pop(key)  # Most recently written last.
+        dirty.add(key)
+
+    others = [key for key in current if key not in CANONICAL]
+    evicted = others[:-MAX_OTHER_KEYS] if len(others) > MAX_OTHER_KEYS else []
+    conn.executemany("DELETE FROM user_preferences WHERE user_id = ? AND pref_key = ?",
+                     [(user_id, key) for key in legacy_keys + evicted])
+    # REPLACE deletes and re-inserts, moving the row to the end of the rowid order.
+    conn.executemany("INSERT OR REPLACE INTO user_preferences (user_id, pref_key, pref_value) VALUES (?, ?, ?);",
+                     [(user_id, key, current[key]) for key in current if key in dirty and key not in evicted])
+    return [key for key in grouped if key not in evicted]
+
+
+# --- Reads ---
+
+def summarize(rows: List[Tuple[str, str]], max_chars: int = SUMMARY_MAX_CHARS) -> Dict[str, Any]:
+    """Canonical preferences first (by priority), then other keys, until the summary reaches `max_chars`."""
+    values: Dict[str, Any] = {}
+    for key, encoded in rows:
+        canonical = normalize_key(key)
+        try:
+            value = decode(encoded)
+        except ValueError:
+            continue
+        if _kind(canonical) == LIST:
+            value = decode(encode(canonical, value, encode(canonical, values[canonical]) if canonical in values else None,
+                                  merge=True))
+        values[canonical] = value
+    ordered = sorted(values, key=lambda k: (PRIORITY.get(k, len(PRIORITY)), k))
+    summary: Dict[str, Any] = {}
+    size = 0
+    for key in ordered:
+        size += len(key) + len(str(values[key])) + 4
+        if size > max_chars and summary:
+            summary["omitted"] = len(ordered) - len(summary)
+            break
+        summary[key] = values[key]
+    return summary
+
+
+def recall(conn, user_id: str) -> Dict[str, Any]:
+    # Bounded: at most len(SCHEMA) + MAX_OTHER_KEYS rows per user (plus legacy alias rows).
+    rows = conn.execute("SELECT pref_key, pref_value FROM user_preferences WHERE user_id = ? ORDER BY rowid",
+                        (user_id,)).fetchall()
+    return summarize(rows)
+
+
+def schema_hint() -> str:
+    """One line for the agent's instruction listing the canonical keys."""
+    return ", ".join(f"{p.key} ({'/'.join(p.choices)})" if p.choices else p.key for p in SCHEMA)
@@ -0,0 +1,260 @@
+"""Shared, memory-mapped snapshot of hot users' preferences.
+
+SQLite stays the source of truth. A single writer process periodically
+publishes a read-only snapshot file that every worker maps into memory, so
+`recall_user_preferences` can skip the database for hot users.
+
+File layout (little endian):
+
+    header   magic "UPSN" | version u16 | pad u16 | generation u64 | count u32 | payload_start u32
+    index    `count` fixed-size entries sorted by key: key u64 | offset u32 | length u32
+    payload  per user: user_id length u16 | user_id utf-8 | preference summary JSON
+
+Freshness is tracked with a generation counter. Every preference write bumps
+the counter in SQLite and mirrors it into a tiny `<snapshot>.gen` file. A
+snapshot is only served while its generation matches the mirrored counter;
+otherwise readers fall back to SQLite until the next snapshot is published.
+Publishing registers the snapshot in the database, so every writer mirrors
+the counter, whether or not it reads through the snapshot itself.
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from . import preferences as preference_schema
+except ImportError:
+    import preferences as preference_schema
+
+MAGIC = b"UPSN"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxQII")
+INDEX_ENTRY = struct.Struct("<QII")
+USER_ID_LEN = struct.Struct("<H")
+GENERATION = struct.Struct("<Q")
+
+# Environment variable that turns the snapshot read path on.
+SNAPSHOT_ENV_VAR = "PREFERENCE_SNAPSHOT_FILE"
+
+
+def _key(user_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(user_id.encode(), digest_size=8).digest(), "little")
+
+
+def _generation_file(snapshot_path: str) -> str:
+    return f"{snapshot_path}.gen"
+
+
+# --- Generation counter ---
+
+def setup_generation_table(conn: sqlite3.Connection):
+    conn.execute("CREATE TABLE IF NOT EXISTS preference_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);")
+    conn.execute("INSERT OR IGNORE INTO preference_meta (name, value) VALUES ('generation', 0);")
+    conn.execute("CREATE TABLE IF NOT EXISTS preference_snapshots (path TEXT PRIMARY KEY);")
+
+
+def bump_generation(conn: sqlite3.Connection) -> int:
+    """Increments the generation inside the caller's write transaction."""
+    conn.execute("UPDATE preference_meta SET value = value + 1 WHERE name = 'generation';")
+    return read_generation(conn)
+
+
+def read_generation(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM preference_meta WHERE name = 'generation';").fetchone()
+    return row[0] if row else 0
+
+
+def registered_snapshots(conn: sqlite3.Connection) -> List[str]:
+    """Paths of the snapshots published from this database."""
+    return [row[0] for row in conn.execute("SELECT path FROM preference_snapshots;")]
+
+
+def mirror_generation_to(snapshot_paths: Iterable[str], generation: int):
+    """Mirrors a committed generation to every snapshot that has readers (its `.gen` file exists)."""
+    for path in set(snapshot_paths):
+        if os.path.exists(_generation_file(path)):
+            mirror_generation(path, generation)
+
+
+def mirror_generation(snapshot_path: str, generation: int):
+    """Publishes the committed generation to readers; the value never moves backwards."""
+    fd = os.open(_generation_file(snapshot_path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        current = os.pread(fd, GENERATION.size, 0)
+        if len(current) == GENERATION.size and GENERATION.unpack(current)[0] >= generation:
+            return
+        os.pwrite(fd, GENERATION.pack(generation), 0)
+    finally:
+        os.close(fd)
+
+
+# --- Writer ---
+
+def publish_snapshot(db_file: str, snapshot_path: str, user_ids: Optional[Iterable[str]] = None, max_users: int = 10_000) -> int:
+    """Builds a snapshot from SQLite and atomically replaces `snapshot_path`.
+
+    If `user_ids` is omitted, the users with the most stored preferences are
+    treated as hot. Returns the number of users written.
+    """
+    with sqlite3.connect(db_file) as conn:
+        setup_generation_table(conn)
+        conn.execute("INSERT OR IGNORE INTO preference_snapshots (path) VALUES (?);", (os.path.abspath(snapshot_path),))
+        conn.commit()
+        # One read transaction so the generation matches the rows we copy.
+        conn.execute("BEGIN;")
+        generation = read_generation(conn)
+        if user_ids is None:
+            user_ids = [row[0] for row in conn.execute(
+                "SELECT user_id FROM user_preferences GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT ?", (max_users,))]
+        preferences: Dict[str, Dict[str, Any]] = {}
+        for user_id in user_ids:
+            rows = conn.execute("SELECT pref_key, pref_value FROM user_preferences WHERE user_id = ? ORDER BY rowid",
+                                (user_id,)).fetchall()
+            if rows:
+                # The same bounded summary recall_user_preferences returns.
+                preferences[user_id] = preference_schema.summarize(rows)
+        conn.execute("COMMIT;")
+
+    entries = []
+    payload = bytearray()
+    for user_id, prefs in preferences.items():
+        uid = user_id.encode()
+        record = USER_ID_LEN.pack(len(uid)) + uid + json.dumps(prefs, separators=(",", ":")).encode()
+        entries.append((_key(user_id), len(payload), len(record)))
+        payload += record
+    entries.sort()
+
+    payload_start = HEADER.size + INDEX_ENTRY.size * len(entries)
+    tmp_path = f"{snapshot_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, generation, len(entries), payload_start))
+        for entry in entries:
+            f.write(INDEX_ENTRY.pack(*entry))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, snapshot_path)
+    mirror_generation(snapshot_path, generation)
+    return len(entries)
+
+
+# --- Reader ---
+
+class PreferenceSnapshot:
+    """Read-only view of a published snapshot, shared by all workers through the page cache."""
+
+    def __init__(self, snapshot_path: str):
+        self.path = snapshot_path
+        self._map: Optional[mmap.mmap] = None
+        self._gen_map: Optional[mmap.mmap] = None
+        self._inode = None
+        self.generation = -1
+        self.count = 0
+        self._payload_start = 0
+        # Tools run on a thread pool; remapping must not race an in-flight lookup.
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                self._inode = os.fstat(f.fileno()).st_ino
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(_generation_file(self.path), "rb") as f:
+                self._gen_map = mmap.mmap(f.fileno(), GENERATION.size, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            self.close()
+            return
+        magic, version, self.generation, self.count, self._payload_start = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+
+    def close(self):
+        for m in (self._map, self._gen_map):
+            if m is not None:
+                m.close()
+        self._map = self._gen_map = None
+        self.generation = -1
+        self.count = 0
+
+    def is_fresh(self) -> bool:
+        if self._map is None or self._gen_map is None:
+            return False
+        return GENERATION.unpack_from(self._gen_map, 0)[0] == self.generation
+
+    def _refresh(self) -> bool:
+        """Remaps the file if the writer has published a newer snapshot since we opened it."""
+        if self.is_fresh():
+            return True
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        if inode != self._inode or self._map is None:
+            self._open()
+        return self.is_fresh()
+
+    def get_raw(self, user_id: str) -> Optional[memoryview]:
+        """Returns a zero-copy view of the user's preferences JSON, or None on a miss/stale snapshot.
+
+        Release the view before the next lookup so the snapshot can be remapped.
+        """
+        if not self._refresh():
+            return None
+        key = _key(user_id)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key, offset, length = INDEX_ENTRY.unpack_from(self._map, HEADER.size + mid * INDEX_ENTRY.size)
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                record = memoryview(self._map)[self._payload_start + offset:self._payload_start + offset + length]
+                (uid_len,) = USER_ID_LEN.unpack_from(record, 0)
+                if bytes(record[USER_ID_LEN.size:USER_ID_LEN.size + uid_len]) != user_id.encode():
+                    return None  # 64-bit key collision; let SQLite answer.
+                return record[USER_ID_LEN.size + uid_len:]
+        return None
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            raw = self.get_raw(user_id)
+            if raw is None:
+                return None
+            try:
+                return json.loads(bytes(raw))
+            finally:
+                raw.release()
+
+
+def open_snapshot_from_env() -> Optional[PreferenceSnapshot]:
+    path = os.getenv(SNAPSHOT_ENV_VAR)
+    return PreferenceSnapshot(path) if path else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the shared user preference snapshot.")
+    parser.add_argument("--db", default="user_preferences.db")
+    parser.add_argument("--snapshot", default=os.getenv(SNAPSHOT_ENV_VAR, "user_preferences.snapshot"))
+    parser.add_argument("--max-users", type=int, default=10_000)
+    parser.add_argument("--interval", type=float, default=0, help="Republish every N seconds (0 = once).")
+    args = parser.parse_args()
+
+    while True:
+        published = publish_snapshot(args.db, args.snapshot, max_users=args.max_users)
+        print(f"📦 Published preference snapshot with {published} users to '{args.snapshot}'.")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
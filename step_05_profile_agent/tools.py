@@ -1,35 +1,57 @@
+import os
 import sqlite3
-import json
 from typing import Dict, Any
 from google.adk.tools import ToolContext, FunctionTool
+from memory_agent.log import get_logger
+from memory_agent.tool_executor import tool_executor
+try:
+    from . import preferences
+    from .snapshot import setup_generation_table, bump_generation, mirror_generation_to, open_snapshot_from_env, registered_snapshots
+except ImportError:
+    import preferences
+    from snapshot import setup_generation_table, bump_generation, mirror_generation_to, open_snapshot_from_env, registered_snapshots
 
 USER_DB_FILE = "user_preferences.db"
 
+logger = get_logger("step_05")
+
+# Optional shared read path; set PREFERENCE_SNAPSHOT_FILE to enable it.
+preference_snapshot = open_snapshot_from_env()
+
 def setup_user_db():
     with sqlite3.connect(USER_DB_FILE) as conn:
         conn.execute("""
         CREATE TABLE IF NOT EXISTS user_preferences (
             user_id TEXT NOT NULL, pref_key TEXT NOT NULL, pref_value TEXT NOT NULL,
             PRIMARY KEY (user_id, pref_key));""")
-    print(f"✅ User preferences database '{USER_DB_FILE}' is ready.")
+        setup_generation_table(conn)
+    logger.info("✅ User preferences database '%s' is ready.", USER_DB_FILE)
 
 def save_user_preferences(tool_context: ToolContext, new_preferences: Dict[str, Any]) -> str:
     user_id = tool_context.session.user_id
+    # Keys are mapped onto the canonical schema and values stored typed (see preferences.py).
     with sqlite3.connect(USER_DB_FILE) as conn:
-        for key, value in new_preferences.items():
-            conn.execute("INSERT INTO user_preferences (user_id, pref_key, pref_value) VALUES (?, ?, ?) ON CONFLICT(user_id, pref_key) DO UPDATE SET pref_value = excluded.pref_value;",
-                         (user_id, key, json.dumps(value)))
-    return f"Preferences updated: {list(new_preferences.keys())}"
+        saved_keys = preferences.save(conn, user_id, new_preferences)
+        generation = bump_generation(conn)
+        snapshot_paths = registered_snapshots(conn)
+    if preference_snapshot:
+        snapshot_paths.append(os.path.abspath(preference_snapshot.path))
+    # Invalidate every published snapshot only after the write has committed,
+    # including when this process doesn't read through one.
+    mirror_generation_to(snapshot_paths, generation)
+    return f"Preferences updated: {saved_keys}"
 
 def recall_user_preferences(tool_context: ToolContext) -> Dict[str, Any]:
     user_id = tool_context.session.user_id
-    preferences = {}
+    if preference_snapshot:
+        summary = preference_snapshot.get(user_id)
+        if summary is not None:
+            return summary
     with sqlite3.connect(USER_DB_FILE) as conn:
-        rows = conn.execute("SELECT pref_key, pref_value FROM user_preferences WHERE user_id = ?", (user_id,)).fetchall()
-        if not rows: return {"message": "No preferences found."}
-        for key, value_str in rows: preferences[key] = json.loads(value_str)
-    return preferences
+        summary = preferences.recall(conn, user_id)
+    return summary or {"message": "No preferences found."}
 
-# Tools to be imported by the agent
-save_tool = FunctionTool(save_user_preferences)
-recall_tool = FunctionTool(recall_user_preferences)
\ No newline at end of file
+# Tools to be imported by the agent.
+# SQLite I/O runs on the shared tool executor so it never blocks the runner's event loop.
+save_tool = FunctionTool(tool_executor.offload(save_user_preferences, max_concurrency=2, timeout=10))
+recall_tool = FunctionTool(tool_executor.offload(recall_user_preferences, max_concurrency=8, timeout=5))
@@ -1,13 +1,25 @@
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
-from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from memory_agent.models import install_model_backend
+from memory_agent.admission import install_admission_control
+from memory_agent.hedging import install_hedging
+from memory_agent.prefetch import Prefetcher
 try:
     from .tools import budget_tool
+    from .memory_topics import TopicScopedPreloadMemoryTool
 except ImportError:
     from tools import budget_tool
+    from memory_topics import TopicScopedPreloadMemoryTool
 
 load_dotenv()
 
+# Loaders are registered by main.py, which owns the services; the first turn of a
+# new session takes the memories loaded while the user was typing.
+prefetcher = Prefetcher()
+
+# Injects only memories on the turn's topics, capped at 2 KB per turn.
+memory_tool = TopicScopedPreloadMemoryTool(max_bytes=2048, prefetcher=prefetcher)
+
 root_agent = LlmAgent(
     model="gemini-2.5-flash",
     name="TripPlanner",
@@ -25,5 +37,9 @@ root_agent = LlmAgent(
     Be personal and reference specific past experiences when available.
     If not available, just keep talking with the user. Don't make up facts.
     """,
-    tools=[PreloadMemoryTool(), budget_tool],
+    tools=[memory_tool, budget_tool],
 )
+
+install_model_backend(root_agent)
+install_admission_control(root_agent)
+install_hedging(root_agent)
@@ -8,12 +8,23 @@ from pathlib import Path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
+# The repo root holds the shared `memory_agent` helpers used by tools.py
+repo_root = os.path.dirname(current_dir)
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
 
 from dotenv import load_dotenv
 from google.adk.runners import Runner
 from google.adk.sessions import VertexAiSessionService
 from google.adk.memory import VertexAiMemoryBankService
 from google.genai import types
+from memory_agent.tracing import TracingPlugin, TracedSessionService, TracedMemoryService
+from memory_agent.local_memory import LocalMemoryService
+from memory_agent.sessions import ShardedInMemorySessionService
+from memory_agent.accounting import AccountingPlugin
+from memory_agent.callbacks import ModelErrorPlugin
+from memory_agent.prefetch import PrefetchingSessionService, memory_loader
+from memory_agent.models import backend_name, offline_backend
 
 from vertexai import types as vertexai_types
 
@@ -22,21 +33,14 @@ MemoryTopic = vertexai_types.MemoryBankCustomizationConfigMemoryTopic
 CustomMemoryTopic = vertexai_types.MemoryBankCustomizationConfigMemoryTopicCustomMemoryTopic
 ManagedMemoryTopic = vertexai_types.MemoryBankCustomizationConfigMemoryTopicManagedMemoryTopic
 
-from agent import root_agent
+from agent import root_agent, memory_tool, prefetcher
+from memory_topics import PREFETCH_MEMORIES, PROFILE_QUERY
 
 load_dotenv()
 
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT") or os.getenv("PROJECT_ID")
 LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION") or os.getenv("LOCATION", "us-central1")
 
-if not PROJECT_ID:
-    raise ValueError("Please set GOOGLE_CLOUD_PROJECT environment variable.")
-
-print(f"Using Project: {PROJECT_ID}, Location: {LOCATION}")
-
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-client = vertexai.Client(project=PROJECT_ID, location=LOCATION)
-
 AGENT_NAME = "trip_agent"
 
 # --- Memory Bank Configuration ---
@@ -137,34 +141,53 @@ def get_or_create_agent_engine():
                 return engine
         raise e
 
-agent_engine = get_or_create_agent_engine()
-agent_engine_id = agent_engine.api_resource.name.split("/")[-1]
-print(f"Agent Engine ID: {agent_engine_id}")
+if offline_backend():
+    # No Vertex AI project needed: sessions and memories stay in this process.
+    print(f"Using the '{backend_name()}' model backend with local sessions and memories.")
+    memory_service = LocalMemoryService()
+    store = ShardedInMemorySessionService()
+else:
+    if not PROJECT_ID:
+        raise ValueError("Please set GOOGLE_CLOUD_PROJECT environment variable.")
 
-session_service = VertexAiSessionService(
-    project=PROJECT_ID, location=LOCATION, agent_engine_id=agent_engine_id
-)
-memory_service = VertexAiMemoryBankService(
-    project=PROJECT_ID, location=LOCATION, agent_engine_id=agent_engine_id
-)
+    print(f"Using Project: {PROJECT_ID}, Location: {LOCATION}")
+
+    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    client = vertexai.Client(project=PROJECT_ID, location=LOCATION)
+
+    agent_engine = get_or_create_agent_engine()
+    agent_engine_id = agent_engine.api_resource.name.split("/")[-1]
+    print(f"Agent Engine ID: {agent_engine_id}")
+
+    memory_service = VertexAiMemoryBankService(
+        project=PROJECT_ID, location=LOCATION, agent_engine_id=agent_engine_id
+    )
+    store = VertexAiSessionService(project=PROJECT_ID, location=LOCATION, agent_engine_id=agent_engine_id)
+
+# Creating a session starts the memory search its first turn will need.
+prefetcher.register(PREFETCH_MEMORIES, memory_loader(memory_service, PROFILE_QUERY))
+session_service = PrefetchingSessionService(store, prefetcher)
 
 APP_NAME = root_agent.name
 runner = Runner(
     app_name=APP_NAME,
     agent=root_agent,
-    session_service=session_service,
-    memory_service=memory_service,
+    session_service=TracedSessionService(session_service),
+    memory_service=TracedMemoryService(memory_service),
+    plugins=[TracingPlugin(), AccountingPlugin(), ModelErrorPlugin()],
 )
 
-def call_agent(runner: Runner, content: types.Content, session_id: str, user_id: str):
+async def call_agent(runner: Runner, content: types.Content, session_id: str, user_id: str):
     """Calls the agent and prints the final response."""
     print(f"\n--- User ({user_id}) ---")
     # print(content) # Debug
-    
-    events = runner.run(user_id=user_id, session_id=session_id, new_message=content)
+
+    # Runs on this event loop (not runner.run's thread) so the first turn can
+    # await the loads the prefetcher started when the session was created.
+    events = runner.run_async(user_id=user_id, session_id=session_id, new_message=content)
 
     final_response = ""
-    for event in events:
+    async for event in events:
         if event.is_final_response():
             final_response = event.content.parts[0].text
             print(f"--- Agent ({runner.agent.name}) ---")
@@ -181,7 +204,7 @@ async def test_trip_planner():
 
     # 1. Text
     text_message = types.Content(role="user", parts=[{"text": "Hello!"}])
-    call_agent(runner, content=text_message, session_id=session.id, user_id=USER_ID)
+    await call_agent(runner, content=text_message, session_id=session.id, user_id=USER_ID)
     await asyncio.sleep(2)
 
     # 2. Image
@@ -196,7 +219,7 @@ async def test_trip_planner():
             {"file_data": {"file_uri": image_uri, "mime_type": mime_type}},
         ],
     )
-    call_agent(runner, content=image_message, session_id=session.id, user_id=USER_ID)
+    await call_agent(runner, content=image_message, session_id=session.id, user_id=USER_ID)
     await asyncio.sleep(2)
 
     # 3. Video
@@ -211,7 +234,7 @@ async def test_trip_planner():
             {"file_data": {"file_uri": video_uri, "mime_type": mime_type}},
         ],
     )
-    call_agent(runner, content=video_message, session_id=session.id, user_id=USER_ID)
+    await call_agent(runner, content=video_message, session_id=session.id, user_id=USER_ID)
     await asyncio.sleep(2)
 
     # 4. Audio
@@ -224,7 +247,7 @@ async def test_trip_planner():
             {"file_data": {"file_uri": audio_uri, "mime_type": mime_type}},
         ],
     )
-    call_agent(runner, content=audio_message, session_id=session.id, user_id=USER_ID)
+    await call_agent(runner, content=audio_message, session_id=session.id, user_id=USER_ID)
     await asyncio.sleep(2)
 
     print("\n---------------------------------------------------")
@@ -245,7 +268,7 @@ async def test_trip_planner():
     )
 
     text_message = types.Content(role="user", parts=[{"text": "Hello!"}])
-    call_agent(runner, content=text_message, session_id=new_session.id, user_id=USER_ID)
+    await call_agent(runner, content=text_message, session_id=new_session.id, user_id=USER_ID)
 
     verification_message = types.Content(
         role="user",
@@ -255,7 +278,10 @@ async def test_trip_planner():
             }
         ],
     )
-    call_agent(runner, content=verification_message, session_id=new_session.id, user_id=USER_ID)
+    await call_agent(runner, content=verification_message, session_id=new_session.id, user_id=USER_ID)
+
+    print(f"\n🧠 Memory preload: {memory_tool.stats()}")
+    print(f"⚡ Prefetch: {prefetcher.stats()}")
 
 if __name__ == "__main__":
     asyncio.run(test_trip_planner())
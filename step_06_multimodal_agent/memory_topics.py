@@ -0,0 +1,175 @@
+import collections
+import re
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.tools import ToolContext
+from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from memory_agent.log import get_turn_logger
+from memory_agent.metrics import Histogram
+from memory_agent.prefetch import Prefetcher
+from memory_agent.tracing import tracer
+
+turn_logger = get_turn_logger("step_06.memory")
+
+# --- Topic classifier ---
+# Keyword rules for the memory topics configured in main.py. Cheap and local:
+# one regex per topic, run on the user's turn and on each retrieved memory.
+TOPIC_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "USER_PREFERENCES": (
+        "like", "love", "prefer", "favorite", "favourite", "hate", "dislike", "enjoy", "recommend", "suggest",
+    ),
+    "USER_PERSONAL_INFO": (
+        "my name", "family", "wife", "husband", "partner", "kids", "children", "son", "daughter", "birthday",
+        "age", "live in", "work", "job",
+    ),
+    "travel_experiences": (
+        "restaurant", "cafe", "food", "eat", "dinner", "lunch", "breakfast", "sushi", "museum", "hike", "hiking",
+        "beach", "visited", "last time", "went", "trip", "stayed", "photo", "activity", "activities",
+    ),
+    "travel_preferences": (
+        "budget", "cheap", "luxury", "mid-range", "cost", "price", "train", "flight", "fly", "flying", "drive",
+        "driving", "season", "weather", "vegetarian", "vegan", "dietary", "allergic", "allergy", "language",
+        "hotel", "hostel", "accommodation", "culture", "cultural",
+    ),
+    "travel_logistics": (
+        "passport", "visa", "frequent flyer", "loyalty", "insurance", "emergency", "medical", "medication",
+        "vaccine", "packing", "pack", "luggage", "jet lag", "time zone", "timezone",
+    ),
+}
+# Used when a turn matches nothing: keep the memories that personalize any answer.
+DEFAULT_TOPICS = frozenset({"USER_PREFERENCES", "travel_preferences"})
+# Prefetched when a session is created, before the first message is known: every topic's keywords.
+PROFILE_QUERY = " ".join(keyword for keywords in TOPIC_KEYWORDS.values() for keyword in keywords)
+PREFETCH_MEMORIES = "memories"
+
+_TOPIC_PATTERNS = {
+    topic: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")s?\b", re.IGNORECASE)
+    for topic, keywords in TOPIC_KEYWORDS.items()
+}
+
+
+def classify_topics(text: str) -> FrozenSet[str]:
+    return frozenset(topic for topic, pattern in _TOPIC_PATTERNS.items() if pattern.search(text))
+
+
+# --- Topic-scoped preload ---
+
+PRELOAD_TEMPLATE = """The following content is from your previous conversations with the user.
+They may be useful for answering the user's current query.
+<PAST_CONVERSATIONS>
+{}
+</PAST_CONVERSATIONS>
+"""
+
+
+class TopicScopedPreloadMemoryTool(PreloadMemoryTool):
+    """PreloadMemoryTool that only injects memories on the turn's topics, up to `max_bytes`.
+
+    Memory Bank returns whatever is similar to the query, so a restaurant
+    question can pull in passport details. Each turn is classified into
+    topics; retrieved memories on other topics are dropped, memories with no
+    recognizable topic rank after on-topic ones, and the payload stops at
+    `max_bytes`. The search runs once per turn, not once per model call.
+
+    With a `prefetcher`, a new session's first turn uses the memories it
+    started loading (with PROFILE_QUERY) when the session was created,
+    instead of searching after the message arrives.
+    """
+
+    def __init__(self, max_bytes: int = 2048, max_memories: int = 10, prefetcher: Optional[Prefetcher] = None):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_memories = max_memories
+        self.prefetcher = prefetcher
+        self.prefetched_turns = 0
+        self.retrieval_latency = Histogram()
+        self.turns = 0
+        self.memories_seen = 0
+        self.memories_injected = 0
+        self.bytes_injected = 0
+        self.max_bytes_injected = 0
+        self._payloads: "collections.OrderedDict[str, str]" = collections.OrderedDict()
+
+    def select(self, topics: FrozenSet[str], memories: Iterable[Tuple[str, str]]) -> List[str]:
+        """Picks memory lines (already formatted) for the turn's topics; `memories` is (text, line) pairs."""
+        on_topic, untagged = [], []
+        for text, line in memories:
+            memory_topics = classify_topics(text)
+            if not memory_topics:
+                untagged.append(line)
+            elif memory_topics & topics:
+                on_topic.append(line)
+        selected, size = [], 0
+        for line in on_topic + untagged:
+            size += len(line.encode()) + 1
+            if size > self.max_bytes or len(selected) >= self.max_memories:
+                break
+            selected.append(line)
+        return selected
+
+    async def _payload(self, tool_context: ToolContext, query: str) -> str:
+        topics = classify_topics(query) or DEFAULT_TOPICS
+        with tracer.span("memory.preload", topics=",".join(sorted(topics))) as span:
+            started = time.perf_counter()
+            session = tool_context.session
+            prefetched = bool(self.prefetcher) and self.prefetcher.has(
+                session.app_name, session.user_id, session.id, PREFETCH_MEMORIES)
+            span.attributes["prefetched"] = prefetched
+            try:
+                if prefetched:
+                    self.prefetched_turns += 1
+                    response = await self.prefetcher.take(session.app_name, session.user_id, session.id, PREFETCH_MEMORIES)
+                else:
+                    response = await tool_context.search_memory(query)
+            except Exception as e:
+                turn_logger.warning("Memory search failed: %s", e)
+                return ""
+            self.retrieval_latency.observe(time.perf_counter() - started)
+
+            memories = []
+            for memory in response.memories:
+                if not memory.content or not memory.content.parts:
+                    continue
+                text = " ".join(part.text for part in memory.content.parts if part.text)
+                if not text:
+                    continue
+                prefix = f"Time: {memory.timestamp}\n" if memory.timestamp else ""
+                memories.append((text, f"{prefix}{memory.author}: {text}"))
+            lines = self.select(topics, memories)
+            payload = PRELOAD_TEMPLATE.format("\n".join(lines)) if lines else ""
+
+            injected = len(payload.encode())
+            self.turns += 1
+            self.memories_seen += len(memories)
+            self.memories_injected += len(lines)
+            self.bytes_injected += injected
+            self.max_bytes_injected = max(self.max_bytes_injected, injected)
+            span.attributes.update(memories_seen=len(memories), memories_injected=len(lines), bytes_injected=injected)
+        turn_logger.info("Preloaded %d/%d memories (%d bytes) for topics %s", len(lines), len(memories), injected,
+                         sorted(topics), extra={"bytes_injected": injected, "memories_seen": len(memories)})
+        return payload
+
+    async def process_llm_request(self, *, tool_context: ToolContext, llm_request: LlmRequest) -> None:
+        user_content = tool_context.user_content
+        if not user_content or not user_content.parts or not user_content.parts[0].text:
+            return
+        payload = self._payloads.get(tool_context.invocation_id)
+        if payload is None:
+            payload = self._payloads[tool_context.invocation_id] = await self._payload(tool_context, user_content.parts[0].text)
+            while len(self._payloads) > 256:  # Only in-flight turns are ever reused.
+                self._payloads.popitem(last=False)
+        if payload:
+            llm_request.append_instructions([payload])
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "turns": self.turns,
+            "prefetched_turns": self.prefetched_turns,
+            "memories_seen": self.memories_seen,
+            "memories_injected": self.memories_injected,
+            "bytes_injected_per_turn": round(self.bytes_injected / self.turns) if self.turns else 0,
+            "max_bytes_injected": self.max_bytes_injected,
+            "retrieval_latency": self.retrieval_latency.summary(),
+        }
@@ -1,5 +1,6 @@
 from typing import Any
 from google.adk.tools import FunctionTool
+from memory_agent.tool_executor import tool_executor
 
 def calculate_trip_budget(destination: str, days: int, style: str) -> dict[str, Any]:
     """Calculates estimated budget for a trip.
@@ -33,4 +34,4 @@ def calculate_trip_budget(destination: str, days: int, style: str) -> dict[str,
         },
     }
 
-budget_tool = FunctionTool(func=calculate_trip_budget)
+budget_tool = FunctionTool(func=tool_executor.offload(calculate_trip_budget, max_concurrency=8, timeout=5))